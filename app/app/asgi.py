@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# streams async responses, e.g. search results events, without blocking
+# event loop
+from libs.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
@@ -88,6 +88,17 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'db' / 'django_cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -133,6 +144,118 @@ STATICFILES_DIRS = [
 AUTH_USER_MODEL = 'user.User'
 
 
+# Scrapper
+# Max number of (phrase, shop) searches run at once and per single shop
+
+SCRAPPER_MAX_CONCURRENCY = 8
+
+SCRAPPER_SHOP_CONCURRENCY = 2
+
+# Pooled http session per shop host: (connect, read) timeouts in seconds,
+# retries of failed requests with jittered exponential backoff
+
+SCRAPPER_HTTP_OPTIONS = {
+    'timeout': (5, 30),
+    'retries': 3,
+    'backoff_factor': 0.5,
+    'pool_maxsize': SCRAPPER_SHOP_CONCURRENCY * 2,
+}
+
+# Per shop overrides of html parser engine ('lexbor' or 'soup'),
+# BeautifulSoup backend and response cache ttl, e.g.
+# {'hebe': {'html_engine': 'soup', 'cache_ttl': 600}}
+
+SCRAPPER_PARSER_OPTIONS = {}
+
+# On-disk cache of fetched and rendered search pages, None disables it.
+# Default ttl in seconds, max_size in bytes
+
+SCRAPPER_RESPONSE_CACHE = {
+    'cache_dir': BASE_DIR / 'db' / 'response_cache',
+    'max_size': 256 * 2 ** 20,
+    'ttl': 900,
+}
+
+# Directory of lock files coalescing identical searches between worker
+# processes, None coalesces them only between threads of one process
+
+SCRAPPER_SINGLE_FLIGHT_DIR = BASE_DIR / 'db' / 'single_flight'
+
+# Warm headless Chrome sessions shared by webdriver shops, each browser is
+# recycled after max_uses searches
+
+SCRAPPER_BROWSER_POOL = {
+    'size': SCRAPPER_SHOP_CONCURRENCY,
+    'max_uses': 50,
+}
+
+# Pacing of requests per shop host: token bucket rate (requests per second)
+# and burst, concurrency adapted between 1 and max_concurrency, halved when
+# requests fail or take longer than target_latency seconds. Circuit breaker
+# skips shop with failure_threshold failures among last window requests,
+# for reset_timeout seconds. None disables pacing
+
+SCRAPPER_THROTTLE = {
+    'rate': 2,
+    'burst': 4,
+    'max_concurrency': SCRAPPER_SHOP_CONCURRENCY,
+    'target_latency': 15,
+    'failure_threshold': 3,
+    'window': 10,
+    'reset_timeout': 60,
+}
+
+
+# Search results cache
+# Results older than soft ttl are refreshed in background, results older
+# than hard ttl are scraped again. Values in seconds
+
+SEARCH_CACHE_SOFT_TTL = 15 * 60
+
+SEARCH_CACHE_HARD_TTL = 24 * 60 * 60
+
+# Search jobs running longer are considered stalled and queued again
+
+SEARCH_JOB_TIMEOUT = 10 * 60
+
+# Stalled search job is failed after this many attempts of workers
+
+SEARCH_JOB_MAX_ATTEMPTS = 3
+
+# Search runs, results shared by url, and finished search jobs older than
+# retention are deleted by prune_searches command. Value in days, must
+# exceed SEARCH_CACHE_HARD_TTL, so that cached runs are kept
+
+SEARCH_RUN_RETENTION_DAYS = 30
+
+# Price points older than retention are rolled up into daily min/max/avg
+# rollups and daily rollups into weekly ones by compact_price_history
+# command, which also deletes price history records older than price points
+# retention. Values in days
+
+PRICE_POINTS_RETENTION_DAYS = 90
+
+PRICE_DAILY_ROLLUPS_RETENTION_DAYS = 365
+
+# Prices of searched phrases are refreshed in background by refresh_prices
+# command. Budget is number of shop scrapes per minute, per shop name or
+# default. Phrases are refreshed at most once per min interval (seconds),
+# until they are not searched by users for tracking days
+
+PRICE_REFRESH_BUDGET = {
+    'default': 6,
+    'superpharm': 2,
+}
+
+PRICE_REFRESH_MIN_INTERVAL = 6 * 60 * 60
+
+PRICE_REFRESH_TRACKING_DAYS = 30
+
+# Serve product search with async views, for ASGI server (app.asgi)
+
+ASYNC_VIEWS = False
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
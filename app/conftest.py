@@ -1,5 +1,8 @@
+from typing import Dict, List
+
 import pytest
 
+from django.core.cache import cache
 from django.core.management import call_command
 
 from scrapper.shop_parser import get_shop_parser
@@ -10,12 +13,58 @@ DATA_PATH = '/app/scrapper/tests/data/'
 DRIVER_PATH = '/usr/local/bin/chromedriver'
 
 
+class FakeClock:
+    """Monotonic clock of rate limiters moved forward by tests."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock():
+    """Fake monotonic clock starting at 0, moved by setting its now."""
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Uses in-memory cache, cleared after each test."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tests',
+        }
+    }
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def load_shops(db):
     """Loads shops data to database."""
     call_command('loaddata', f'{DATA_PATH}shop_test_data.json')
 
 
+@pytest.fixture
+def scraped_products():
+    """Factory of product dictionaries as found by scrapper. Products are
+    named by given names or numbered 'yope 0', 'yope 1'... up to count, their
+    url is derived from the name. Keyword arguments override fields of all
+    products."""
+    def _scraped_products(*names, count=1, shop_id=1, **fields
+                          ) -> List[Dict]:
+        names = names or [f'yope {i}' for i in range(count)]
+        return [{
+            'shop_id': shop_id, 'search_phrase': 'yope', 'name': name,
+            'description': 'balsam do ciała', 'size': '300 ml',
+            'price': 9.99, 'image_url': '//img.png',
+            'url': f'/Produkt/{name.replace(" ", "-")}', **fields,
+        } for name in names]
+    return _scraped_products
+
+
 @pytest.fixture
 def initialize_parser(db):
     """Factory function for initializing given ShopParser object."""
@@ -0,0 +1,91 @@
+import json
+import base64
+import binascii
+from typing import Any, List, NamedTuple, Sequence, Union
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+
+class KeysetPage(NamedTuple):
+    """Rows of page with cursors of the next and previous page, None if
+    there is no such page."""
+    rows: List
+    next_cursor: Union[str, None]
+    previous_cursor: Union[str, None]
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Encodes ordering values of row as url safe cursor."""
+    data = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str) -> List:
+    """Decodes ordering values from cursor. Raises ValueError if cursor is
+    invalid."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    if not isinstance(values, list):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return values
+
+
+def cursor_values(queryset: QuerySet, ordering: Sequence[str],
+                  cursor: str) -> List[Any]:
+    """Decodes cursor values of ordering fields, converted to python values
+    of model fields. Raises ValueError if cursor does not match ordering."""
+    values = decode_cursor(cursor)
+    if len(values) != len(ordering) or not all(
+            isinstance(value, (str, int, float)) for value in values):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    try:
+        return [queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(ordering, values)]
+    except ValidationError:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+
+def _seek(ordering: Sequence[str], values: Sequence, lookup: str) -> Q:
+    """Condition of rows following (gt) or preceding (lt) given values."""
+    # (a, b) > (x, y) is a > x or (a = x and b > y)
+    condition = Q()
+    for index, field in enumerate(ordering):
+        condition |= Q(**dict(zip(ordering[:index], values)),
+                       **{f'{field}__{lookup}': values[index]})
+    return condition
+
+
+def keyset_page(queryset: QuerySet, ordering: Sequence[str],
+                after: Union[str, None], page_size: int,
+                before: Union[str, None] = None) -> KeysetPage:
+    """Returns page of queryset rows following the row given by after
+    cursor, or preceding the row given by before cursor, in ascending order
+    of ordering fields, which must be unique together. Unlike offset
+    pagination, database seeks directly to the page, so every page costs
+    the same. Raises ValueError if cursor is invalid."""
+    def row_cursor(row) -> str:
+        return encode_cursor(getattr(row, field) for field in ordering)
+
+    if before:
+        values = cursor_values(queryset, ordering, before)
+        rows = list(queryset.filter(_seek(ordering, values, 'lt'))
+                    .order_by(*(f'-{field}' for field in ordering))
+                    [:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(rows, row_cursor(rows[-1]) if rows else None,
+                          row_cursor(rows[0]) if has_previous else None)
+
+    queryset = queryset.order_by(*ordering)
+    if after:
+        values = cursor_values(queryset, ordering, after)
+        queryset = queryset.filter(_seek(ordering, values, 'gt'))
+
+    rows = list(queryset[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(rows, row_cursor(rows[-1]) if has_next else None,
+                      row_cursor(rows[0]) if after and rows else None)
@@ -0,0 +1,80 @@
+import time
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from libs import utils
+from scrapper.product_search import iter_products_by_search_phrases
+
+
+CACHE_PREFIX = 'product-search'
+
+
+def normalize_phrases(search_phrases: Iterable[str]) -> List[str]:
+    """Lowercases search phrases, collapses whitespace and removes
+    duplicates, so that equivalent searches share cache entry."""
+    phrases = {' '.join(phrase.lower().split()) for phrase in search_phrases}
+    phrases.discard('')
+    return sorted(phrases)
+
+
+def cache_key(search_phrases: Iterable[str]) -> str:
+    """Builds cache key of normalized phrase set."""
+    phrases = '|'.join(normalize_phrases(search_phrases))
+    return f'{CACHE_PREFIX}:{hashlib.sha1(phrases.encode()).hexdigest()}'
+
+
+def get_cached_search(search_phrases: Iterable[str]) -> Union[Dict, None]:
+    """Returns cached search entry with search run id and creation time."""
+    return cache.get(cache_key(search_phrases))
+
+
+def set_cached_search(search_phrases: Iterable[str], run_id: str) -> None:
+    """Stores id of search run of search phrases. Entry expires after hard
+    ttl."""
+    entry = {'run_id': str(run_id), 'created': time.time()}
+    cache.set(cache_key(search_phrases), entry,
+              timeout=settings.SEARCH_CACHE_HARD_TTL)
+
+
+def iter_search_and_save(search_phrases: List[str]
+                         ) -> Iterator[Tuple['ShopResult', List[int]]]:
+    """Scrapes shops for search phrases and persists products found in each
+    shop as soon as it is searched. Yields shop result with ids of its saved
+    products."""
+    for result in iter_products_by_search_phrases(search_phrases):
+        shop_product_ids = []
+        if result.products:
+            shop_product_ids = utils.save_products(result.products)
+        yield result, shop_product_ids
+
+
+def schedule_refresh(search_phrases: List[str]) -> 'SearchJob':
+    """Queues background refresh of cached search, unless one is already
+    queued or running."""
+    from product.jobs import enqueue_search
+
+    return enqueue_search(search_phrases)
+
+
+def get_search_results(search_phrases: List[str]) -> Union[str, None]:
+    """Returns id of search run of search phrases or None if they have to
+    be scraped. Cached results younger than soft ttl are returned as they
+    are, older ones are returned and refreshed in background. Results
+    missing or older than hard ttl are not returned."""
+    entry = get_cached_search(search_phrases)
+    age = time.time() - entry['created'] if entry else None
+    if entry is None or age > settings.SEARCH_CACHE_HARD_TTL:
+        return None
+
+    if age > settings.SEARCH_CACHE_SOFT_TTL:
+        schedule_refresh(search_phrases)
+
+    return entry['run_id']
+
+
+# cache backend and job queue are blocking, async views await them in thread
+aget_search_results = sync_to_async(get_search_results)
@@ -0,0 +1,75 @@
+import asyncio
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """Streaming response of async iterator, e.g. async generator. ASGI
+    handler of Django 3.2 consumes streaming responses synchronously in
+    event loop, StreamingASGIHandler awaits async content instead. Under
+    WSGI async content is consumed in worker thread with its own event
+    loop, database connections of its thread sensitive calls are closed
+    once it is consumed."""
+
+    def __init__(self, streaming_content: AsyncIterator = (), *args,
+                 **kwargs):
+        self.async_streaming_content = streaming_content
+        super().__init__(self._iterate_sync(streaming_content), *args,
+                         **kwargs)
+
+    @staticmethod
+    def _iterate_sync(content: AsyncIterator) -> Iterator:
+        iterator = content.__aiter__()
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(iterator.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            # request_finished of WSGI handler closes connections of worker
+            # thread only
+            loop.run_until_complete(sync_to_async(close_old_connections)())
+            loop.close()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for part in self.async_streaming_content:
+            yield self.make_bytes(part)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGI handler sending AsyncStreamingHttpResponse content as it is
+    produced, without blocking event loop."""
+
+    async def send_response(self, response, send):
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            return await super().send_response(response, send)
+
+        response_headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', cookie.output(header='').encode('ascii')
+                 .strip()))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+        async for part in response:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
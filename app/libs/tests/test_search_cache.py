@@ -0,0 +1,100 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from libs import search_cache
+from scrapper.web_scrapper import ShopResult
+
+
+SEARCH_PHRASES = ['Yope  balsam', 'himalaya pasta']
+RUN_ID = '2c9e5c4e-8a0d-4a8e-9d6b-6f0f2b1c7a10'
+
+
+@pytest.fixture(autouse=True)
+def short_ttls(settings):
+    """Uses short ttls for search cache tests."""
+    settings.SEARCH_CACHE_SOFT_TTL = 60
+    settings.SEARCH_CACHE_HARD_TTL = 600
+
+
+def cache_entry(run_id, age):
+    """Stores cached search created given number of seconds ago."""
+    search_cache.set_cached_search(SEARCH_PHRASES, run_id)
+    entry = search_cache.get_cached_search(SEARCH_PHRASES)
+    entry['created'] = time.time() - age
+    search_cache.cache.set(search_cache.cache_key(SEARCH_PHRASES), entry)
+
+
+def test_cache_key_of_equivalent_phrases():
+    """Test phrase order, case, whitespace and duplicates do not change
+    cache key."""
+    assert search_cache.cache_key(SEARCH_PHRASES) == search_cache.cache_key(
+        ['himalaya pasta ', 'yope balsam', 'YOPE BALSAM', ''])
+    assert search_cache.cache_key(SEARCH_PHRASES) != search_cache.cache_key(
+        ['yope balsam'])
+
+
+@patch('libs.search_cache.schedule_refresh')
+def test_search_results_missing_when_not_cached(mocked_refresh):
+    """Test no results are returned for new search."""
+    assert search_cache.get_search_results(SEARCH_PHRASES) is None
+    mocked_refresh.assert_not_called()
+
+
+@patch('libs.search_cache.schedule_refresh')
+def test_fresh_search_results_from_cache(mocked_refresh):
+    """Test cached results younger than soft ttl are returned without
+    refresh."""
+    cache_entry(RUN_ID, age=10)
+
+    run_id = search_cache.get_search_results(SEARCH_PHRASES)
+
+    assert run_id == RUN_ID
+    mocked_refresh.assert_not_called()
+
+
+@patch('libs.search_cache.schedule_refresh')
+def test_stale_search_results_refreshed_in_background(mocked_refresh):
+    """Test cached results older than soft ttl are returned and refreshed
+    in background."""
+    cache_entry(RUN_ID, age=120)
+
+    run_id = search_cache.get_search_results(SEARCH_PHRASES)
+
+    assert run_id == RUN_ID
+    mocked_refresh.assert_called_once_with(SEARCH_PHRASES)
+
+
+def test_expired_search_results_missing():
+    """Test cached results older than hard ttl are not returned."""
+    cache_entry(RUN_ID, age=1200)
+
+    assert search_cache.get_search_results(SEARCH_PHRASES) is None
+
+
+def test_schedule_refresh_queues_one_job(db):
+    """Test only one background refresh is queued for the same search."""
+    job = search_cache.schedule_refresh(SEARCH_PHRASES)
+
+    assert search_cache.schedule_refresh(['himalaya pasta', 'yope balsam']) \
+        == job
+
+
+@patch('libs.search_cache.iter_products_by_search_phrases')
+def test_iter_search_and_save_per_shop(mocked_scrape, db, load_shops):
+    """Test products are saved per searched shop."""
+    mocked_scrape.return_value = [
+        ShopResult(None, 'yope balsam', [{
+            'shop_id': 1, 'shop_name': 'rossman', 'name': 'yope figa',
+            'description': 'balsam do ciała', 'size': '300 ml',
+            'price': 21.99, 'image_url': '//www.ros.net.pl/figa.png',
+            'url': '/Produkt/figa'
+        }]),
+        ShopResult(None, 'yope balsam', [], ConnectionError()),
+    ]
+
+    results = list(search_cache.iter_search_and_save(SEARCH_PHRASES))
+
+    assert len(results[0][1]) == 1
+    assert results[1][1] == []
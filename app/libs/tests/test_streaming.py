@@ -0,0 +1,39 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+
+from libs.streaming import AsyncStreamingHttpResponse, StreamingASGIHandler
+
+
+async def numbered_events(count):
+    """Async generator of events pausing between them."""
+    for i in range(count):
+        await asyncio.sleep(0)
+        yield f'event {i}\n'
+
+
+def test_async_streaming_response_iterated_sync(db):
+    """Test async content is consumed by synchronous WSGI iteration.
+    Iteration closes database connections, so it needs database access."""
+    response = AsyncStreamingHttpResponse(numbered_events(3))
+
+    assert b''.join(response) == b'event 0\nevent 1\nevent 2\n'
+
+
+def test_asgi_handler_sends_async_content(db):
+    """Test ASGI handler awaits async content and sends each event as
+    separate body message."""
+    response = AsyncStreamingHttpResponse(numbered_events(2),
+                                          content_type='text/event-stream')
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(StreamingASGIHandler().send_response)(response, send)
+
+    assert messages[0]['type'] == 'http.response.start'
+    assert (b'Content-Type', b'text/event-stream') in messages[0]['headers']
+    assert [message.get('body') for message in messages[1:]] == \
+        [b'event 0\n', b'event 1\n', None]
+    assert response.closed
@@ -0,0 +1,132 @@
+import pytest
+from django.db import IntegrityError, transaction
+
+from libs import utils
+from price.models import Price
+from product.models import Product
+
+
+@pytest.mark.parametrize('count', [1, 100])
+def test_save_products_number_of_queries(count, load_shops, scraped_products,
+                                         django_assert_max_num_queries):
+    """Test saving new and existing products takes constant number of
+    queries. Signature bands of new products are inserted in batches of
+    sqlite variables limit."""
+    with django_assert_max_num_queries(16):
+        utils.save_products(scraped_products(count=count))
+    with django_assert_max_num_queries(9):
+        utils.save_products(scraped_products(count=count, price=7.99))
+
+    assert Product.objects.count() == count
+    assert set(Price.objects.values_list('price', flat=True)) == {7.99}
+
+
+def test_save_products_history(load_shops, scraped_products):
+    """Test history of created and updated prices is recorded."""
+    product_ids = utils.save_products(scraped_products(count=2))
+    utils.save_products(scraped_products(count=2, price=7.99))
+
+    price = Price.objects.get(product_id=product_ids[0])
+    assert [(h.history_type, h.price) for h in price.history.all()] == \
+        [('~', 7.99), ('+', 9.99)]
+
+
+def test_save_products_unchanged_price_not_written(
+        load_shops, django_assert_max_num_queries, scraped_products):
+    """Test unchanged prices are not written and only last seen time of
+    products is refreshed."""
+    product_ids = utils.save_products(scraped_products(count=3))
+    last_seen = Product.objects.get(id=product_ids[0]).last_seen
+    products = scraped_products(count=3)
+    products[0]['price'] = 7.99
+
+    with django_assert_max_num_queries(7):
+        utils.save_products(products)
+
+    assert Price.history.filter(history_type='~').count() == 1
+    assert Price.objects.get(product_id=product_ids[1]).price == 9.99
+    assert Product.objects.get(id=product_ids[1]).last_seen > last_seen
+
+
+def test_save_products_deduplicated(load_shops, scraped_products):
+    """Test product scraped twice is saved once with last scraped data."""
+    products = scraped_products(count=2) + scraped_products(count=1, price=5.99)
+
+    product_ids = utils.save_products(products)
+
+    assert len(product_ids) == 2
+    assert Product.objects.count() == 2
+    assert Price.objects.get(product_id=product_ids[0]).price == 5.99
+
+
+def test_save_products_without_price(load_shops, scraped_products):
+    """Test price is created for existing product which has none."""
+    product = Product.objects.create(
+        shop_id=1, **{field: value for field, value
+                      in scraped_products(count=1)[0].items()
+                      if field in utils.PRODUCT_FIELDS + ('url',)})
+
+    assert utils.save_products(scraped_products(count=1)) == [product.id]
+    assert Price.objects.get(product=product).price == 9.99
+
+
+def test_save_products_identified_by_shop_and_url(load_shops,
+                                                  scraped_products):
+    """Test products are identified by shop and url key, stored url keeps
+    trailing slash of last scraped spelling."""
+    products = scraped_products(count=1) * 3
+    products[1] = dict(products[1], url='/Produkt/yope-0/#opis')
+    products[2] = dict(products[2], shop_id=2)
+
+    product_ids = utils.save_products(products)
+
+    assert len(product_ids) == 2
+    assert set(Product.objects.values_list('shop_id', 'url')) == \
+        {(1, '/Produkt/yope-0/'), (2, '/Produkt/yope-0')}
+    assert utils.save_products(scraped_products(count=1)) == product_ids[:1]
+    assert utils.product_exists(scraped_products(count=1)[0]).id == product_ids[0]
+
+
+@pytest.mark.parametrize('url, normalized', [
+    ('/Produkt/figa', '/Produkt/figa'),
+    (' /Produkt/figa/ ', '/Produkt/figa/'),
+    ('HTTPS://www.Superpharm.pl/figa.html#opis',
+     'https://www.superpharm.pl/figa.html'),
+    ('/search?q=yope', '/search?q=yope'),
+])
+def test_normalize_url(url, normalized):
+    """Test url spelling variants are normalized."""
+    assert utils.normalize_url(url) == normalized
+
+
+@pytest.mark.parametrize('url, key', [
+    ('/Produkt/figa/', '/Produkt/figa'),
+    ('HTTPS://www.Superpharm.pl/figa/#opis',
+     'https://www.superpharm.pl/figa'),
+    ('https://www.hebe.pl/', 'https://www.hebe.pl/'),
+    ('/search/?q=yope', '/search?q=yope'),
+])
+def test_url_key(url, key):
+    """Test url spellings differing in trailing slash have the same key."""
+    assert utils.url_key(url) == key
+
+
+def test_product_unique_by_url_key(load_shops):
+    """Test database rejects the same product stored with url spelling
+    differing in trailing slash."""
+    Product.objects.create(shop_id=1, name='yope', url='/Produkt/figa')
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Product.objects.create(shop_id=1, name='yope', url='/Produkt/figa/')
+    assert Product.objects.get().url_key == '/Produkt/figa'
+
+
+def test_create_product_from_dict_last_seen(load_shops, scraped_products):
+    """Test product created from dictionary is marked as seen."""
+    prod = scraped_products(count=1)[0]
+    del prod['search_phrase']
+
+    product = utils.create_product_from_dict(prod)
+
+    assert product.last_seen is not None
+    assert Price.objects.get(product=product).price == 9.99
@@ -0,0 +1,19 @@
+from urllib.parse import urlsplit, urlunsplit
+
+
+def normalize_url(url: str) -> str:
+    """Normalizes spelling of product url. Lowercases scheme and host,
+    removes fragment. Trailing slash is kept, url is displayed as link to
+    the shop."""
+    scheme, netloc, path, query, _ = urlsplit(url.strip())
+    return urlunsplit((scheme.lower(), netloc.lower(), path, query, ''))
+
+
+def url_key(url: str) -> str:
+    """Returns identity of product url, so that the same product scraped
+    with different url spelling has one identity. Normalized url without
+    trailing slash."""
+    scheme, netloc, path, query, _ = urlsplit(normalize_url(url))
+    if path != '/':
+        path = path.rstrip('/')
+    return urlunsplit((scheme, netloc, path, query, ''))
@@ -1,8 +1,21 @@
-from typing import Dict, Union
+from datetime import date, datetime
+from typing import Dict, Union, List
 
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from libs.urls import normalize_url, url_key
 from shop.models import Shop
-from product.models import Product
+from product.models import Product, SearchRun, SearchRunItem
 from price.models import Price
+from price.history import record_price_points
+from product.matching import ProductMatcher
+
+
+# product fields filled with scraped data
+PRODUCT_FIELDS = ('name', 'description', 'size', 'image_url')
 
 
 def shop_data_exists() -> bool:
@@ -12,32 +25,171 @@ def shop_data_exists() -> bool:
 
 
 def product_exists(prod: Dict) -> Union['Product', None]:
-    """Checks if product with given name and url already exists.
+    """Checks if product with given shop and url already exists.
     If so, returns the product."""
-    try:
-        product = Product.objects.get(url=prod['url'])
-    except Product.DoesNotExist:
-        product = None
-    return product
+    return Product.objects.filter(shop_id=prod['shop_id'],
+                                  url_key=url_key(prod['url'])).first()
 
 
 def create_product_from_dict(prod: Dict) -> 'Product':
     """Creates Product in database based on given dictionary."""
     shop_id = prod.pop('shop_id')
     shop = Shop.objects.get(id=shop_id)
+    prod.pop('shop_name', None)
 
     price = prod.pop('price')
 
-    product = Product.objects.create(shop=shop, **prod)
-    Price.objects.create(price=price, product=product)
+    prod['url'] = normalize_url(prod['url'])
+    now = timezone.now()
+    product = Product.objects.create(shop=shop, last_seen=now, **prod)
+    price = Price.objects.create(price=price, product=product)
+    record_price_points([price], now)
+    ProductMatcher().assign_groups([product])
 
     return product
 
 
+def price_changed(price: 'Price', new_price: float) -> bool:
+    """Checks if scraped price differs from stored one by at least a
+    grosz."""
+    return round(price.price, 2) != round(new_price, 2)
+
+
 def update_product_price(product: 'Product', prod_dict: Dict) -> 'Product':
-    """Updates price of given product."""
-    product.price.price = prod_dict['price']
-    product.price.save()
+    """Updates price of given product. Unchanged price is not saved, so that
+    no history record is created."""
+    if price_changed(product.price, prod_dict['price']):
+        product.price.price = prod_dict['price']
+        product.price.save()
+        record_price_points([product.price], timezone.now())
 
     return product
 
+
+def save_products(products: List[Dict]) -> List[int]:
+    """Creates new products and updates prices of existing ones in single
+    transaction, using bulk queries. Unchanged prices are not written.
+    Products are identified by shop and url key, last scraped data wins.
+    Rows inserted at the same time by concurrent searches are skipped on
+    conflict. New products are assigned to product groups. Returns ids of
+    saved products."""
+    prods_by_key = {(prod['shop_id'], url_key(prod['url'])): prod
+                    for prod in products}
+    if not prods_by_key:
+        return []
+    shop_ids = {shop_id for shop_id, _ in prods_by_key}
+    keys = {key for _, key in prods_by_key}
+    last_seen = timezone.now()
+
+    def product_key(product: 'Product'):
+        return product.shop_id, product.url_key
+
+    with transaction.atomic():
+        existing_products = {
+            product_key(product): product
+            for product in Product.objects.select_related('price')
+            .filter(shop_id__in=shop_ids, url_key__in=keys)
+            if product_key(product) in prods_by_key
+        }
+        new_products = [
+            Product(shop_id=shop_id, url=normalize_url(prod['url']),
+                    url_key=key, last_seen=last_seen,
+                    **{field: prod[field] for field in PRODUCT_FIELDS})
+            for (shop_id, key), prod in prods_by_key.items()
+            if (shop_id, key) not in existing_products
+        ]
+        # sqlite does not return ids of bulk created rows, products are
+        # queried again
+        Product.objects.bulk_create(new_products, ignore_conflicts=True)
+        created_products = [
+            product for product in Product.objects.filter(
+                shop_id__in={product.shop_id for product in new_products},
+                url_key__in={product.url_key for product in new_products})
+            if product_key(product) in prods_by_key
+            and product_key(product) not in existing_products
+        ]
+
+        new_prices = [
+            Price(product=product,
+                  price=prods_by_key[product_key(product)]['price'])
+            for product in created_products]
+        updated_prices = []
+        for key, product in existing_products.items():
+            try:
+                price = product.price
+            except Price.DoesNotExist:
+                new_prices.append(Price(product=product,
+                                        price=prods_by_key[key]['price']))
+                continue
+            if price_changed(price, prods_by_key[key]['price']):
+                price.price = prods_by_key[key]['price']
+                price.date = date.today()
+                updated_prices.append(price)
+
+        if new_prices:
+            Price.objects.bulk_create(new_prices, ignore_conflicts=True)
+            Price.history.bulk_history_create(Price.objects.filter(
+                product__in=[price.product for price in new_prices]))
+        # unchanged prices are not written, only the time products were
+        # last seen is refreshed
+        if updated_prices:
+            bulk_update_with_history(updated_prices, Price,
+                                     ['price', 'date'])
+        record_price_points(new_prices + updated_prices, last_seen)
+        if existing_products:
+            Product.objects.filter(
+                id__in=[product.id for product in existing_products.values()]
+            ).update(last_seen=last_seen)
+        ProductMatcher().assign_groups(created_products)
+
+    saved_products = dict(existing_products)
+    saved_products.update((product_key(product), product)
+                          for product in created_products)
+    return [saved_products[key].id for key in prods_by_key]
+
+
+def create_search_run(search_phrases: List[str],
+                      product_ids: List[int]) -> 'SearchRun':
+    """Stores result set of search, ranked in order of given product ids.
+    Product found more than once is ranked by its first occurrence."""
+    with transaction.atomic():
+        run = SearchRun.objects.create(search_phrases=search_phrases)
+        SearchRunItem.objects.bulk_create(
+            [SearchRunItem(run=run, product_id=product_id, rank=rank)
+             for rank, product_id in enumerate(dict.fromkeys(product_ids))],
+            batch_size=500)
+    return run
+
+
+def extend_search_run(run: 'SearchRun', product_ids: List[int]) -> None:
+    """Appends products to search run, ranked after products already in
+    it. Products already in the run are skipped."""
+    with transaction.atomic():
+        items = SearchRunItem.objects.filter(run=run)
+        existing_ids = set(items.values_list('product_id', flat=True))
+        last_rank = items.aggregate(last_rank=Max('rank'))['last_rank']
+        new_ids = [product_id for product_id in dict.fromkeys(product_ids)
+                   if product_id not in existing_ids]
+        SearchRunItem.objects.bulk_create(
+            [SearchRunItem(run=run, product_id=product_id, rank=rank)
+             for rank, product_id in enumerate(
+                 new_ids, 0 if last_rank is None else last_rank + 1)],
+            batch_size=500)
+
+
+def rank_search_run(run: 'SearchRun', product_ids: List[int]) -> None:
+    """Replaces ranks of search run products with order of given product
+    ids."""
+    with transaction.atomic():
+        SearchRunItem.objects.filter(run=run).delete()
+        SearchRunItem.objects.bulk_create(
+            [SearchRunItem(run=run, product_id=product_id, rank=rank)
+             for rank, product_id in enumerate(dict.fromkeys(product_ids))],
+            batch_size=500)
+
+
+def prune_search_runs(before: datetime) -> int:
+    """Deletes search runs created before given time, with their items.
+    Returns number of deleted runs."""
+    _, deleted = SearchRun.objects.filter(created__lt=before).delete()
+    return deleted.get(SearchRun._meta.label, 0)
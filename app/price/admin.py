@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from price.models import Price
+from price.models import Price, PricePoint, PriceRollup
 
 
 admin.site.register(Price)
-
+admin.site.register(PricePoint)
+admin.site.register(PriceRollup)
@@ -0,0 +1,45 @@
+from typing import List, Sequence, Tuple
+
+
+Point = Tuple[float, float]
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Downsamples series of (x, y) points sorted by x to threshold points
+    with Largest-Triangle-Three-Buckets algorithm, which keeps visual shape
+    of the series. First and last points are always kept."""
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    # points between first and last are split into threshold - 2 buckets
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # average point of next bucket, last point for the last bucket
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        if next_start >= next_end:
+            next_start, next_end = len(points) - 1, len(points)
+        next_points = points[next_start:next_end]
+        avg_x = sum(x for x, _ in next_points) / len(next_points)
+        avg_y = sum(y for _, y in next_points) / len(next_points)
+
+        # point forming largest triangle with selected and average point
+        sel_x, sel_y = points[selected]
+        max_area = -1
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((sel_x - avg_x) * (y - sel_y)
+                       - (sel_x - x) * (avg_y - sel_y))
+            if area > max_area:
+                max_area = area
+                selected = index
+        sampled.append(points[selected])
+
+    sampled.append(points[-1])
+    return sampled
@@ -0,0 +1,136 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum, QuerySet
+from django.db.models.functions import TruncDay, TruncWeek
+
+from price.models import Price, PricePoint, PriceRollup, RollupPeriod
+
+
+TRUNC_FUNCTIONS = {RollupPeriod.DAY: TruncDay, RollupPeriod.WEEK: TruncWeek}
+
+
+def to_grosze(price: float) -> int:
+    """Converts price in zloty to integer number of grosze."""
+    return int(round(price * 100))
+
+
+def record_price_points(prices: Iterable['Price'],
+                        timestamp: datetime) -> None:
+    """Appends current value of given prices to price time series."""
+    PricePoint.objects.bulk_create([
+        PricePoint(product_id=price.product_id, timestamp=timestamp,
+                   price=to_grosze(price.price))
+        for price in prices
+    ])
+
+
+def get_price_series(product_ids: Iterable[int], start: datetime,
+                     end: datetime) -> Dict[int, List[Tuple[datetime, int]]]:
+    """Returns price series of given products between start and end time,
+    sorted by time. Compacted history is represented by average prices of
+    its rollups. Prices in grosze."""
+    product_ids = list(product_ids)
+    series = {product_id: [] for product_id in product_ids}
+
+    rollups = PriceRollup.objects.filter(
+        product_id__in=product_ids, period_start__gte=start,
+        period_start__lte=end
+    ).values_list('product_id', 'period_start', 'avg_price')
+    points = PricePoint.objects.filter(
+        product_id__in=product_ids, timestamp__gte=start, timestamp__lte=end
+    ).values_list('product_id', 'timestamp', 'price')
+
+    for product_id, timestamp, price in [*rollups, *points]:
+        series[product_id].append((timestamp, price))
+    for product_series in series.values():
+        product_series.sort()
+    return series
+
+
+def _store_rollups(buckets: Iterable[dict], period: str) -> None:
+    """Creates rollups of aggregated buckets. Bucket of already existing
+    rollup, compacted in earlier run, is merged into it."""
+    buckets = list(buckets)
+    existing = {
+        (rollup.product_id, rollup.period_start): rollup
+        for rollup in PriceRollup.objects.filter(
+            period=period,
+            product_id__in={bucket['product_id'] for bucket in buckets},
+            period_start__in={bucket['bucket_start'] for bucket in buckets})
+    }
+
+    new_rollups, merged_rollups = [], []
+    for bucket in buckets:
+        rollup = existing.get((bucket['product_id'], bucket['bucket_start']))
+        if rollup is None:
+            new_rollups.append(PriceRollup(
+                product_id=bucket['product_id'], period=period,
+                period_start=bucket['bucket_start'],
+                min_price=bucket['low'], max_price=bucket['high'],
+                avg_price=round(bucket['price_sum'] / bucket['points']),
+                count=bucket['points']))
+            continue
+
+        price_sum = rollup.avg_price * rollup.count + bucket['price_sum']
+        rollup.count += bucket['points']
+        rollup.min_price = min(rollup.min_price, bucket['low'])
+        rollup.max_price = max(rollup.max_price, bucket['high'])
+        rollup.avg_price = round(price_sum / rollup.count)
+        merged_rollups.append(rollup)
+
+    PriceRollup.objects.bulk_create(new_rollups)
+    PriceRollup.objects.bulk_update(
+        merged_rollups, ['min_price', 'max_price', 'avg_price', 'count'])
+
+
+def _aggregate(queryset: QuerySet, time_field: str, period: str,
+               **aggregates) -> QuerySet:
+    """Groups queryset rows by product and period of time field. Returns
+    bucket dictionaries with lowest, highest and summed price and number of
+    price points."""
+    trunc = TRUNC_FUNCTIONS[period]
+    return queryset.annotate(bucket_start=trunc(time_field)) \
+        .values('product_id', 'bucket_start') \
+        .annotate(**aggregates)
+
+
+def compact_price_points(before: datetime,
+                         period: str = RollupPeriod.DAY) -> int:
+    """Rolls price points older than given time into rollups of given
+    period and deletes them. Returns number of compacted points."""
+    with transaction.atomic():
+        points = PricePoint.objects.filter(timestamp__lt=before)
+        buckets = _aggregate(points, 'timestamp', period,
+                             low=Min('price'), high=Max('price'),
+                             price_sum=Sum('price'), points=Count('id'))
+        _store_rollups(buckets, period)
+        compacted, _ = points.delete()
+    return compacted
+
+
+def compact_daily_rollups(before: datetime) -> int:
+    """Rolls daily rollups starting before given time into weekly ones and
+    deletes them. Returns number of compacted rollups."""
+    with transaction.atomic():
+        rollups = PriceRollup.objects.filter(period=RollupPeriod.DAY,
+                                             period_start__lt=before)
+        buckets = _aggregate(
+            rollups, 'period_start', RollupPeriod.WEEK,
+            low=Min('min_price'), high=Max('max_price'),
+            price_sum=Sum(F('avg_price') * F('count')), points=Sum('count'))
+        _store_rollups(buckets, RollupPeriod.WEEK)
+        compacted, _ = rollups.delete()
+    return compacted
+
+
+def prune_price_history(before: datetime) -> int:
+    """Deletes historical records of prices older than given time, already
+    kept as price points and rollups. The latest record of each price is
+    kept. Returns number of deleted records."""
+    latest = Price.history.values('id').annotate(latest=Max('history_id')) \
+        .values('latest')
+    deleted, _ = Price.history.filter(history_date__lt=before) \
+        .exclude(history_id__in=latest).delete()
+    return deleted
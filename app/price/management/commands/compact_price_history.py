@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from price import history
+from price.models import RollupPeriod
+
+
+class Command(BaseCommand):
+    help = 'Rolls old price points into daily rollups and old daily ' \
+           'rollups into weekly ones. Deletes old price history records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.PRICE_POINTS_RETENTION_DAYS,
+                            help='Price points older than given number of '
+                                 'days are rolled up, price history records '
+                                 'are deleted.')
+        parser.add_argument('--period', choices=RollupPeriod.values,
+                            default=RollupPeriod.DAY,
+                            help='Period of rollups of price points.')
+        parser.add_argument('--daily-days', type=int,
+                            default=settings.PRICE_DAILY_ROLLUPS_RETENTION_DAYS,
+                            help='Daily rollups older than given number of '
+                                 'days are rolled up into weekly ones.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for compact_price_history command"""
+        now = timezone.now()
+
+        compacted = history.compact_price_points(
+            now - timedelta(days=options['days']), options['period'])
+        self.stdout.write(f'Compacted {compacted} price points')
+
+        pruned = history.prune_price_history(
+            now - timedelta(days=options['days']))
+        self.stdout.write(f'Deleted {pruned} price history records')
+
+        compacted = history.compact_daily_rollups(
+            now - timedelta(days=options['daily_days']))
+        self.stdout.write(f'Compacted {compacted} daily rollups')
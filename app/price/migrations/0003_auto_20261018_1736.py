@@ -0,0 +1,45 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_product_last_seen'),
+        ('price', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('min_price', models.IntegerField()),
+                ('max_price', models.IntegerField()),
+                ('avg_price', models.IntegerField()),
+                ('count', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='product.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PricePoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('price', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_points', to='product.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pricerollup',
+            constraint=models.UniqueConstraint(fields=('product', 'period', 'period_start'), name='unique_price_rollup_period'),
+        ),
+        migrations.AddIndex(
+            model_name='pricepoint',
+            index=models.Index(fields=['product', 'timestamp'], name='price_price_product_6bfdc5_idx'),
+        ),
+    ]
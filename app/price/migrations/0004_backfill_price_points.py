@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def backfill_price_points(apps, schema_editor):
+    """Copies price history of existing products to price time series."""
+    HistoricalPrice = apps.get_model('price', 'HistoricalPrice')
+    PricePoint = apps.get_model('price', 'PricePoint')
+    Product = apps.get_model('product', 'Product')
+
+    history = HistoricalPrice.objects.exclude(history_type='-').filter(
+        product_id__in=Product.objects.values('id'))
+    PricePoint.objects.bulk_create(
+        (PricePoint(product_id=record.product_id,
+                    timestamp=record.history_date,
+                    price=int(round(record.price * 100)))
+         for record in history.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price', '0003_auto_20261018_1736'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_price_points,
+                             migrations.RunPython.noop),
+    ]
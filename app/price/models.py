@@ -13,3 +13,47 @@ class Price(models.Model):
 
     def __str__(self):
         return f'{self.product.name} - {self.product.shop.shop_name} price'
+
+
+class PricePoint(models.Model):
+    """Product price observed at given time, in grosze. Compact time series
+    of recent price changes, older points are compacted to PriceRollup."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='price_points')
+    timestamp = models.DateTimeField()
+    price = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['product', 'timestamp'])]
+
+    def __str__(self):
+        return f'{self.product_id} {self.timestamp}: {self.price}'
+
+
+class RollupPeriod(models.TextChoices):
+    DAY = 'day'
+    WEEK = 'week'
+
+
+class PriceRollup(models.Model):
+    """Minimum, maximum and average price of a product in a day or week,
+    in grosze"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='price_rollups')
+    period = models.CharField(choices=RollupPeriod.choices, max_length=10)
+    period_start = models.DateTimeField()
+    min_price = models.IntegerField()
+    max_price = models.IntegerField()
+    avg_price = models.IntegerField()
+    # number of price points aggregated in the rollup
+    count = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'period', 'period_start'],
+                name='unique_price_rollup_period'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.period} {self.period_start}'
@@ -0,0 +1,25 @@
+import math
+
+from price.downsampling import lttb
+
+
+def test_lttb_keeps_short_series():
+    """Test series not longer than threshold is returned unchanged."""
+    points = [(0, 1), (1, 2), (2, 3)]
+
+    assert lttb(points, 3) == points
+    assert lttb(points, 10) == points
+
+
+def test_lttb_downsamples_to_threshold():
+    """Test series is downsampled to threshold points with first, last and
+    extreme points kept."""
+    points = [(x, math.sin(x / 10)) for x in range(1000)]
+    points[500] = (500, 100)
+
+    sampled = lttb(points, 50)
+
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (500, 100) in sampled
+    assert [x for x, _ in sampled] == sorted(x for x, _ in sampled)
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from django.urls import reverse
+from django.utils import timezone
+
+from price.models import PricePoint, PriceRollup, RollupPeriod
+from product.models import Product, ProductGroup
+from shop.models import Shop
+
+
+@pytest.fixture
+def products(load_shops):
+    """Creates group of products with price history of last 1000 hours."""
+    group = ProductGroup.objects.create(product_group='yope figa')
+    products = [Product.objects.create(name='yope figa', url='/figa',
+                                       shop=shop, product_group=group)
+                for shop in Shop.objects.order_by('id')[:2]]
+    now = timezone.now()
+    PricePoint.objects.bulk_create([
+        PricePoint(product=products[0], timestamp=now - timedelta(hours=i),
+                   price=2000 + i % 100)
+        for i in range(1000)])
+    PriceRollup.objects.create(
+        product=products[0], period=RollupPeriod.DAY,
+        period_start=now - timedelta(days=100), min_price=1800,
+        max_price=2200, avg_price=1999, count=5)
+    return products
+
+
+def test_product_price_history_downsampled(client, products):
+    """Test product price series is downsampled to requested points."""
+    url = reverse('price:product-price-history', args=[products[0].id])
+
+    response = client.get(url, {'points': 100})
+
+    data = response.json()
+    points = data['products'][0]['points']
+    assert len(points) == 100
+    assert points[0][1] == 19.99
+    assert datetime.fromisoformat(points[0][0]) < \
+        datetime.fromisoformat(points[1][0])
+
+
+def test_product_price_history_date_range(client, products):
+    """Test only prices between start and end date are returned."""
+    today = timezone.localdate()
+    url = reverse('price:product-price-history', args=[products[0].id])
+
+    response = client.get(url, {'start': str(today - timedelta(days=2)),
+                                'end': str(today), 'points': 2000})
+
+    points = response.json()['products'][0]['points']
+    assert 24 < len(points) <= 72
+
+
+def test_product_group_price_history(client, products):
+    """Test price series of all group products are returned."""
+    url = reverse('price:product-group-price-history',
+                  args=[products[0].product_group_id])
+
+    data = client.get(url).json()
+
+    assert [product['id'] for product in data['products']] == \
+        [product.id for product in products]
+    assert len(data['products'][0]['points']) == 300
+    assert data['products'][1]['points'] == []
+
+
+@pytest.mark.parametrize('params', [
+    {'points': 'many'}, {'points': 1}, {'start': '2022-13-01'},
+    {'start': '2022-02-01', 'end': '2022-01-01'},
+])
+def test_price_history_invalid_params(client, products, params):
+    """Test invalid query parameters are rejected."""
+    url = reverse('price:product-price-history', args=[products[0].id])
+
+    response = client.get(url, params)
+
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+def test_price_history_not_found(client, db):
+    """Test history of missing product is not found."""
+    response = client.get(reverse('price:product-price-history', args=[1]))
+
+    assert response.status_code == 404
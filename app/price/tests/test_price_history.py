@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+from django.core.management import call_command
+
+from libs import utils
+from price import history
+from price.models import Price, PricePoint, PriceRollup, RollupPeriod
+from product.models import Product
+from shop.models import Shop
+
+
+def at(day, hour=12):
+    """Returns time of given day of January 2022."""
+    return datetime(2022, 1, day, hour, tzinfo=timezone.utc)
+
+
+def create_points(product, points):
+    """Creates price points of product from (time, price) pairs."""
+    PricePoint.objects.bulk_create([
+        PricePoint(product=product, timestamp=timestamp, price=price)
+        for timestamp, price in points])
+
+
+def create_product():
+    return Product.objects.create(
+        name='yope figa', url='/Produkt/figa',
+        shop=Shop.objects.get(shop_name='rossman'))
+
+
+def test_save_products_records_price_points(load_shops):
+    """Test new and changed prices are recorded in grosze."""
+    product = {'shop_id': 1, 'name': 'yope figa', 'description': '',
+               'size': '', 'image_url': '', 'url': '/Produkt/figa'}
+    for price in [21.99, 21.99, 19.49]:
+        utils.save_products([dict(product, price=price)])
+
+    assert list(PricePoint.objects.order_by('id')
+                .values_list('price', flat=True)) == [2199, 1949]
+
+
+def test_compact_price_points(load_shops):
+    """Test old price points are rolled up per day and merged with rollups
+    of earlier compaction."""
+    product = create_product()
+    create_points(product, [(at(1, 8), 1000), (at(1, 16), 2000),
+                            (at(2), 1500), (at(3), 1200)])
+    history.compact_price_points(at(1, 12))
+
+    assert history.compact_price_points(at(3)) == 2
+
+    rollups = PriceRollup.objects.order_by('period_start').values_list(
+        'period_start', 'min_price', 'max_price', 'avg_price', 'count')
+    assert list(rollups) == [(at(1, 0), 1000, 2000, 1500, 2),
+                             (at(2, 0), 1500, 1500, 1500, 1)]
+    assert PricePoint.objects.get().timestamp == at(3)
+
+
+def test_compact_daily_rollups(load_shops):
+    """Test daily rollups are rolled up per week with weighted average."""
+    product = create_product()
+    # 3rd and 4th January 2022 are in the same week
+    create_points(product, [(at(3), 1000), (at(3, 13), 1000), (at(4), 2500),
+                            (at(10), 3000)])
+    history.compact_price_points(at(11))
+
+    assert history.compact_daily_rollups(at(11)) == 3
+
+    rollups = PriceRollup.objects.order_by('period_start').values_list(
+        'period', 'period_start', 'min_price', 'max_price', 'avg_price',
+        'count')
+    assert list(rollups) == [
+        (RollupPeriod.WEEK, at(3, 0), 1000, 2500, 1500, 3),
+        (RollupPeriod.WEEK, at(10, 0), 3000, 3000, 3000, 1)]
+
+
+def test_compact_price_history_command(load_shops, capsys):
+    """Test command compacts points and rollups older than given days."""
+    product = create_product()
+    create_points(product, [(at(1), 1000), (at(2), 2000)])
+
+    call_command('compact_price_history', '--days', '30')
+
+    assert PricePoint.objects.count() == 0
+    assert PriceRollup.objects.filter(period=RollupPeriod.WEEK).count() == 1
+    assert 'Compacted 2 price points' in capsys.readouterr().out
+
+
+def test_prune_price_history(load_shops):
+    """Test old price history records are deleted, except the latest record
+    of each price."""
+    product = create_product()
+    price = Price.objects.create(product=product, price=9.99)
+    for new_price in [8.99, 7.99]:
+        price.price = new_price
+        price.save()
+    Price.history.update(history_date=at(1))
+    price.price = 6.99
+    price.save()
+
+    assert history.prune_price_history(at(2)) == 3
+    assert list(Price.history.values_list('price', flat=True)) == [6.99]
+
+    Price.history.update(history_date=at(1))
+    assert history.prune_price_history(at(2)) == 0
@@ -0,0 +1,12 @@
+from django.urls import path
+from price import views
+
+app_name = 'price'
+urlpatterns = [
+    path('api/products/<int:pk>/price-history',
+         views.ProductPriceHistoryView.as_view(),
+         name='product-price-history'),
+    path('api/product-groups/<int:pk>/price-history',
+         views.ProductGroupPriceHistoryView.as_view(),
+         name='product-group-price-history'),
+]
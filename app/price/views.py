@@ -0,0 +1,104 @@
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Tuple
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views import View
+
+from price.downsampling import lttb
+from price.history import get_price_series
+from product.models import Product, ProductGroup
+
+
+class PriceHistoryView(View):
+    """Returns price series of products as json, downsampled to requested
+    number of points. Query parameters:
+    start, end - dates of series range (YYYY-MM-DD), last year by default
+    points - maximum number of points per product series"""
+    default_days = 365
+    default_points = 300
+    max_points = 2000
+
+    def get_products(self, pk: int) -> List[Product]:
+        raise NotImplementedError('Method must be implemented')
+
+    def get(self, request, pk):
+        try:
+            start, end, max_points = self.parse_params(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        products = self.get_products(pk)
+        series = get_price_series([product.id for product in products],
+                                  start, end)
+        return JsonResponse({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'products': [self.serialize(product, series[product.id],
+                                        max_points)
+                         for product in products],
+        })
+
+    def parse_params(self, params: Dict) -> Tuple[datetime, datetime, int]:
+        """Validates date range and number of points."""
+        today = timezone.localdate()
+        start = self.parse_date(params.get('start'),
+                                today - timedelta(days=self.default_days))
+        end = self.parse_date(params.get('end'), today)
+        if start > end:
+            raise ValueError('start must not be later than end')
+
+        try:
+            max_points = int(params.get('points', self.default_points))
+        except ValueError:
+            raise ValueError('points must be a number')
+        if not 3 <= max_points <= self.max_points:
+            raise ValueError(f'points must be between 3 and {self.max_points}')
+
+        start = timezone.make_aware(datetime.combine(start, time.min))
+        end = timezone.make_aware(datetime.combine(end, time.max))
+        return start, end, max_points
+
+    @staticmethod
+    def parse_date(value, default):
+        if value is None:
+            return default
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise ValueError(f'invalid date: {value}')
+        return date
+
+    @staticmethod
+    def serialize(product: Product, series: list, max_points: int) -> Dict:
+        points = lttb([(timestamp.timestamp(), price)
+                       for timestamp, price in series], max_points)
+        return {
+            'id': product.id,
+            'name': product.name,
+            'shop': product.shop.shop_name,
+            'points': [
+                [datetime.fromtimestamp(x, timezone.utc).isoformat(),
+                 round(price / 100, 2)]
+                for x, price in points
+            ],
+        }
+
+
+class ProductPriceHistoryView(PriceHistoryView):
+    """Price history of single product."""
+    def get_products(self, pk):
+        return [get_object_or_404(Product.objects.select_related('shop'),
+                                  pk=pk)]
+
+
+class ProductGroupPriceHistoryView(PriceHistoryView):
+    """Price histories of all products of product group."""
+    def get_products(self, pk):
+        group = get_object_or_404(ProductGroup, pk=pk)
+        return list(group.product_groups.select_related('shop')
+                    .order_by('id'))
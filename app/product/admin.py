@@ -1,6 +1,11 @@
 from django.contrib import admin
 
-from product.models import Product
+from product.models import (Product, ProductGroup, SearchJob, SearchRun,
+                            TrackedSearch)
 
 
 admin.site.register(Product)
+admin.site.register(ProductGroup)
+admin.site.register(SearchJob)
+admin.site.register(SearchRun)
+admin.site.register(TrackedSearch)
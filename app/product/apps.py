@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(sender, using, **kwargs):
+    """Recreates triggers of full-text index after migrations which remade
+    product table."""
+    from product.search_index import ensure_index_triggers
+
+    ensure_index_triggers(using)
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'product'
+
+    def ready(self):
+        post_migrate.connect(restore_search_index, sender=self)
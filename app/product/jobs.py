@@ -0,0 +1,147 @@
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from libs import search_cache, utils
+from product import refresh
+from product.models import SearchJob, SearchJobStatus
+from scrapper.web_scrapper import Scrapper
+
+
+def enqueue_search(search_phrases: List[str]) -> SearchJob:
+    """Queues search for background scrapping. Returns job already queued
+    or running for the same phrases, if there is one."""
+    phrases_key = search_cache.cache_key(search_phrases)
+    with transaction.atomic():
+        job = SearchJob.objects.filter(
+            phrases_key=phrases_key,
+            status__in=[SearchJobStatus.PENDING, SearchJobStatus.RUNNING]
+        ).order_by('created').first()
+        if job is None:
+            job = SearchJob.objects.create(search_phrases=search_phrases,
+                                           phrases_key=phrases_key)
+    return job
+
+
+aenqueue_search = sync_to_async(enqueue_search)
+
+
+def requeue_stalled_jobs() -> int:
+    """Returns jobs of workers which stopped responding to the queue. Jobs
+    which stalled in all SEARCH_JOB_MAX_ATTEMPTS attempts are failed with
+    products found so far. Returns number of requeued jobs."""
+    stalled_since = timezone.now() - timedelta(
+        seconds=settings.SEARCH_JOB_TIMEOUT)
+    stalled = SearchJob.objects.filter(status=SearchJobStatus.RUNNING,
+                                       started__lt=stalled_since)
+    for job in stalled.filter(
+            attempts__gte=settings.SEARCH_JOB_MAX_ATTEMPTS):
+        finish_job(job, SearchJobStatus.FAILED,
+                   [f'Search stalled in {job.attempts} attempts'])
+    return stalled.update(status=SearchJobStatus.PENDING, worker='',
+                          started=None)
+
+
+def prune_finished_jobs(before: datetime) -> int:
+    """Deletes jobs finished before given time. Returns number of deleted
+    jobs."""
+    deleted, _ = SearchJob.objects.filter(finished__lt=before).delete()
+    return deleted
+
+
+def claim_next_job(worker: str) -> Union[SearchJob, None]:
+    """Atomically marks oldest pending job as running by given worker.
+    Returns claimed job or None if queue is empty."""
+    while True:
+        job_id = SearchJob.objects.filter(
+            status=SearchJobStatus.PENDING
+        ).order_by('created').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        # conditional update, only one worker can claim the job
+        claimed = SearchJob.objects.filter(
+            id=job_id, status=SearchJobStatus.PENDING
+        ).update(status=SearchJobStatus.RUNNING, worker=worker,
+                 started=timezone.now(), attempts=F('attempts') + 1)
+        if claimed:
+            return SearchJob.objects.get(id=job_id)
+
+
+def _sort_keys(products: List[Dict],
+               product_ids: List[int]) -> Iterator[Tuple[int, Tuple]]:
+    """Yields ids of saved products of single shop with sort keys of their
+    scraped products. Products are saved once per url key, in order of
+    first occurrence."""
+    keys = dict.fromkeys(utils.url_key(prod['url']) for prod in products)
+    ids_by_key = dict(zip(keys, product_ids))
+    for prod in products:
+        yield ids_by_key[utils.url_key(prod['url'])], Scrapper._sort_key(prod)
+
+
+def _rank_run(job: SearchJob, sort_keys: Dict[int, Tuple]) -> None:
+    """Ranks products of job search run in the same order as sequential
+    search, instead of order in which shops were searched. Products
+    without sort key keep their order after the sorted ones."""
+    product_ids = job.run.items.order_by('rank') \
+        .values_list('product_id', flat=True)
+    utils.rank_search_run(job.run, sorted(
+        product_ids, key=lambda product_id: (product_id not in sort_keys,
+                                             sort_keys.get(product_id, ()))))
+
+
+def run_job(job: SearchJob) -> SearchJob:
+    """Scrapes shops for job search phrases. Products found in each shop
+    are added to search run of the job as soon as the shop is searched, so
+    that they can be displayed before the whole search is finished. Run is
+    sorted by search phrase, name and shop once the job is finished."""
+    if job.run is None:
+        job.run = utils.create_search_run(job.search_phrases, [])
+        job.save(update_fields=['run'])
+
+    errors = []
+    sort_keys = {}
+    try:
+        for result, product_ids in search_cache.iter_search_and_save(
+                job.search_phrases):
+            if result.error is not None:
+                errors.append(f'{result.shop.shop_name} '
+                              f'"{result.phrase}": {result.error!r}')
+            else:
+                refresh.mark_refreshed(result.phrase, result.shop.shop_id)
+            if product_ids:
+                utils.extend_search_run(job.run, product_ids)
+                for product_id, sort_key in _sort_keys(result.products,
+                                                       product_ids):
+                    sort_keys[product_id] = min(
+                        sort_keys.get(product_id, sort_key), sort_key)
+        job.status = SearchJobStatus.DONE
+    except Exception:
+        errors.append(traceback.format_exc())
+        job.status = SearchJobStatus.FAILED
+
+    # ranks are replaced together with job status, so that stream of job
+    # results does not read them half replaced
+    with transaction.atomic():
+        _rank_run(job, sort_keys)
+        return finish_job(job, job.status, errors)
+
+
+def finish_job(job: SearchJob, status: str, errors: List[str]) -> SearchJob:
+    """Stores final status of job and caches its search run."""
+    if job.run is None:
+        job.run = utils.create_search_run(job.search_phrases, [])
+    # results with failed shops are displayed, but not cached
+    if not errors:
+        search_cache.set_cached_search(job.search_phrases, job.run_id)
+    job.status = status
+    job.error = '\n'.join(errors)
+    job.finished = timezone.now()
+    job.save(update_fields=['run', 'status', 'error', 'finished'])
+    return job
@@ -28,10 +28,8 @@ class Command(BaseCommand):
         if not products:
             return
 
-        for prod in products:
-            if not utils.product_exists(prod):
-                self.stdout.write('Inserting product...')
-                utils.create_product_from_dict(prod)
+        self.stdout.write(f'Saving {len(products)} products...')
+        utils.save_products(products)
         self.stdout.write('Data load complete!')
 
 
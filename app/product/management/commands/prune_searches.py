@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from libs import utils
+from product import jobs
+
+
+class Command(BaseCommand):
+    help = 'Deletes old search runs with their results and finished ' \
+           'search jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.SEARCH_RUN_RETENTION_DAYS,
+                            help='Search runs and jobs older than given '
+                                 'number of days are deleted.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for prune_searches command"""
+        before = timezone.now() - timedelta(days=options['days'])
+
+        deleted = jobs.prune_finished_jobs(before)
+        self.stdout.write(f'Deleted {deleted} search jobs')
+
+        deleted = utils.prune_search_runs(before)
+        self.stdout.write(f'Deleted {deleted} search runs')
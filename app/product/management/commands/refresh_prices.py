@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from product.refresh import get_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Refreshes prices of searched phrases, the most stale, popular ' \
+           'and volatile first, within scraping budget of each shop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=10.0,
+                            help='Seconds to wait between scheduling rounds.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit after single scheduling round.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for refresh_prices command"""
+        scheduler = get_scheduler()
+        self.stdout.write('Price refresh scheduler started')
+
+        while True:
+            close_old_connections()
+            refreshed = scheduler.run_once()
+            if refreshed:
+                self.stdout.write(f'Refreshed {refreshed} searches')
+            for error in scheduler.errors:
+                self.stderr.write(error)
+            scheduler.errors.clear()
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from product.matching import regroup_products
+
+
+class Command(BaseCommand):
+    help = 'Matches the whole product catalog into product groups again.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of products matched at once.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for regroup_products command"""
+        groups = regroup_products(options['batch_size'])
+        self.stdout.write(f'Created {groups} product groups')
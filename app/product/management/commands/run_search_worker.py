@@ -0,0 +1,38 @@
+import os
+import time
+import socket
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from product import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs worker scrapping shops for queued product searches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for run_search_worker command"""
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Search worker {worker} started')
+
+        while True:
+            close_old_connections()
+            jobs.requeue_stalled_jobs()
+            job = jobs.claim_next_job(worker)
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Searching for: {job.search_phrases}')
+            job = jobs.run_job(job)
+            self.stdout.write(f'Job {job.id} {job.status}')
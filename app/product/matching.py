@@ -0,0 +1,234 @@
+import re
+import random
+import hashlib
+from typing import Dict, FrozenSet, Iterable, List, Set, Union
+
+from django.db import transaction
+
+from product.models import Product, ProductGroup, ProductSignatureBand
+from scrapper.phrase_matcher import fold_diacritics
+
+
+# MinHash signature is split into BANDS bands of ROWS rows. Products with
+# Jaccard similarity s share at least one band with probability
+# 1 - (1 - s^ROWS)^BANDS, over 0.9 for s = 0.4
+BANDS = 16
+ROWS = 2
+# minimal Jaccard similarity of tokens of products in the same group
+SIMILARITY_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rand = random.Random(1)
+_PERMUTATIONS = [(_rand.randrange(1, _MERSENNE_PRIME),
+                  _rand.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(BANDS * ROWS)]
+
+TOKEN_RE = re.compile(r'[a-z0-9]+(?:[.,][0-9]+)?')
+SIZE_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(ml|l|g|kg|szt)\b')
+SIZE_UNITS = {'l': ('ml', 1000), 'kg': ('g', 1000)}
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and strips diacritics."""
+    return fold_diacritics(text.lower())
+
+
+def normalize_size(size: str) -> str:
+    """Converts size to base unit, so that 0,3 l and 300ml are equal."""
+    match = SIZE_RE.search(normalize_text(size))
+    if match is None:
+        return normalize_text(size).strip()
+    value, unit = float(match.group(1).replace(',', '.')), match.group(2)
+    unit, factor = SIZE_UNITS.get(unit, (unit, 1))
+    return f'{value * factor:g}{unit}'
+
+
+def product_tokens(product: Product) -> FrozenSet[str]:
+    """Returns set of normalized tokens of product name and description,
+    sizes mentioned in them are removed."""
+    text = SIZE_RE.sub(' ', normalize_text(
+        f'{product.name} {product.description}'))
+    return frozenset(TOKEN_RE.findall(text))
+
+
+def _token_hash(token: str) -> int:
+    """Stable 64-bit hash of token, independent of PYTHONHASHSEED."""
+    return int.from_bytes(
+        hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big')
+
+
+def band_keys(tokens: Iterable[str]) -> List[str]:
+    """Returns keys of bands of MinHash signature of tokens."""
+    hashes = [_token_hash(token) for token in tokens]
+    if not hashes:
+        return []
+    signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+                 for a, b in _PERMUTATIONS]
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8)
+        keys.append(f'{band}:{digest.hexdigest()}')
+    return keys
+
+
+def jaccard(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class ProductMatcher:
+    """Assigns products to groups of the same product sold by other shops.
+    Candidates are found with locality sensitive hashing of MinHash
+    signatures stored per product, so each product is compared only with
+    products sharing a signature band, not with the whole catalog."""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+
+    def assign_groups(self, products: List[Product]) -> None:
+        """Stores signatures of given products and assigns them to groups
+        of the most similar products of other shops. New group is created
+        when matching product has none."""
+        products = [product for product in products
+                    if product.product_group_id is None]
+        if not products:
+            return
+
+        keys = {product.id: band_keys(product_tokens(product))
+                for product in products}
+        batch_ids = set(keys)
+
+        with transaction.atomic():
+            # products of earlier batches sharing any band
+            index: Dict[str, Set[int]] = {}
+            for product_id, key in ProductSignatureBand.objects.filter(
+                    key__in={key for product_keys in keys.values()
+                             for key in product_keys}
+            ).exclude(product_id__in=batch_ids).values_list('product_id',
+                                                            'key'):
+                index.setdefault(key, set()).add(product_id)
+            candidates = {product.id: product for product in Product.objects
+                          .filter(id__in={product_id for ids in index.values()
+                                          for product_id in ids})}
+            group_shops = self._group_shops(candidates.values())
+
+            changed, new_groups = [], []
+            for product in products:
+                match = self._best_match(product, keys[product.id], index,
+                                         candidates, group_shops)
+                if match is not None:
+                    self._join(product, match, group_shops, changed,
+                               new_groups)
+
+                # products of the batch are matched with each other too
+                for key in keys[product.id]:
+                    index.setdefault(key, set()).add(product.id)
+                candidates[product.id] = product
+
+            ProductSignatureBand.objects.bulk_create(
+                [ProductSignatureBand(product_id=product_id, key=key)
+                 for product_id, product_keys in keys.items()
+                 for key in product_keys])
+            self._create_groups(new_groups)
+            for product in changed:
+                # refreshes group id of product from created group
+                product.product_group = product.product_group
+            Product.objects.bulk_update(changed, ['product_group'])
+
+    @staticmethod
+    def _create_groups(groups: List[ProductGroup]) -> None:
+        """Inserts new groups with one query and sets their ids."""
+        if not groups:
+            return
+        ProductGroup.objects.bulk_create(groups)
+        if groups[0].pk is None:
+            # sqlite does not return ids of bulk created rows, they are the
+            # last ids, as table is locked until end of transaction
+            group_ids = ProductGroup.objects.order_by('-id') \
+                .values_list('id', flat=True)[:len(groups)]
+            for group, group_id in zip(groups, list(group_ids)[::-1]):
+                group.pk = group_id
+
+    @staticmethod
+    def _group_key(product: Product) -> Union[int, None]:
+        """Returns key of product group in group shops. Groups created in
+        the batch are not saved yet and are keyed by their identity."""
+        if product.product_group_id is not None:
+            return product.product_group_id
+        if product.product_group is None:
+            return None
+        return id(product.product_group)
+
+    @staticmethod
+    def _group_shops(products: Iterable[Product]) -> Dict[int, Set[int]]:
+        """Returns shops of products of groups of given products."""
+        group_ids = {product.product_group_id for product in products
+                     if product.product_group_id is not None}
+        group_shops = {}
+        for group_id, shop_id in Product.objects.filter(
+                product_group_id__in=group_ids
+        ).values_list('product_group_id', 'shop_id'):
+            group_shops.setdefault(group_id, set()).add(shop_id)
+        return group_shops
+
+    def _best_match(self, product: Product, keys: List[str],
+                    index: Dict[str, Set[int]],
+                    candidates: Dict[int, Product],
+                    group_shops: Dict[int, Set[int]]
+                    ) -> Union[Product, None]:
+        """Returns the most similar product of other shop which can share
+        group with given product, None if there is no such product."""
+        tokens = product_tokens(product)
+        size = normalize_size(product.size)
+        best, best_similarity = None, self.threshold
+        for candidate_id in {candidate_id for key in keys
+                             for candidate_id in index.get(key, ())}:
+            candidate = candidates[candidate_id]
+            if candidate.shop_id == product.shop_id \
+                    or normalize_size(candidate.size) != size \
+                    or product.shop_id in group_shops.get(
+                        self._group_key(candidate), ()):
+                continue
+            similarity = jaccard(tokens, product_tokens(candidate))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def _join(self, product: Product, match: Product,
+              group_shops: Dict[int, Set[int]], changed: List[Product],
+              new_groups: List[ProductGroup]) -> None:
+        """Adds product to group of matching product. Group is created
+        with the other new groups of the batch, if it does not exist
+        yet."""
+        if self._group_key(match) is None:
+            match.product_group = ProductGroup(
+                product_group=match.name[:255])
+            new_groups.append(match.product_group)
+            group_shops[self._group_key(match)] = {match.shop_id}
+            changed.append(match)
+        product.product_group = match.product_group
+        group_shops[self._group_key(match)].add(product.shop_id)
+        changed.append(product)
+
+
+def regroup_products(batch_size: int = 1000) -> int:
+    """Removes all product groups and signatures and matches the whole
+    catalog again. Returns number of created groups."""
+    with transaction.atomic():
+        ProductSignatureBand.objects.all().delete()
+        Product.objects.update(product_group=None)
+        ProductGroup.objects.all().delete()
+
+        matcher = ProductMatcher()
+        products = Product.objects.order_by('id')
+        last_id = 0
+        while True:
+            batch = list(products.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            matcher.assign_groups(batch)
+            last_id = batch[-1].id
+
+    return ProductGroup.objects.count()
@@ -0,0 +1,73 @@
+from urllib.parse import urlsplit, urlunsplit
+
+from django.db import migrations, models
+
+
+def normalize_url(url):
+    """Copy of libs.utils.normalize_url at the time of migration."""
+    scheme, netloc, path, query, _ = urlsplit(url.strip())
+    return urlunsplit((scheme.lower(), netloc.lower(), path, query, ''))
+
+
+def url_key(url):
+    """Copy of libs.utils.url_key at the time of migration."""
+    scheme, netloc, path, query, _ = urlsplit(normalize_url(url))
+    if path != '/':
+        path = path.rstrip('/')
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def merge_duplicate_products(apps, schema_editor):
+    """Merges products with the same shop and url key into the oldest
+    one. Keeper gets the most recently updated price and favorites of its
+    duplicates, and its url key is stored."""
+    Product = apps.get_model('product', 'Product')
+    Price = apps.get_model('price', 'Price')
+    Favorite = apps.get_model('user', 'Favorite')
+
+    products_by_key = {}
+    for product in Product.objects.order_by('id'):
+        key = (product.shop_id, url_key(product.url))
+        products_by_key.setdefault(key, []).append(product)
+
+    for products in products_by_key.values():
+        keeper, duplicates = products[0], products[1:]
+        if duplicates:
+            latest_price = Price.objects.filter(product__in=products) \
+                .order_by('-date', '-id').first()
+            if latest_price is not None \
+                    and latest_price.product_id != keeper.id:
+                Price.objects.filter(product=keeper).delete()
+                latest_price.product = keeper
+                latest_price.save(update_fields=['product'])
+
+            for favorite in Favorite.objects.filter(
+                    product_id__in=duplicates).distinct():
+                favorite.product_id.add(keeper)
+
+            Product.objects.filter(
+                id__in=[product.id for product in duplicates]).delete()
+
+        keeper.url = normalize_url(keeper.url)
+        keeper.url_key = url_key(keeper.url)
+        keeper.save(update_fields=['url', 'url_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_searchjob'),
+        ('price', '0002_initial'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='url_key',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_duplicate_products,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_merge_duplicate_products'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('shop', 'url_key'), name='unique_product_shop_url'),
+        ),
+    ]
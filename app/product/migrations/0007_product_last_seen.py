@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0006_product_unique_product_shop_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='last_seen',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
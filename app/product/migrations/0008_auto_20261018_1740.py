@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_product_last_seen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('search_phrases', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchRunItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_run_items', to='product.product')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='product.searchrun')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='searchrun',
+            name='products',
+            field=models.ManyToManyField(related_name='search_runs', through='product.SearchRunItem', to='product.Product'),
+        ),
+        migrations.AddField(
+            model_name='searchjob',
+            name='run',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='product.searchrun'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchrunitem',
+            constraint=models.UniqueConstraint(fields=('run', 'rank'), name='unique_search_run_rank'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0008_auto_20261018_1740'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=40)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='product.product')),
+            ],
+        ),
+    ]
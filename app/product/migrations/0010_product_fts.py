@@ -0,0 +1,70 @@
+from django.db import migrations
+
+
+def fold(column: str) -> str:
+    """SQL expression of column without polish letter l with stroke, which
+    unicode61 tokenizer does not fold with other diacritics."""
+    return f"replace(replace({column}, 'ł', 'l'), 'Ł', 'L')"
+
+
+def values(row: str) -> str:
+    return ', '.join(fold(f'{row}.{column}')
+                     for column in ('name', 'description', 'size'))
+
+
+# contentless full-text index of product name, description and size, kept
+# in sync with product_product rows by triggers
+CREATE_INDEX = [
+    """CREATE VIRTUAL TABLE product_product_fts USING fts5(
+        name, description, size, content='',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER product_product_fts_insert
+        AFTER INSERT ON product_product BEGIN
+        INSERT INTO product_product_fts(rowid, name, description, size)
+        VALUES (new.id, {values('new')});
+    END""",
+    f"""CREATE TRIGGER product_product_fts_delete
+        AFTER DELETE ON product_product BEGIN
+        INSERT INTO product_product_fts(product_product_fts, rowid, name,
+                                        description, size)
+        VALUES ('delete', old.id, {values('old')});
+    END""",
+    f"""CREATE TRIGGER product_product_fts_update
+        AFTER UPDATE OF name, description, size ON product_product BEGIN
+        INSERT INTO product_product_fts(product_product_fts, rowid, name,
+                                        description, size)
+        VALUES ('delete', old.id, {values('old')});
+        INSERT INTO product_product_fts(rowid, name, description, size)
+        VALUES (new.id, {values('new')});
+    END""",
+    f"""INSERT INTO product_product_fts(rowid, name, description, size)
+        SELECT id, {values('product_product')} FROM product_product""",
+]
+DROP_INDEX = [
+    'DROP TRIGGER IF EXISTS product_product_fts_insert',
+    'DROP TRIGGER IF EXISTS product_product_fts_delete',
+    'DROP TRIGGER IF EXISTS product_product_fts_update',
+    'DROP TABLE IF EXISTS product_product_fts',
+]
+
+
+def run_sql(statements):
+    """Executes statements on sqlite only, other databases are searched
+    without the index."""
+    def _run_sql(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return _run_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0009_productsignatureband'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(CREATE_INDEX), run_sql(DROP_INDEX)),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0001_initial'),
+        ('product', '0010_product_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrase', models.CharField(max_length=255)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('last_searched', models.DateTimeField(null=True)),
+                ('last_refreshed', models.DateTimeField(null=True)),
+                ('volatility', models.FloatField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracked_searches', to='shop.shop')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='trackedsearch',
+            constraint=models.UniqueConstraint(fields=('phrase', 'shop'), name='unique_tracked_search'),
+        ),
+    ]
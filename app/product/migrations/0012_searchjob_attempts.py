@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0011_trackedsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
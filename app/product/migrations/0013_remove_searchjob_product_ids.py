@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_searchjob_attempts'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='searchjob',
+            name='product_ids',
+        ),
+    ]
@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 
+from libs.urls import url_key
 from shop.models import Shop
 
 
@@ -15,19 +18,126 @@ class Product(models.Model):
     size = models.CharField(max_length=100)
     image_url = models.CharField(max_length=255)
     url = models.CharField(max_length=255)
+    # identity of url, set on save, see libs.urls.url_key
+    url_key = models.CharField(max_length=255)
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE,
                              related_name='shops')
     product_group = models.ForeignKey(ProductGroup, null=True,
                                       on_delete=models.DO_NOTHING,
                                       related_name='product_groups')
+    # last time product was found by scrapper
+    last_seen = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            # url is stored normalized, products are identified by url
+            # without trailing slash
+            models.UniqueConstraint(fields=['shop', 'url_key'],
+                                    name='unique_product_shop_url'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.url_key = url_key(self.url)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
 
+class ProductSignatureBand(models.Model):
+    """Band of MinHash signature of product name, description and size.
+    Products sharing a band are candidates for the same product group,
+    see product.matching"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='signature_bands')
+    # band number and hash of its signature rows
+    key = models.CharField(max_length=40, db_index=True)
+
+
+class SearchRun(models.Model):
+    """Result set of product search. Identified by random uuid, so that
+    results can be shared by url."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    search_phrases = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+    products = models.ManyToManyField(Product, through='SearchRunItem',
+                                      related_name='search_runs')
+
+    def __str__(self):
+        return f'{", ".join(self.search_phrases)} - {self.created}'
+
+
+class SearchRunItem(models.Model):
+    """Product found by search run, at given position of results"""
+    run = models.ForeignKey(SearchRun, on_delete=models.CASCADE,
+                            related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='search_run_items')
+    rank = models.IntegerField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'rank'],
+                                    name='unique_search_run_rank'),
+        ]
 
 
+class SearchJobStatus(models.TextChoices):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
 
 
+class SearchJob(models.Model):
+    """Product search queued for background scrapping"""
+    search_phrases = models.JSONField()
+    # hash of normalized search phrases, identical searches share one job
+    phrases_key = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(choices=SearchJobStatus.choices,
+                              default=SearchJobStatus.PENDING, max_length=20)
+    # results of job, products are added as soon as each shop is searched
+    run = models.ForeignKey(SearchRun, null=True, on_delete=models.SET_NULL,
+                            related_name='jobs')
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    # number of times the job was claimed by worker
+    attempts = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created'])]
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (SearchJobStatus.DONE, SearchJobStatus.FAILED)
+
+    def __str__(self):
+        return f'{", ".join(self.search_phrases)} - {self.status}'
+
+
+class TrackedSearch(models.Model):
+    """Search phrase of single shop whose prices are refreshed by
+    refresh_prices command, see product.refresh"""
+    phrase = models.CharField(max_length=255)
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE,
+                             related_name='tracked_searches')
+    # number of user searches of the phrase
+    searches = models.PositiveIntegerField(default=0)
+    last_searched = models.DateTimeField(null=True)
+    last_refreshed = models.DateTimeField(null=True)
+    # moving average of share of products with changed price per refresh
+    volatility = models.FloatField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['phrase', 'shop'],
+                                    name='unique_tracked_search'),
+        ]
+
+    def __str__(self):
+        return f'{self.phrase} - {self.shop}'
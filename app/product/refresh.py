@@ -0,0 +1,167 @@
+import math
+import heapq
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from libs import utils
+from libs.search_cache import normalize_phrases
+from price.models import PricePoint
+from product.models import Product, TrackedSearch
+from scrapper import product_search
+from scrapper.throttle import TokenBucket
+from shop.models import Shop
+
+
+# weight of share of changed prices per refresh in priority, volatile
+# searches are refreshed more often
+VOLATILITY_WEIGHT = 4
+# weight of the last refresh in moving average of volatility
+VOLATILITY_SMOOTHING = 0.3
+
+
+def track_search(search_phrases: List[str]) -> None:
+    """Records user search of phrases, so that their prices are refreshed
+    in all shops."""
+    phrases = normalize_phrases(search_phrases)
+    shop_ids = Shop.objects.values_list('id', flat=True)
+    TrackedSearch.objects.bulk_create(
+        [TrackedSearch(phrase=phrase, shop_id=shop_id)
+         for phrase in phrases for shop_id in shop_ids],
+        ignore_conflicts=True)
+    TrackedSearch.objects.filter(phrase__in=phrases).update(
+        searches=F('searches') + 1, last_searched=timezone.now())
+
+
+atrack_search = sync_to_async(track_search)
+
+
+def mark_refreshed(phrase: str, shop_id: int) -> None:
+    """Records that phrase was scraped in shop by search job, so that its
+    prices are not refreshed again before min interval."""
+    TrackedSearch.objects.filter(phrase__in=normalize_phrases([phrase]),
+                                 shop_id=shop_id) \
+        .update(last_refreshed=timezone.now())
+
+
+def priority(tracked: TrackedSearch, now: datetime,
+             min_interval: timedelta) -> float:
+    """Returns refresh priority of tracked search, 0 if it was refreshed,
+    or created by user search, less than min_interval ago. Priority grows
+    with hours since the last refresh, number of user searches and
+    volatility of prices."""
+    staleness = now - (tracked.last_refreshed or tracked.created)
+    if staleness < min_interval:
+        return 0
+    hours = staleness.total_seconds() / 3600
+    return hours * (1 + math.log1p(tracked.searches)) \
+        * (1 + VOLATILITY_WEIGHT * tracked.volatility)
+
+
+def refresh_search(tracked: TrackedSearch) -> List[int]:
+    """Scrapes shop of tracked search and saves found products. Updates
+    volatility with share of already saved products whose price has
+    changed, newly found products are not counted. Returns ids of saved
+    products."""
+    products = product_search.get_shop_products(tracked.shop, tracked.phrase)
+    keys = {utils.url_key(prod['url']) for prod in products}
+    existing_ids = set(Product.objects.filter(shop=tracked.shop,
+                                              url_key__in=keys)
+                       .values_list('id', flat=True))
+    started = timezone.now()
+    product_ids = utils.save_products(products)
+
+    # price points are recorded for new and changed prices only
+    known_ids = existing_ids.intersection(product_ids)
+    if known_ids:
+        changed = PricePoint.objects.filter(
+            product_id__in=known_ids, timestamp__gte=started
+        ).values('product_id').distinct().count()
+        share = changed / len(known_ids)
+        tracked.volatility = VOLATILITY_SMOOTHING * share \
+            + (1 - VOLATILITY_SMOOTHING) * tracked.volatility
+    tracked.last_refreshed = timezone.now()
+    tracked.save(update_fields=['volatility', 'last_refreshed'])
+    return product_ids
+
+
+class RefreshScheduler:
+    """Refreshes prices of tracked searches in order of priority, within
+    request budget of each shop. Budget is number of scrapes per minute,
+    per shop name or default for all shops, e.g.
+    {'default': 6, 'superpharm': 2}"""
+
+    def __init__(self, budgets: Dict[str, float], min_interval: timedelta,
+                 tracking_period: timedelta,
+                 refresh: Callable[[TrackedSearch], List[int]]
+                 = refresh_search,
+                 clock: Callable[[], float] = time.monotonic):
+        self.budgets = budgets
+        self.min_interval = min_interval
+        self.tracking_period = tracking_period
+        self.refresh = refresh
+        self.clock = clock
+        self._buckets: Dict[int, TokenBucket] = {}
+        self.errors: List[str] = []
+
+    def bucket(self, shop: Shop) -> TokenBucket:
+        """Token bucket of shop, full budget of a minute can be used at
+        once."""
+        if shop.id not in self._buckets:
+            budget = self.budgets.get(shop.shop_name,
+                                      self.budgets.get('default', 1))
+            self._buckets[shop.id] = TokenBucket(budget / 60, budget,
+                                                 clock=self.clock)
+        return self._buckets[shop.id]
+
+    def queue(self, now: datetime) -> List[Tuple[float, int, TrackedSearch]]:
+        """Returns heap of due tracked searches, most urgent first.
+        Searches not searched by users for tracking period are skipped."""
+        tracked_searches = TrackedSearch.objects.select_related('shop') \
+            .filter(last_searched__gte=now - self.tracking_period)
+        heap = []
+        for tracked in tracked_searches:
+            score = priority(tracked, now, self.min_interval)
+            if score > 0:
+                heap.append((-score, tracked.id, tracked))
+        heapq.heapify(heap)
+        return heap
+
+    def run_once(self) -> int:
+        """Refreshes due searches until queue is empty or budgets of all
+        shops with due searches are used up. Returns number of refreshed
+        searches."""
+        heap = self.queue(timezone.now())
+        exhausted = set()
+        refreshed = 0
+        while heap:
+            _, _, tracked = heapq.heappop(heap)
+            if tracked.shop_id in exhausted:
+                continue
+            if not self.bucket(tracked.shop).try_acquire():
+                exhausted.add(tracked.shop_id)
+                continue
+
+            try:
+                self.refresh(tracked)
+            except Exception:
+                self.errors.append(f'{tracked}: {traceback.format_exc()}')
+                # failed search is not retried before min interval
+                TrackedSearch.objects.filter(id=tracked.id).update(
+                    last_refreshed=timezone.now())
+            refreshed += 1
+        return refreshed
+
+
+def get_scheduler() -> RefreshScheduler:
+    """Creates scheduler configured in settings."""
+    return RefreshScheduler(
+        settings.PRICE_REFRESH_BUDGET,
+        timedelta(seconds=settings.PRICE_REFRESH_MIN_INTERVAL),
+        timedelta(days=settings.PRICE_REFRESH_TRACKING_DAYS))
@@ -0,0 +1,132 @@
+from typing import Dict, List
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from product.models import Product
+from scrapper.phrase_matcher import tokenize
+
+
+# bm25 weights of indexed columns: name, description, size
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _fold(column: str) -> str:
+    """SQL expression of column without polish letter l with stroke, which
+    unicode61 tokenizer does not fold with other diacritics."""
+    return f"replace(replace({column}, 'ł', 'l'), 'Ł', 'L')"
+
+
+def _values(row: str) -> str:
+    return ', '.join(_fold(f'{row}.{column}')
+                     for column in ('name', 'description', 'size'))
+
+
+# triggers keeping the index in sync with product_product rows, as created
+# by migration 0010_product_fts
+INDEX_TRIGGERS = {
+    'product_product_fts_insert': f"""
+        AFTER INSERT ON product_product BEGIN
+        INSERT INTO product_product_fts(rowid, name, description, size)
+        VALUES (new.id, {_values('new')});
+    END""",
+    'product_product_fts_delete': f"""
+        AFTER DELETE ON product_product BEGIN
+        INSERT INTO product_product_fts(product_product_fts, rowid, name,
+                                        description, size)
+        VALUES ('delete', old.id, {_values('old')});
+    END""",
+    'product_product_fts_update': f"""
+        AFTER UPDATE OF name, description, size ON product_product BEGIN
+        INSERT INTO product_product_fts(product_product_fts, rowid, name,
+                                        description, size)
+        VALUES ('delete', old.id, {_values('old')});
+        INSERT INTO product_product_fts(rowid, name, description, size)
+        VALUES (new.id, {_values('new')});
+    END""",
+}
+
+
+def index_available() -> bool:
+    """Full-text index is created on sqlite only, see migration
+    0010_product_fts."""
+    return connection.vendor == 'sqlite'
+
+
+def ensure_index_triggers(using: str = 'default') -> bool:
+    """Recreates triggers of the index dropped by sqlite schema editor,
+    which remakes product_product table when its fields are added or
+    altered. Index is rebuilt, as rows changed without triggers are out of
+    sync. Returns True if triggers were recreated."""
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        names = ['product_product_fts', *INDEX_TRIGGERS]
+        cursor.execute(
+            'SELECT name FROM sqlite_master WHERE name IN '
+            f'({", ".join(["%s"] * len(names))})', names)
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = INDEX_TRIGGERS.keys() - existing
+        if 'product_product_fts' not in existing or not missing:
+            return False
+
+        for name in missing:
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} '
+                           f'{INDEX_TRIGGERS[name]}')
+        cursor.execute("INSERT INTO product_product_fts(product_product_fts) "
+                       "VALUES ('delete-all')")
+        cursor.execute(
+            'INSERT INTO product_product_fts(rowid, name, description, size) '
+            f"SELECT id, {_values('product_product')} FROM product_product")
+    return True
+
+
+def build_match_query(phrase: str) -> str:
+    """Builds FTS5 query matching products containing all words of phrase,
+    as prefixes of longer words too. Words are quoted, so that phrase can
+    not inject query syntax."""
+    return ' '.join(f'"{token}"*' for token in tokenize(phrase))
+
+
+def _search_ids(phrase: str, limit: int) -> List[int]:
+    """Returns ids of products matching phrase, best ranked first."""
+    query = build_match_query(phrase)
+    if not query:
+        return []
+
+    if index_available():
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM product_product_fts '
+                'WHERE product_product_fts MATCH %s '
+                f'ORDER BY bm25(product_product_fts, {weights}) LIMIT %s',
+                [query, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    # without the index every word is looked up with table scan
+    condition = Q()
+    for token in tokenize(phrase, fold=False):
+        condition &= Q(name__icontains=token) \
+            | Q(description__icontains=token) | Q(size__icontains=token)
+    return list(Product.objects.filter(condition).order_by('-last_seen')
+                .values_list('id', flat=True)[:limit])
+
+
+def search_products(search_phrases: List[str],
+                    limit: int = 50) -> List[Product]:
+    """Searches already scraped products with full-text index, without
+    scraping shops. Returns products with shops and prices, up to limit per
+    phrase, ordered by phrase and rank. Product matching more phrases is
+    listed once."""
+    product_ids: Dict[int, None] = {}
+    for phrase in search_phrases:
+        product_ids.update(dict.fromkeys(_search_ids(phrase, limit)))
+    if not product_ids:
+        return []
+
+    products = Product.objects.select_related('shop', 'price') \
+        .in_bulk(list(product_ids))
+    return [products[product_id] for product_id in product_ids
+            if product_id in products]
@@ -0,0 +1,117 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from django.urls import include, path, reverse
+
+from libs import utils
+from product import views
+from product.models import Product, SearchJob, SearchJobStatus
+from shop.models import Shop
+
+
+urlpatterns = [
+    path('', include(([
+        path('search', views.product_search_async, name='product-search'),
+        path('search-results', views.product_search_results_async,
+             name='search-results'),
+        path('search-results/<uuid:run_id>',
+             views.product_search_results_async, name='search-run'),
+        path('search-results/stream', views.SearchResultsStreamView.as_view(),
+             name='search-results-stream'),
+    ], 'product'))),
+]
+
+# read only database calls of async views run in other threads, so test data
+# is committed
+pytestmark = [pytest.mark.urls(__name__),
+              pytest.mark.django_db(transaction=True)]
+
+
+@patch('product.views.search_cache.aget_search_results',
+       new_callable=AsyncMock, return_value=None)
+def test_async_search_queues_job(mocked_results, client, db):
+    """Test search missing in cache is queued and its page is refreshed until
+    job has finished."""
+    response = client.post(reverse('product:product-search'),
+                           {'search_phrase': 'yope balsam, himalaya pasta'})
+
+    job = SearchJob.objects.get()
+    assert response.url == reverse('product:search-results')
+    assert job.search_phrases == ['yope balsam', 'himalaya pasta']
+
+    response = client.get(reverse('product:search-results'))
+
+    assert 'product/search_pending.html' in \
+        [template.name for template in response.templates]
+
+
+@patch('product.views.search_cache.aget_search_results',
+       new_callable=AsyncMock)
+def test_async_search_results_from_cache(mocked_results, client,
+                                         load_shops):
+    """Test cached search results are displayed without queueing job."""
+    product = Product.objects.create(
+        name='yope figa', description='balsam do ciała', size='300 ml',
+        image_url='//www.ros.net.pl/figa.png', url='/Produkt/figa',
+        shop=Shop.objects.get(shop_name='rossman'))
+    mocked_results.return_value = str(
+        utils.create_search_run(['yope balsam'], [product.id]).id)
+
+    client.post(reverse('product:product-search'),
+                {'search_phrase': 'yope balsam'})
+    response = client.get(reverse('product:search-results'))
+
+    assert SearchJob.objects.count() == 0
+    assert list(response.context['products']) == [product]
+
+
+def test_async_search_results_of_finished_job(client, load_shops):
+    """Test products of finished job are displayed."""
+    product = Product.objects.create(
+        name='yope figa', description='balsam do ciała', size='300 ml',
+        image_url='//www.ros.net.pl/figa.png', url='/Produkt/figa',
+        shop=Shop.objects.get(shop_name='rossman'))
+    job = SearchJob.objects.create(
+        search_phrases=['yope balsam'], phrases_key='yope',
+        status=SearchJobStatus.DONE,
+        run=utils.create_search_run(['yope balsam'], [product.id]))
+    session = client.session
+    session['search_job'] = job.id
+    session.save()
+
+    response = client.get(reverse('product:search-results'))
+
+    assert 'yope figa' in response.content.decode()
+    assert 'search_job' not in client.session
+    assert client.session['search_run'] == str(job.run_id)
+
+
+def test_async_search_run_shared_by_url(client, load_shops):
+    """Test search run is displayed by its url without session."""
+    product = Product.objects.create(
+        name='yope figa', description='balsam do ciała', size='300 ml',
+        image_url='//www.ros.net.pl/figa.png', url='/Produkt/figa',
+        shop=Shop.objects.get(shop_name='rossman'))
+    run = utils.create_search_run(['yope balsam'], [product.id])
+
+    response = client.get(reverse('product:search-run', args=[run.id]))
+
+    assert 'yope figa' in response.content.decode()
+
+
+def test_async_search_invalid_form(client, db):
+    """Test search form errors are displayed."""
+    response = client.post(reverse('product:product-search'),
+                           {'search_phrase': ''})
+
+    assert response.status_code == 200
+    assert 'Search phrase cannot be empty' in response.content.decode()
+
+
+def test_search_results_stream_view_is_async():
+    """Test stream view is served as coroutine, without holding thread of
+    ASGI server."""
+    assert asyncio.iscoroutinefunction(
+        views.SearchResultsStreamView.as_view())
@@ -0,0 +1,305 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from django.core.management import call_command
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from libs import search_cache, utils
+from product import jobs, views
+from product.models import (Product, SearchJob, SearchJobStatus, SearchRun,
+                            SearchRunItem)
+from scrapper.web_scrapper import ShopResult
+from shop.models import Shop
+
+
+SEARCH_PHRASES = ['yope balsam', 'himalaya pasta']
+
+
+def test_enqueue_search_reuses_queued_job(db):
+    """Test equivalent searches share one pending job."""
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+
+    assert jobs.enqueue_search(['Himalaya pasta', 'yope balsam']) == job
+    assert SearchJob.objects.count() == 1
+
+
+def test_enqueue_search_after_finished_job(db):
+    """Test search is queued again when previous job has finished."""
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+    SearchJob.objects.filter(id=job.id).update(status=SearchJobStatus.DONE)
+
+    assert jobs.enqueue_search(SEARCH_PHRASES) != job
+
+
+def test_claim_next_job_once(db):
+    """Test pending job is claimed by one worker only."""
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+
+    claimed = jobs.claim_next_job('worker-1')
+
+    assert claimed.id == job.id
+    assert claimed.status == SearchJobStatus.RUNNING
+    assert claimed.worker == 'worker-1'
+    assert jobs.claim_next_job('worker-2') is None
+
+
+def test_requeue_stalled_jobs(db, settings):
+    """Test running jobs older than job timeout are queued again."""
+    settings.SEARCH_JOB_TIMEOUT = 60
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+    jobs.claim_next_job('worker-1')
+    SearchJob.objects.filter(id=job.id).update(
+        started=timezone.now() - timedelta(seconds=120))
+
+    assert jobs.requeue_stalled_jobs() == 1
+    assert jobs.claim_next_job('worker-2').id == job.id
+
+
+def test_stalled_job_failed_after_max_attempts(db, settings):
+    """Test job stalling in every attempt is failed instead of being queued
+    again."""
+    settings.SEARCH_JOB_TIMEOUT = 60
+    settings.SEARCH_JOB_MAX_ATTEMPTS = 2
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+    for worker in ('worker-1', 'worker-2'):
+        assert jobs.claim_next_job(worker).id == job.id
+        SearchJob.objects.filter(id=job.id).update(
+            started=timezone.now() - timedelta(seconds=120))
+        jobs.requeue_stalled_jobs()
+
+    job.refresh_from_db()
+    assert job.attempts == 2
+    assert job.status == SearchJobStatus.FAILED
+    assert 'stalled' in job.error
+    assert job.run is not None
+    assert jobs.claim_next_job('worker-3') is None
+
+
+def shop_results(*results):
+    """Builds (shop result, saved product ids) pairs of searched shops."""
+    return [(ShopResult(SimpleNamespace(shop_name=shop_name, shop_id=None),
+                        'yope balsam', [], error), product_ids)
+            for shop_name, product_ids, error in results]
+
+
+@pytest.fixture
+def product_ids(load_shops, scraped_products):
+    """Saves products found by search. Returns their ids."""
+    return utils.save_products(scraped_products(count=3))
+
+
+@patch('product.jobs.search_cache.iter_search_and_save')
+def test_run_job_stores_product_ids(mocked_search, product_ids):
+    """Test products found in each shop are added to search run of the job
+    as soon as the shop is searched."""
+    stored_ids = []
+
+    def search_and_save(search_phrases):
+        for result in shop_results(('rossman', product_ids[:2], None),
+                                   ('hebe', product_ids[2:], None),
+                                   ('superpharm', product_ids[:1], None)):
+            yield result
+            stored_ids.append(list(
+                SearchJob.objects.get().run.items.order_by('rank')
+                .values_list('product_id', flat=True)))
+
+    mocked_search.side_effect = search_and_save
+    jobs.enqueue_search(SEARCH_PHRASES)
+
+    job = jobs.run_job(jobs.claim_next_job('worker-1'))
+
+    job.refresh_from_db()
+    assert stored_ids == [product_ids[:2], product_ids, product_ids]
+    assert job.status == SearchJobStatus.DONE
+    assert list(job.run.items.order_by('rank').values_list(
+        'product_id', flat=True)) == product_ids
+    assert search_cache.get_search_results(SEARCH_PHRASES) == str(job.run_id)
+    assert job.finished is not None
+
+
+@patch('libs.search_cache.iter_products_by_search_phrases')
+def test_run_job_sorts_finished_run(mocked_search, load_shops,
+                                    scraped_products):
+    """Test products of finished job are ranked by search phrase, name and
+    shop, not in order in which shops were searched."""
+    def shop_result(shop_id, phrase, names):
+        return ShopResult(SimpleNamespace(shop_name='', shop_id=shop_id),
+                          phrase, scraped_products(*names, shop_id=shop_id,
+                                                   search_phrase=phrase))
+
+    mocked_search.return_value = [
+        shop_result(2, 'yope balsam', ['yope b', 'yope a']),
+        shop_result(1, 'himalaya pasta', ['himalaya']),
+        shop_result(1, 'yope balsam', ['yope a']),
+    ]
+
+    job = jobs.run_job(jobs.enqueue_search(SEARCH_PHRASES))
+
+    items = job.run.items.order_by('rank')
+    assert list(items.values_list('rank', 'product__shop_id',
+                                  'product__name')) == [
+        (0, 1, 'himalaya'), (1, 1, 'yope a'), (2, 2, 'yope a'),
+        (3, 2, 'yope b')]
+
+
+@patch('product.jobs.search_cache.iter_search_and_save')
+def test_run_job_shop_failed(mocked_search, product_ids):
+    """Test job keeps products of other shops when one shop fails, but its
+    results are not cached."""
+    mocked_search.return_value = shop_results(
+        ('rossman', product_ids[:1], None),
+        ('hebe', [], ConnectionError('shop unavailable')))
+
+    job = jobs.run_job(jobs.enqueue_search(SEARCH_PHRASES))
+
+    job.refresh_from_db()
+    assert job.status == SearchJobStatus.DONE
+    assert list(job.run.products.values_list('id', flat=True)) == \
+        product_ids[:1]
+    assert 'hebe' in job.error and 'shop unavailable' in job.error
+    assert search_cache.get_search_results(SEARCH_PHRASES) is None
+
+
+@patch('product.jobs.search_cache.iter_search_and_save',
+       side_effect=ConnectionError('database unavailable'))
+def test_run_job_failed(mocked_search, db):
+    """Test job error is recorded when scrapping fails."""
+    job = jobs.run_job(jobs.enqueue_search(SEARCH_PHRASES))
+
+    job.refresh_from_db()
+    assert job.status == SearchJobStatus.FAILED
+    assert 'database unavailable' in job.error
+
+
+@pytest.mark.parametrize('status, pending', [
+    (SearchJobStatus.RUNNING, True),
+    (SearchJobStatus.DONE, False),
+])
+@patch('product.views.search_cache.get_search_results', return_value=None)
+def test_search_results_wait_for_job(mocked_results, status, pending, client,
+                                     db):
+    """Test results page is refreshed until search job has finished."""
+    client.post(reverse('product:product-search'),
+                {'search_phrase': 'yope balsam'})
+    SearchJob.objects.update(status=status)
+
+    response = client.get(reverse('product:search-results'))
+
+    templates = [template.name for template in response.templates]
+    assert ('product/search_pending.html' in templates) == pending
+
+
+@patch('product.views.search_cache.get_search_results', return_value=None)
+def test_search_results_failed_job(mocked_results, client, db):
+    """Test failed search job is displayed as error, not as empty results."""
+    client.post(reverse('product:product-search'),
+                {'search_phrase': 'yope balsam'})
+    job = SearchJob.objects.get()
+    jobs.finish_job(job, SearchJobStatus.FAILED, ['shop unavailable'])
+
+    response = client.get(reverse('product:search-results'))
+
+    assert response.context['search_failed']
+    assert b'search failed' in response.content
+    assert b'no products found' not in response.content
+
+
+
+@patch('product.views.search_cache.get_search_results', return_value=None)
+def test_search_pending_refreshed_under_wsgi(mocked_results, client,
+                                             load_shops):
+    """Test pending page of WSGI server is refreshed with products found so
+    far, instead of holding worker with stream of results."""
+    product = Product.objects.create(
+        name='yope figa', description='balsam do ciała', size='300 ml',
+        image_url='//www.ros.net.pl/figa.png', url='/Produkt/figa',
+        shop=Shop.objects.get(shop_name='rossman'))
+    client.post(reverse('product:product-search'),
+                {'search_phrase': 'yope balsam'})
+    SearchJob.objects.update(
+        status=SearchJobStatus.RUNNING,
+        run=utils.create_search_run(['yope balsam'], [product.id]))
+
+    response = client.get(reverse('product:search-results'))
+
+    assert not response.context['stream_results']
+    assert b'<meta http-equiv="refresh"' in response.content
+    assert b'EventSource' not in response.content
+    assert b'yope figa' in response.content
+
+
+def test_search_pending_streamed_under_asgi(db):
+    """Test pending page of ASGI server streams products of search job."""
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+    request = AsyncRequestFactory().get(reverse('product:search-results'))
+
+    context = views.ProductSearchResultsView.get_pending_context(job, request)
+
+    assert context['stream_results']
+    assert context['found_products'] == []
+
+def test_search_results_stream(client, transactional_db, load_shops):
+    """Test products of search job are streamed until job is finished.
+    Stream reads database in other thread, so test data is committed."""
+    product = Product.objects.create(
+        name='yope figa', description='balsam do ciała', size='300 ml',
+        image_url='//www.ros.net.pl/figa.png', url='/Produkt/figa',
+        shop=Shop.objects.get(shop_name='rossman'))
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+    SearchJob.objects.filter(id=job.id).update(
+        status=SearchJobStatus.DONE,
+        run=utils.create_search_run(SEARCH_PHRASES, [product.id]))
+    session = client.session
+    session['search_job'] = job.id
+    session.save()
+
+    response = client.get(reverse('product:search-results-stream'))
+    events = b''.join(response.streaming_content).decode().split('\n\n')
+
+    assert response['Content-Type'] == 'text/event-stream'
+    assert events[0].startswith('event: products\n')
+    assert 'yope figa' in events[0]
+    assert events[1] == 'event: done\ndata: {}'
+
+
+def test_search_results_stream_max_duration(client, transactional_db,
+                                            settings):
+    """Test stream of running job is closed after its max duration, without
+    done event."""
+    job = jobs.enqueue_search(SEARCH_PHRASES)
+    session = client.session
+    session['search_job'] = job.id
+    session.save()
+
+    with patch.object(views.SearchResultsStreamView, 'max_duration', 0):
+        response = client.get(reverse('product:search-results-stream'))
+        events = b''.join(response.streaming_content)
+
+    assert events == b''
+
+
+def test_prune_searches(product_ids):
+    """Test search runs and finished jobs older than retention are deleted
+    with their items, newer ones are kept."""
+    old_job = jobs.finish_job(jobs.enqueue_search(SEARCH_PHRASES),
+                              SearchJobStatus.DONE, [])
+    old_run = utils.create_search_run(SEARCH_PHRASES, product_ids)
+    new_run = utils.create_search_run(SEARCH_PHRASES, product_ids)
+    old_time = timezone.now() - timedelta(days=31)
+    SearchRun.objects.filter(id__in=[old_run.id, old_job.run_id]) \
+        .update(created=old_time)
+    SearchJob.objects.filter(id=old_job.id).update(finished=old_time)
+    running_job = jobs.enqueue_search(['himalaya'])
+
+    call_command('prune_searches', '--days=30', stdout=StringIO())
+
+    assert list(SearchRun.objects.all()) == [new_run]
+    assert SearchRunItem.objects.filter(run=new_run).count() == 3
+    assert SearchRunItem.objects.count() == 3
+    assert list(SearchJob.objects.all()) == [running_job]
@@ -0,0 +1,113 @@
+import pytest
+
+from django.core.management import call_command
+
+from libs import utils
+from product.matching import (ProductMatcher, band_keys, jaccard,
+                              normalize_size, normalize_text, product_tokens)
+from product.models import Product, ProductGroup, ProductSignatureBand
+
+
+def test_normalize_text():
+    """Test text is lowercased and polish letters are replaced."""
+    assert normalize_text('Żel ŁAGODZĄCY') == 'zel lagodzacy'
+
+
+@pytest.mark.parametrize('size, expected', [
+    ('300 ml', '300ml'), ('0,3 l', '300ml'), ('1kg', '1000g'),
+    ('2 szt.', '2szt'), ('bez rozmiaru', 'bez rozmiaru'),
+])
+def test_normalize_size(size, expected):
+    """Test sizes in different units are converted to base unit."""
+    assert normalize_size(size) == expected
+
+
+def test_band_keys_similar_products():
+    """Test similar token sets share signature bands, different share
+    few of them."""
+    yope = product_tokens(Product(name='YOPE balsam figa',
+                                  description='Balsam do ciała 300ml'))
+    yope_other = product_tokens(Product(name='Yope balsam, figa',
+                                        description='balsam do ciala'))
+    himalaya = product_tokens(Product(name='Himalaya pasta',
+                                      description='pasta do zębów'))
+
+    assert jaccard(yope, yope_other) == 1
+    assert band_keys(yope) == band_keys(yope_other)
+    assert len(set(band_keys(yope)) & set(band_keys(himalaya))) < 4
+
+
+def test_save_products_groups_products_of_other_shops(load_shops,
+                                                      scraped_products):
+    """Test the same product of different shops is assigned to one group."""
+    utils.save_products(scraped_products('Yope balsam figa'))
+    utils.save_products(
+        scraped_products('YOPE Balsam Figa', shop_id=2, size='0,3 l')
+        + scraped_products('Himalaya pasta miętowa', shop_id=3))
+
+    yope = Product.objects.filter(name__icontains='yope')
+    assert ProductGroup.objects.count() == 1
+    assert {product.product_group_id for product in yope} \
+        == {ProductGroup.objects.get().id}
+    assert Product.objects.get(shop_id=3).product_group is None
+
+
+def test_products_of_same_shop_not_grouped(load_shops, scraped_products):
+    """Test products of one shop and of different size are not grouped."""
+    utils.save_products([
+        *scraped_products('Yope balsam figa'),
+        *scraped_products('Yope balsam figa', url='/Produkt/other'),
+        *scraped_products('Yope balsam figa', shop_id=2, size='500 ml'),
+    ])
+
+    assert not ProductGroup.objects.exists()
+    assert ProductSignatureBand.objects.filter(
+        product__in=Product.objects.all()).values('product').distinct() \
+        .count() == 3
+
+
+def test_group_has_one_product_per_shop(load_shops, scraped_products):
+    """Test second product of shop does not join group having its shop."""
+    utils.save_products(scraped_products('Yope balsam figa')
+                        + scraped_products('Yope balsam figa', shop_id=2))
+    utils.save_products(scraped_products('Yope balsam figa', shop_id=2,
+                                         url='/Produkt/other'))
+
+    group = ProductGroup.objects.get()
+    assert group.product_groups.count() == 2
+    assert Product.objects.get(url='/Produkt/other').product_group is None
+
+
+@pytest.mark.parametrize('count', [5, 15])
+def test_assign_groups_query_count(load_shops, django_assert_max_num_queries,
+                                   count):
+    """Test number of queries does not depend on number of products and
+    created groups."""
+    products = [Product.objects.create(
+        shop_id=shop_id, name=f'Yope balsam {flavour}', description='balsam',
+        size=f'{flavour} ml', url=f'https://shop{shop_id}.pl/{flavour}')
+        for flavour in range(100, 100 + count)
+        for shop_id in [1, 2]]
+
+    # lookup of bands, candidates and their groups, bulk insert of groups,
+    # their ids, bulk insert of bands, bulk update of products. Bands of up
+    # to 30 products fit into one insert of sqlite
+    with django_assert_max_num_queries(7):
+        ProductMatcher().assign_groups(products)
+    assert ProductGroup.objects.count() == count
+    assert all(product.product_group_id is not None
+               for product in products)
+    assert len({product.product_group_id for product in products}) == count
+
+
+def test_regroup_products_command(load_shops, scraped_products):
+    """Test command rebuilds groups of the whole catalog."""
+    utils.save_products(scraped_products('Yope balsam figa')
+                        + scraped_products('Yope balsam figa', shop_id=2))
+    Product.objects.update(product_group=None)
+    ProductGroup.objects.all().delete()
+
+    call_command('regroup_products', batch_size=1)
+
+    assert ProductGroup.objects.count() == 1
+    assert not Product.objects.filter(product_group=None).exists()
@@ -0,0 +1,61 @@
+import pytest
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+BEFORE_MERGE = [('product', '0004_searchjob'), ('price', '0002_initial'),
+                ('user', '0001_initial'), ('shop', '0001_initial')]
+AFTER_MERGE = [('product', '0006_product_unique_product_shop_url')]
+
+
+def migrate(targets):
+    """Migrates database to given migrations. Returns app registry of
+    migrated state."""
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+@pytest.fixture(autouse=True)
+def migrate_to_latest(transactional_db):
+    """Migrates database back to the latest migrations after test, so that
+    following tests use current schema."""
+    yield
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def test_merge_duplicate_products(transactional_db):
+    """Test products with the same shop and normalized url are merged into
+    the oldest one, with latest price and favorites of duplicates."""
+    apps = migrate(BEFORE_MERGE)
+    Shop = apps.get_model('shop', 'Shop')
+    Product = apps.get_model('product', 'Product')
+    Price = apps.get_model('price', 'Price')
+    Favorite = apps.get_model('user', 'Favorite')
+
+    shop = Shop.objects.create(shop_name='rossman',
+                               shop_url='https://www.rossmann.pl',
+                               search_param='', parser_type='soup')
+    products = [Product.objects.create(name='yope figa', url=url, shop=shop)
+                for url in ['/Produkt/figa', '/Produkt/figa/',
+                            ' /Produkt/figa#opis', '/Produkt/mango']]
+    Price.objects.create(product=products[0], price=21.99)
+    latest_price = Price.objects.create(product=products[1], price=19.99)
+    Price.objects.filter(id=latest_price.id).update(date='2099-01-01')
+    favorite = Favorite.objects.create()
+    favorite.product_id.add(products[2])
+
+    apps = migrate(AFTER_MERGE)
+    Product = apps.get_model('product', 'Product')
+    Price = apps.get_model('price', 'Price')
+    Favorite = apps.get_model('user', 'Favorite')
+
+    assert sorted(Product.objects.values_list('id', 'url', 'url_key')) == [
+        (products[0].id, '/Produkt/figa', '/Produkt/figa'),
+        (products[3].id, '/Produkt/mango', '/Produkt/mango')]
+    assert Price.objects.get(product_id=products[0].id).price == 19.99
+    assert list(Favorite.objects.get().product_id.values_list(
+        'id', flat=True)) == [products[0].id]
@@ -0,0 +1,180 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from product import jobs, refresh
+from product.models import Product, TrackedSearch
+from scrapper.web_scrapper import ShopResult
+
+
+@pytest.fixture
+def scheduler(fake_clock):
+    """Scheduler refreshing searches without scrapping, budget of 2 scrapes
+    per minute in superpharm and 1 in other shops."""
+    refreshed = []
+
+    def _refresh(tracked):
+        refreshed.append((tracked.phrase, tracked.shop.shop_name))
+        tracked.last_refreshed = timezone.now()
+        tracked.save()
+
+    scheduler = refresh.RefreshScheduler(
+        {'default': 1, 'superpharm': 2}, timedelta(hours=6),
+        timedelta(days=30), refresh=_refresh, clock=fake_clock)
+    scheduler.refreshed = refreshed
+    return scheduler
+
+
+def age(phrase, **delta):
+    """Sets last refresh of tracked phrase to given time ago."""
+    TrackedSearch.objects.filter(phrase=phrase).update(
+        last_refreshed=timezone.now() - timedelta(**delta))
+
+
+def age_created(**delta):
+    """Sets creation of never refreshed tracked phrases to given time
+    ago."""
+    TrackedSearch.objects.update(created=timezone.now() - timedelta(**delta))
+
+
+def test_track_search(load_shops):
+    """Test searched phrases are tracked in all shops."""
+    refresh.track_search(['Yope balsam', 'himalaya'])
+    refresh.track_search(['yope  balsam'])
+
+    tracked = TrackedSearch.objects.filter(phrase='yope balsam')
+    assert tracked.count() == 3
+    assert {search.searches for search in tracked} == {2}
+    assert TrackedSearch.objects.filter(phrase='himalaya',
+                                        searches=1).count() == 3
+
+
+def test_search_view_tracks_search(client, load_shops):
+    """Test product search form tracks searched phrases."""
+    client.post(reverse('product:product-search'),
+                {'search_phrase': 'yope balsam'})
+
+    assert TrackedSearch.objects.filter(phrase='yope balsam').count() == 3
+
+
+def test_priority():
+    """Test priority grows with staleness, popularity and volatility and
+    is 0 within min interval."""
+    now = timezone.now()
+    interval = timedelta(hours=6)
+
+    def _priority(hours, searches=1, volatility=0.0):
+        return refresh.priority(TrackedSearch(
+            last_refreshed=now - timedelta(hours=hours), searches=searches,
+            volatility=volatility), now, interval)
+
+    assert _priority(5) == 0
+    assert _priority(12) > _priority(8)
+    assert _priority(8, searches=10) > _priority(8)
+    assert _priority(8, volatility=0.5) > _priority(8)
+    assert refresh.priority(TrackedSearch(created=now - timedelta(hours=5)),
+                            now, interval) == 0
+    assert refresh.priority(TrackedSearch(created=now - timedelta(hours=8)),
+                            now, interval) == _priority(8, searches=0)
+
+
+def test_scheduler_order_and_budget(load_shops, scheduler):
+    """Test the most urgent searches are refreshed first within budget of
+    each shop."""
+    refresh.track_search(['yope', 'himalaya', 'ziaja'])
+    age('yope', hours=10)
+    age('himalaya', hours=30)
+    age('ziaja', hours=1)
+
+    assert scheduler.run_once() == 4
+    assert scheduler.refreshed == [
+        ('himalaya', 'rossman'), ('himalaya', 'hebe'),
+        ('himalaya', 'superpharm'), ('yope', 'superpharm'),
+    ]
+
+    # budget is refilled after a minute
+    scheduler.clock.now = 60
+    assert scheduler.run_once() == 2
+    assert set(scheduler.refreshed[4:]) == {('yope', 'rossman'),
+                                            ('yope', 'hebe')}
+    assert scheduler.run_once() == 0
+
+
+def test_scheduler_skips_untracked(load_shops, scheduler):
+    """Test phrases not searched for tracking period are not refreshed."""
+    refresh.track_search(['yope'])
+    TrackedSearch.objects.update(
+        last_searched=timezone.now() - timedelta(days=31))
+
+    assert scheduler.run_once() == 0
+
+
+def test_scheduler_failed_refresh(load_shops, scheduler):
+    """Test failed refresh is recorded and not retried at once."""
+    refresh.track_search(['yope'])
+    age_created(hours=7)
+    scheduler.refresh = lambda tracked: 1 / 0
+
+    assert scheduler.run_once() == 3
+    assert len(scheduler.errors) == 3
+    assert 'ZeroDivisionError' in scheduler.errors[0]
+    scheduler.clock.now = 60
+    assert scheduler.run_once() == 0
+
+
+def test_search_job_marks_tracked_search_refreshed(load_shops, scheduler):
+    """Test phrase scraped in shop by search job is not refreshed again
+    before min interval."""
+    refresh.track_search(['yope'])
+    age_created(hours=7)
+    shop = SimpleNamespace(shop_name='rossman', shop_id=1)
+    with patch('product.jobs.search_cache.iter_search_and_save',
+               return_value=[(ShopResult(shop, 'Yope', []), [])]):
+        jobs.run_job(jobs.enqueue_search(['Yope']))
+
+    assert scheduler.run_once() == 2
+    assert set(scheduler.refreshed) == {('yope', 'hebe'),
+                                        ('yope', 'superpharm')}
+
+
+def test_refresh_search_volatility(load_shops, scraped_products):
+    """Test refresh saves scraped products and updates volatility with
+    share of changed prices of already saved products, newly found products
+    are not counted as changed."""
+    refresh.track_search(['yope'])
+    tracked = TrackedSearch.objects.select_related('shop').get(shop_id=1)
+
+    with patch('product.refresh.product_search.get_shop_products',
+               return_value=scraped_products(count=2)):
+        product_ids = refresh.refresh_search(tracked)
+    assert Product.objects.filter(id__in=product_ids).count() == 2
+    assert tracked.volatility == 0
+    assert tracked.last_refreshed is not None
+
+    products = scraped_products(count=4)
+    products[0]['price'] = 5.99
+    with patch('product.refresh.product_search.get_shop_products',
+               return_value=products):
+        refresh.refresh_search(tracked)
+    tracked.refresh_from_db()
+    assert tracked.volatility == pytest.approx(0.3 * 0.5)
+
+
+def test_refresh_prices_command(load_shops, scraped_products):
+    """Test command refreshes due searches once."""
+    refresh.track_search(['yope'])
+    age_created(hours=7)
+
+    with patch('product.refresh.product_search.get_shop_products',
+               side_effect=lambda shop, phrase: scraped_products(
+                   count=2, shop_id=shop.id, search_phrase=phrase)):
+        call_command('refresh_prices', once=True)
+
+    assert Product.objects.count() == 6
+    assert not TrackedSearch.objects.filter(last_refreshed=None).exists()
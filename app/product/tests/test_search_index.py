@@ -0,0 +1,161 @@
+import pytest
+
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.urls import reverse
+
+from libs import utils
+from product import jobs
+from product.models import Product
+from product.search_index import (INDEX_TRIGGERS, build_match_query,
+                                  ensure_index_triggers, search_products)
+
+
+@pytest.fixture
+def saved_products(load_shops, scraped_products):
+    utils.save_products([
+        *scraped_products('yope werbena'),
+        *scraped_products('yope soul', shop_id=2,
+                          description='żel pod prysznic'),
+        *scraped_products('himalaya pasta', shop_id=3,
+                          description='pasta do zębów'),
+        *scraped_products('ziaja balsam', description='yope w opisie'),
+    ])
+
+
+def names(products):
+    return [product.name for product in products]
+
+
+def test_build_match_query():
+    """Test phrase words are quoted as prefixes, query syntax is dropped."""
+    assert build_match_query('Yope "balsam" ciała OR*') == \
+        '"yope"* "balsam"* "ciala"* "or"*'
+    assert build_match_query(' ,') == ''
+
+
+def test_search_products_ranked(saved_products):
+    """Test products containing all words are found, those with words in
+    name first."""
+    assert names(search_products(['yope']))[-1] == 'ziaja balsam'
+    assert names(search_products(['yope balsam'])) == \
+        ['yope werbena', 'ziaja balsam']
+    assert names(search_products(['balsam'])) == \
+        ['ziaja balsam', 'yope werbena']
+    assert search_products(['']) == []
+
+
+def test_search_products_diacritics_and_prefixes(saved_products):
+    """Test words are matched without diacritics and as prefixes."""
+    assert names(search_products(['zel'])) == ['yope soul']
+    assert names(search_products(['zęb'])) == ['himalaya pasta']
+    assert names(search_products(['Bals ciala'])) == ['yope werbena']
+    assert names(search_products(['CIAŁA werbena'])) == ['yope werbena']
+
+
+def test_search_products_many_phrases(saved_products):
+    """Test products of all phrases are returned once, in phrase order."""
+    products = search_products(['himalaya', 'pasta', 'werbena'], limit=1)
+
+    assert names(products) == ['himalaya pasta', 'yope werbena']
+    assert products[0].shop.shop_name == 'superpharm'
+    assert products[0].price.price == 9.99
+
+
+def test_index_follows_product_changes(saved_products):
+    """Test updated and deleted products are updated in index."""
+    product = Product.objects.get(name='yope werbena')
+    product.name = 'yope mango'
+    product.save()
+    Product.objects.filter(name='himalaya pasta').delete()
+
+    assert names(search_products(['mango'])) == ['yope mango']
+    assert search_products(['werbena']) == []
+    assert search_products(['himalaya']) == []
+
+
+def test_search_products_number_of_queries(saved_products,
+                                           django_assert_num_queries):
+    """Test search takes index lookup per phrase and one product query."""
+    with django_assert_num_queries(3):
+        search_products(['yope', 'balsam'])
+
+
+def test_local_search_api(client, saved_products):
+    """Test api returns ranked products as json."""
+    response = client.get(reverse('product:local-search'),
+                          {'q': 'Balsam, yope', 'limit': 5})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['query'] == 'Balsam, yope'
+    assert [product['name'] for product in data['products']] == \
+        ['yope werbena', 'ziaja balsam']
+    assert data['products'][0]['shop'] == 'rossman'
+    assert data['products'][0]['price'] == 9.99
+
+
+@pytest.mark.parametrize('params', [{}, {'q': 'yope', 'limit': 0},
+                                    {'q': 'yope', 'limit': 'all'}])
+def test_local_search_api_invalid_params(client, params):
+    """Test missing phrase and invalid limit return 400."""
+    response = client.get(reverse('product:local-search'), params)
+
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+def test_pending_search_shows_local_products(client, saved_products):
+    """Test page of running search displays matching scraped products."""
+    job = jobs.enqueue_search(['werbena'])
+    session = client.session
+    session['search_job'] = job.id
+    session.save()
+
+    response = client.get(reverse('product:search-results'))
+
+    assert names(response.context['local_products']) == ['yope werbena']
+    assert 'Previously found products' in response.content.decode()
+
+
+def index_triggers():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                       "AND tbl_name = 'product_product'")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def test_index_updated_after_product_table_remade(transactional_db,
+                                                  load_shops,
+                                                  scraped_products):
+    """Test index triggers dropped when sqlite remakes product table for
+    added field are recreated after migrations, with products changed
+    meanwhile."""
+    product = Product.objects.get(id=utils.save_products(
+        scraped_products('yope werbena'))[0])
+    operation = migrations.AddField(
+        'product', 'ean', models.CharField(max_length=13, default=''))
+    state = MigrationLoader(connection).project_state()
+    new_state = state.clone()
+    operation.state_forwards('product', new_state)
+    with connection.schema_editor() as schema_editor:
+        operation.database_forwards('product', schema_editor, state,
+                                    new_state)
+    try:
+        assert index_triggers() == set()
+        Product.objects.filter(id=product.id).update(name='yope soul')
+
+        emit_post_migrate_signal(verbosity=0, interactive=False,
+                                 db='default')
+        Product.objects.filter(id=product.id).update(
+            description='żel pod prysznic')
+
+        assert index_triggers() == set(INDEX_TRIGGERS)
+        assert search_products(['soul zel']) == [product]
+        assert search_products(['werbena']) == []
+    finally:
+        with connection.schema_editor() as schema_editor:
+            operation.database_backwards('product', schema_editor,
+                                         new_state, state)
+        ensure_index_triggers()
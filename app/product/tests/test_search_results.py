@@ -0,0 +1,125 @@
+import re
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from libs import utils
+from libs.pagination import encode_cursor
+
+
+@pytest.fixture
+def search_products(client, load_shops, scraped_products):
+    """Factory saving searched products and storing their search run in
+    client session."""
+    def _search_products(count):
+        product_ids = utils.save_products([
+            product for i in range(count)
+            for product in scraped_products(f'yope {i % 7}',
+                                            shop_id=1 + i % 3,
+                                            url=f'/Produkt/{i}')])
+        session = client.session
+        session['search_run'] = str(
+            utils.create_search_run(['yope'], product_ids).id)
+        session.save()
+        return product_ids
+    return _search_products
+
+
+def get_all_pages(client):
+    """Follows next page links of search results. Returns products of all
+    pages."""
+    url = reverse('product:search-results')
+    products = []
+    while url:
+        response = client.get(url)
+        products.extend(response.context['products'])
+        next_cursor = response.context['next_cursor']
+        url = f'{reverse("product:search-results")}?after={next_cursor}' \
+            if next_cursor else None
+    return products
+
+
+@pytest.mark.parametrize('count', [5, 120])
+def test_search_results_number_of_queries(client, search_products, count):
+    """Test results page takes the same number of queries regardless of
+    number of products."""
+    search_products(count)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse('product:search-results'))
+
+    assert len(response.context['products']) == min(count, 50)
+    assert len(context.captured_queries) <= 3
+    assert response.content.decode().count('prod-img') == min(count, 50)
+
+
+def test_search_results_keyset_pagination(client, search_products):
+    """Test pages contain every product once, in order of search run."""
+    product_ids = search_products(120)
+
+    products = get_all_pages(client)
+
+    assert [product.id for product in products] == product_ids
+
+
+def test_search_results_previous_pages(client, search_products):
+    """Test previous page links lead back to the first page."""
+    product_ids = search_products(120)
+    url = reverse('product:search-results')
+    response = client.get(url)
+    while response.context['next_cursor']:
+        response = client.get(url, {'after': response.context['next_cursor']})
+    assert response.context['products'][-1].id == product_ids[-1]
+
+    products = list(response.context['products'])
+    while response.context['previous_cursor']:
+        response = client.get(
+            url, {'before': response.context['previous_cursor']})
+        products[:0] = response.context['products']
+
+    assert [product.id for product in products] == product_ids
+    assert len(response.context['products']) == 50
+    assert 'Next page' in response.content.decode()
+    assert 'Previous page' not in response.content.decode()
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor', encode_cursor([]), encode_cursor([1, 2]),
+    encode_cursor(['first']), encode_cursor([None]), encode_cursor([[1]]),
+    encode_cursor([{'rank': 1}]),
+])
+def test_search_results_malformed_cursor(client, search_products, cursor):
+    """Test cursor not matching ordering shows first page."""
+    search_products(60)
+
+    for param in ('after', 'before'):
+        response = client.get(reverse('product:search-results'),
+                              {param: cursor})
+
+        assert response.status_code == 200
+        assert len(response.context['products']) == 50
+
+
+def test_search_results_invalid_cursor(client, search_products):
+    """Test invalid cursor shows first page."""
+    search_products(60)
+
+    response = client.get(reverse('product:search-results'),
+                          {'after': 'not-a-cursor'})
+
+    assert len(response.context['products']) == 50
+    assert re.search(r'\?after=\S+', response.content.decode())
+
+
+def test_search_run_shared_by_url(client, search_products):
+    """Test search run is displayed by its url in new session."""
+    search_products(3)
+    run_id = client.session['search_run']
+    client.logout()
+
+    response = client.get(reverse('product:search-run', args=[run_id]))
+
+    assert len(response.context['products']) == 3
@@ -1,10 +1,22 @@
+from django.conf import settings
 from django.urls import path
 from product import views
 
+if settings.ASYNC_VIEWS:
+    search_view = views.product_search_async
+    search_results_view = views.product_search_results_async
+else:
+    search_view = views.ProductSearchView.as_view()
+    search_results_view = views.ProductSearchResultsView.as_view()
+
 app_name = 'product'
 urlpatterns = [
-    path('search', views.ProductSearchView.as_view(),
-         name='product-search'),
-    path('search-results', views.ProductSearchResultsView.as_view(),
-         name='search-results'),
+    path('search', search_view, name='product-search'),
+    path('search-results', search_results_view, name='search-results'),
+    path('search-results/<uuid:run_id>', search_results_view,
+         name='search-run'),
+    path('search-results/stream', views.SearchResultsStreamView.as_view(),
+         name='search-results-stream'),
+    path('api/products/search', views.LocalProductSearchView.as_view(),
+         name='local-search'),
 ]
\ No newline at end of file
@@ -1,17 +1,69 @@
+import json
+import time
+import asyncio
+from functools import update_wrapper
+from typing import List, Union
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
+from django.template.loader import render_to_string
 from django.views import View
 from django.views.generic import ListView
 from django.urls import reverse
 
 from product.forms import ProductSearchForm
-from product.models import Product
-from scrapper.product_search import get_products_by_search_phrases
-from libs import utils
+from product.models import (Product, SearchJob, SearchJobStatus,
+                            SearchRunItem)
+from product import jobs, refresh
+from product.search_index import search_products
+from price.models import Price
+from libs import search_cache
+from libs.pagination import KeysetPage, keyset_page
+from libs.streaming import AsyncStreamingHttpResponse
+
+
+def get_search_phrases(form: ProductSearchForm) -> List[str]:
+    """Splits comma separated search phrases of valid search form."""
+    search_phrases = form.cleaned_data['search_phrase'].split(',')
+    return [s_ph.strip() for s_ph in search_phrases]
+
+
+def store_search(session, run_id: Union[str, None],
+                 job: Union[SearchJob, None]) -> None:
+    """Stores cached search run or queued search job in session."""
+    session.pop('search_failed', None)
+    if job is not None:
+        session['search_job'] = job.id
+    else:
+        session.pop('search_job', None)
+        session['search_run'] = str(run_id)
+
+
+def pop_finished_job(session) -> Union[SearchJob, None]:
+    """Returns search job stored in session if it is still running.
+    Finished job is removed from session and its search run stored, with
+    flag of failed job."""
+    job_id = session.get('search_job')
+    if not job_id:
+        return None
+
+    job = SearchJob.objects.filter(id=job_id).first()
+    if job is not None and not job.is_finished:
+        return job
+
+    del session['search_job']
+    if job is not None and job.run_id is not None:
+        session['search_run'] = str(job.run_id)
+    session['search_failed'] = job is not None \
+        and job.status == SearchJobStatus.FAILED
+    return None
 
 
 class ProductSearchView(View):
-    """Handles product search form. Submission of form launches web scraper."""
+    """Handles product search form. Submission of form returns cached search
+    results or queues search job for web scraper."""
     def get(self, request):
         form = ProductSearchForm()
         return render(request, 'product/product_search.html', {'form': form})
@@ -20,26 +72,15 @@ class ProductSearchView(View):
         form = ProductSearchForm(request.POST)
 
         if form.is_valid():
-            search_phrases = form.cleaned_data['search_phrase'].split(',')
-            search_phrases = [s_ph.strip() for s_ph in search_phrases]
-
-            products = get_products_by_search_phrases(search_phrases)
-
-            prod_ids = []
-            if products:
-                for prod in products:
-                    existing_product = utils.product_exists(prod)
-                    if not existing_product:
-                        print('create product')
-                        product = utils.create_product_from_dict(prod)
-                    else:
-                        print('update product')
-                        product = utils.update_product_price(
-                            existing_product, prod
-                        )
-                    prod_ids.append(product.id)
-
-            request.session['searched_products'] = prod_ids
+            search_phrases = get_search_phrases(form)
+            refresh.track_search(search_phrases)
+
+            run_id = search_cache.get_search_results(search_phrases)
+
+            job = None
+            if run_id is None:
+                job = jobs.enqueue_search(search_phrases)
+            store_search(request.session, run_id, job)
 
             return HttpResponseRedirect(reverse('product:search-results'))
 
@@ -47,15 +88,272 @@ class ProductSearchView(View):
 
 
 class ProductSearchResultsView(ListView):
-    """Displays search results - list of products found by scrapper."""
+    """Displays search results - list of products found by scrapper.
+    Displays search run given in url, or the last search of session."""
     template_name = 'product/product_list.html'
     model = Product
     context_object_name = 'products'
+    pending_template_name = 'product/search_pending.html'
+    # seconds between refreshes of page while search job is running
+    refresh_interval = 2
+    # products are paginated with keyset pagination in order of their rank
+    ordering = ('rank',)
+    page_size = 50
+    # products of local full-text index displayed while search job is
+    # running, per search phrase
+    local_results_limit = 20
+
+    def get(self, request, *args, **kwargs):
+        if 'run_id' not in kwargs:
+            job = pop_finished_job(request.session)
+            if job is not None:
+                return render(request, self.pending_template_name,
+                              self.get_pending_context(job, request))
+
+        return super().get(request, *args, **kwargs)
+
+    @classmethod
+    def get_pending_context(cls, job: SearchJob, request):
+        """Context of page of running search job, with previously scraped
+        products matching the search. Products found by the job are
+        streamed if the app is served by ASGI server, otherwise page is
+        refreshed, so that waiting user does not hold WSGI worker."""
+        stream_results = isinstance(request, ASGIRequest)
+        found_products = []
+        if not stream_results and job.run_id is not None:
+            found_products = [
+                item.product for item in SearchRunItem.objects
+                .filter(run_id=job.run_id)
+                .select_related('product__shop', 'product__price')
+                .order_by('rank')]
+        return {
+            'job': job,
+            'refresh_interval': cls.refresh_interval,
+            'stream_results': stream_results,
+            'found_products': found_products,
+            'local_products': search_products(job.search_phrases,
+                                              cls.local_results_limit),
+        }
+
+    @classmethod
+    def get_results_page(cls, run_id: Union[str, None],
+                         after: Union[str, None],
+                         before: Union[str, None] = None) -> KeysetPage:
+        """Returns page of products of search run following the after cursor
+        or preceding the before cursor, with their shops and prices, and
+        cursors of next and previous page. Invalid cursor returns the first
+        page."""
+        if not run_id:
+            return KeysetPage([], None, None)
+
+        items = SearchRunItem.objects.filter(run_id=run_id) \
+            .select_related('product__shop', 'product__price')
+        try:
+            page = keyset_page(items, cls.ordering, after, cls.page_size,
+                               before)
+        except ValueError:
+            page = keyset_page(items, cls.ordering, None, cls.page_size)
+        return page._replace(rows=[item.product for item in page.rows])
 
     def get_queryset(self):
-        product_ids = self.request.session.get('searched_products', None)
-        print(product_ids)
-        data = None
-        if product_ids:
-            data = super().get_queryset().filter(id__in=product_ids)
-        return data
+        run_id = self.kwargs.get('run_id') or \
+            self.request.session.get('search_run')
+        self.run_id = run_id
+        self.page = self.get_results_page(run_id,
+                                          self.request.GET.get('after'),
+                                          self.request.GET.get('before'))
+        return self.page.rows
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.page.next_cursor
+        context['previous_cursor'] = self.page.previous_cursor
+        context['run_id'] = self.run_id
+        context['search_failed'] = 'run_id' not in self.kwargs \
+            and self.request.session.get('search_failed', False)
+        return context
+
+
+class SearchResultsStreamView(View):
+    """Streams products found by running search job as server-sent events.
+    Products of each shop are sent as soon as the shop is searched."""
+    item_template_name = 'product/product_item.html'
+    # seconds between checks of search job progress
+    poll_interval = 0.5
+    # seconds after which stream is closed, client reloads the page and
+    # opens new stream if search job is still running
+    max_duration = 30
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """Returns coroutine function view, class based views of Django 3.2
+        are synchronous only."""
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+        return update_wrapper(async_view, view)
+
+    async def get(self, request):
+        job_id = await sync_to_async(request.session.get)('search_job')
+        response = AsyncStreamingHttpResponse(
+            self.stream_events(job_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # disables response buffering of nginx proxy
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    def format_event(event: str, data: dict) -> str:
+        return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+    @staticmethod
+    def get_items(run_id, after_rank: int) -> List[SearchRunItem]:
+        """Returns items of search run ranked after given rank, with their
+        products, shops and prices."""
+        return list(SearchRunItem.objects.filter(run_id=run_id,
+                                                 rank__gt=after_rank)
+                    .select_related('product__shop', 'product__price')
+                    .order_by('rank'))
+
+    def render_items(self, items: List[SearchRunItem]) -> str:
+        """Returns html of list items of products of search run items."""
+        return ''.join(render_to_string(self.item_template_name,
+                                        {'product': item.product})
+                       for item in items)
+
+    async def stream_events(self, job_id):
+        """Yields events with html of newly found products until search job
+        is finished or max duration of stream has passed."""
+        get_job = sync_to_async(
+            lambda: SearchJob.objects.filter(id=job_id).first())
+        get_items = sync_to_async(self.get_items)
+        # rendering of fetched items does not touch database, it runs in any
+        # thread of executor
+        render_items = sync_to_async(self.render_items)
+        last_rank = -1
+        deadline = time.monotonic() + self.max_duration
+        while True:
+            job = await get_job()
+            if job is None:
+                break
+
+            if job.run_id is not None:
+                items = await get_items(job.run_id, last_rank)
+                if items:
+                    last_rank = items[-1].rank
+                    html = await render_items(items)
+                    yield self.format_event('products', {'html': html})
+
+            if job.is_finished:
+                break
+            if time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+        yield self.format_event('done', {})
+
+
+class LocalProductSearchView(View):
+    """Searches already scraped products with local full-text index and
+    returns them as json, ranked by relevance. Query parameters:
+    q - search phrase
+    limit - maximum number of products"""
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        phrase = request.GET.get('q', '').strip()
+        try:
+            limit = int(request.GET.get('limit', self.default_limit))
+        except ValueError:
+            limit = 0
+        if not phrase:
+            return JsonResponse({'error': 'q is required'}, status=400)
+        if not 1 <= limit <= self.max_limit:
+            return JsonResponse(
+                {'error': f'limit must be between 1 and {self.max_limit}'},
+                status=400)
+
+        products = search_products([phrase], limit)
+        return JsonResponse({
+            'query': phrase,
+            'products': [self.serialize(product) for product in products],
+        })
+
+    @staticmethod
+    def serialize(product: Product) -> dict:
+        try:
+            price = product.price.price
+        except Price.DoesNotExist:
+            price = None
+        return {
+            'id': product.id,
+            'name': product.name,
+            'description': product.description,
+            'size': product.size,
+            'shop': product.shop.shop_name,
+            'price': price,
+            'url': product.url,
+            'product_group': product.product_group_id,
+        }
+
+
+# Async variants of search views for ASGI server, enabled by ASYNC_VIEWS
+# setting. ORM of Django 3.2 is synchronous only, so session, database and
+# template rendering are awaited in thread through sync_to_async, while the
+# event loop is free to serve other requests. Calls run in the thread shared
+# by sync_to_async calls, whose database connections are closed by Django
+# when the request is finished.
+
+async def product_search_async(request):
+    """Async variant of ProductSearchView."""
+    if request.method == 'POST':
+        form = ProductSearchForm(request.POST)
+
+        if form.is_valid():
+            search_phrases = get_search_phrases(form)
+            await refresh.atrack_search(search_phrases)
+
+            run_id = await search_cache.aget_search_results(search_phrases)
+
+            job = None
+            if run_id is None:
+                job = await jobs.aenqueue_search(search_phrases)
+            await sync_to_async(store_search)(request.session, run_id, job)
+
+            return HttpResponseRedirect(reverse('product:search-results'))
+    else:
+        form = ProductSearchForm()
+
+    return await sync_to_async(render)(
+        request, 'product/product_search.html', {'form': form})
+
+
+async def product_search_results_async(request, run_id=None):
+    """Async variant of ProductSearchResultsView."""
+    view = ProductSearchResultsView
+    search_failed = False
+    if run_id is None:
+        job = await sync_to_async(pop_finished_job)(request.session)
+        if job is not None:
+            context = await sync_to_async(view.get_pending_context)(
+                job, request)
+            return await sync_to_async(render)(
+                request, view.pending_template_name, context)
+        run_id = await sync_to_async(request.session.get)('search_run')
+        search_failed = await sync_to_async(request.session.get)(
+            'search_failed', False)
+
+    page = await sync_to_async(view.get_results_page)(
+        run_id, request.GET.get('after'), request.GET.get('before'))
+    return await sync_to_async(render)(
+        request, view.template_name,
+        {view.context_object_name: page.rows,
+         'next_cursor': page.next_cursor,
+         'previous_cursor': page.previous_cursor,
+         'run_id': run_id,
+         'search_failed': search_failed})
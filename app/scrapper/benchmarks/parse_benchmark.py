@@ -0,0 +1,79 @@
+"""Benchmark of html parser engines on search results test pages.
+
+Run from app directory:
+    python -m scrapper.benchmarks.parse_benchmark
+"""
+import gc
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Tuple
+
+from scrapper.shop_parser import (ShopParser, RossmanParser, HebeParser,
+                                  SuperpharmParser)
+
+
+DATA_PATH = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+FIXTURES = [
+    (RossmanParser, 'rossman_test_data.txt'),
+    (HebeParser, 'hebe_test_data.txt'),
+    (SuperpharmParser, 'superpharm_test_data.html'),
+]
+BACKENDS = [
+    ('soup', 'html.parser', False),
+    ('soup', 'lxml', False),
+    ('soup', 'html.parser', True),
+    ('soup', 'lxml', True),
+    ('lexbor', '-', False),
+]
+SEARCH_PHRASE = 'yope balsam'
+
+
+def parse_page(parser: ShopParser, html: bytes) -> List[Dict]:
+    """Parses html with parser engine and extracts products."""
+    soup = parser.make_document(html)
+    if isinstance(parser, SuperpharmParser):
+        return parser.parse_soup(soup, SEARCH_PHRASE)
+    return parser.parse_data(soup, SEARCH_PHRASE)
+
+
+def measure(parser: ShopParser, html: bytes,
+            repeat: int = 5) -> Tuple[float, float, int]:
+    """Returns median parse time [ms], peak memory [MB] and number of
+    parsed products."""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        products = parse_page(parser, html)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    parse_page(parser, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return median(timings), peak / 2 ** 20, len(products)
+
+
+def run(repeat: int = 5) -> None:
+    header = f'{"shop":<12}{"engine":<8}{"backend":<14}{"parse_only":<12}' \
+             f'{"time [ms]":>10}{"peak [MB]":>11}{"products":>10}'
+    print(header)
+    print('-' * len(header))
+    for parser_cls, file_name in FIXTURES:
+        html = (DATA_PATH / file_name).read_bytes()
+        for engine, features, parse_only in BACKENDS:
+            parser = parser_cls(1, 'https://example.com/', '{}', 'soup',
+                                html_engine=engine, soup_features=features,
+                                parse_only=parse_only)
+            elapsed, peak, count = measure(parser, html, repeat)
+            print(f'{parser.shop_name:<12}{engine:<8}{features:<14}'
+                  f'{str(parse_only):<12}'
+                  f'{elapsed:>10.1f}{peak:>11.1f}{count:>10}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,89 @@
+"""Benchmark of sorting searched products, pandas DataFrame implementation
+against sort keys of Scrapper._transform_searched_data.
+
+Run from app directory:
+    python -m scrapper.benchmarks.transform_benchmark
+"""
+import gc
+import time
+import random
+import tracemalloc
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+from scrapper.web_scrapper import Scrapper
+
+try:
+    from pandas import DataFrame
+except ImportError:
+    DataFrame = None
+
+
+SIZES = [1_000, 10_000, 50_000]
+WORDS = ['yope', 'balsam', 'do', 'ciała', 'himalaya', 'pasta', 'mydło',
+         'krem', 'anti-age', 'mango', 'figa', 'SPF+50', '300 ml', 'żel,']
+
+
+def transform_pandas(prod_search_results: List[Dict]) -> List[Dict]:
+    """Former DataFrame implementation of Scrapper._transform_searched_data,
+    kept as reference."""
+    df_products = DataFrame(prod_search_results)
+    df_products['name_to_sort'] = df_products[['name', 'description']] \
+        .apply(lambda row: ' '.join(row.values), axis=1) \
+        .str.replace(' |,|\\+|-|', '', regex=True)
+    sort_order = ['search_phrase', 'name_to_sort', 'shop_id']
+    df_products = df_products.sort_values(by=sort_order)\
+        .drop(['search_phrase', 'name_to_sort'], axis=1)
+    return df_products.to_dict('records')
+
+
+def generate_products(count: int, seed: int = 1) -> List[Dict]:
+    """Generates random searched products."""
+    rand = random.Random(seed)
+    return [{
+        'shop_id': rand.randint(1, 3),
+        'search_phrase': rand.choice(['yope balsam', 'himalaya pasta']),
+        'name': ' '.join(rand.choices(WORDS, k=3)),
+        'description': ' '.join(rand.choices(WORDS, k=5)),
+        'size': '300 ml', 'price': round(rand.uniform(1, 100), 2),
+        'image_url': f'//img/{i}.png', 'url': f'/Produkt/{i}',
+    } for i in range(count)]
+
+
+def measure(transform: Callable[[List[Dict]], List[Dict]],
+            products: List[Dict], repeat: int = 3) -> Tuple[float, float]:
+    """Returns median transform time [ms] and peak memory [MB]."""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        transform(products)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    transform(products)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return median(timings), peak / 2 ** 20
+
+
+def run(repeat: int = 3) -> None:
+    transforms = [('sort keys', Scrapper([])._transform_searched_data)]
+    if DataFrame is not None:
+        transforms.insert(0, ('pandas', transform_pandas))
+
+    header = f'{"products":>10}  {"implementation":<16}' \
+             f'{"time [ms]":>10}{"peak [MB]":>11}'
+    print(header)
+    print('-' * len(header))
+    for size in SIZES:
+        products = generate_products(size)
+        for name, transform in transforms:
+            elapsed, peak = measure(transform, products, repeat)
+            print(f'{size:>10}  {name:<16}{elapsed:>10.1f}{peak:>11.1f}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,155 @@
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+
+class BrowserPool:
+    """Bounded pool of warm headless Chrome sessions. Browsers are checked
+    out per search, reset on release and recycled after max_uses searches."""
+
+    def __init__(self, driver_path: str, size: int = 2, max_uses: int = 50,
+                 checkout_timeout: float = 120):
+        self.driver_path = driver_path
+        self.size = size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        # most recently used browser is checked out first
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses: Dict[webdriver.Chrome, int] = {}
+        self._lock = threading.Lock()
+
+    def _create_driver(self) -> webdriver.Chrome:
+        """Launches new chrome webdriver with options."""
+        options = webdriver.ChromeOptions()
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-setuid-sandbox')
+        webdriver_config = {'service': Service(self.driver_path),
+                            'options': options}
+
+        driver = webdriver.Chrome(**webdriver_config)
+        driver.implicitly_wait(15)
+        return driver
+
+    @staticmethod
+    def _is_healthy(driver: webdriver.Chrome) -> bool:
+        """Checks if browser session still responds."""
+        try:
+            driver.current_url
+        except WebDriverException:
+            return False
+        return True
+
+    @staticmethod
+    def _reset(driver: webdriver.Chrome) -> None:
+        """Closes additional tabs, clears cookies and blanks the page."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.get('about:blank')
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        """Quits browser and chromedriver process."""
+        with self._lock:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def acquire(self) -> webdriver.Chrome:
+        """Checks out healthy browser from pool. Launches new one if there is
+        no idle browser and pool is not full."""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError('No browser available in pool')
+
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    driver = self._create_driver()
+                    break
+                if self._is_healthy(driver):
+                    break
+                self._discard(driver)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._uses[driver] = self._uses.get(driver, 0) + 1
+        return driver
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """Returns browser to pool. Browsers used max_uses times or failing
+        to reset are quit. Browsers not owned by pool are quit as well."""
+        with self._lock:
+            uses = self._uses.get(driver)
+        if uses is None:
+            self._discard(driver)
+            return
+
+        try:
+            if uses >= self.max_uses:
+                self._discard(driver)
+            else:
+                self._reset(driver)
+                self._idle.put(driver)
+        except WebDriverException:
+            self._discard(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def checkout(self) -> Iterator[webdriver.Chrome]:
+        """Context manager checking out browser for the time of a search."""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self) -> None:
+        """Quits all idle browsers."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+_pools: Dict[str, BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(driver_path: str, **options) -> BrowserPool:
+    """Returns browser pool shared within process for given chromedriver.
+    Options are used only when the pool is created."""
+    with _pools_lock:
+        pool = _pools.get(driver_path)
+        if pool is None:
+            pool = BrowserPool(driver_path, **options)
+            _pools[driver_path] = pool
+    return pool
+
+
+@atexit.register
+def close_browser_pools() -> None:
+    """Quits browsers of all pools on interpreter exit."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,144 @@
+from typing import Union, List
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+class Node:
+    """Thin query interface over parsed html element. Shop parsers are
+    written against it, so that the same parse_data logic runs on any
+    supported parser engine."""
+
+    def select(self, selector: str) -> List['Node']:
+        """Returns descendant elements matching css selector."""
+        raise NotImplementedError('Method must be implemented')
+
+    def select_one(self, selector: str) -> Union['Node', None]:
+        """Returns first descendant element matching css selector."""
+        nodes = self.select(selector)
+        return nodes[0] if nodes else None
+
+    def children(self) -> List['Node']:
+        """Returns all descendant elements in document order."""
+        raise NotImplementedError('Method must be implemented')
+
+    @property
+    def text(self) -> str:
+        """Text of element and all its descendants."""
+        raise NotImplementedError('Method must be implemented')
+
+    @property
+    def own_text(self) -> str:
+        """Text of first child of element if it is a text node."""
+        raise NotImplementedError('Method must be implemented')
+
+    @property
+    def classes(self) -> List[str]:
+        """Css classes of element."""
+        return self.get('class', '').split()
+
+    def get(self, name: str, default: Union[str, None] = None) -> str:
+        """Returns value of element attribute."""
+        raise NotImplementedError('Method must be implemented')
+
+    def __getitem__(self, name: str) -> str:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+
+class SoupNode(Node):
+    """Node backed by BeautifulSoup element."""
+
+    def __init__(self, el: Union[BeautifulSoup, Tag]):
+        self.el = el
+
+    def select(self, selector: str) -> List['SoupNode']:
+        return [SoupNode(el) for el in self.el.select(selector)]
+
+    def select_one(self, selector: str) -> Union['SoupNode', None]:
+        el = self.el.select_one(selector)
+        return SoupNode(el) if el is not None else None
+
+    def children(self) -> List['SoupNode']:
+        return [SoupNode(el) for el in self.el.find_all()]
+
+    @property
+    def text(self) -> str:
+        return self.el.get_text()
+
+    @property
+    def own_text(self) -> str:
+        if self.el.contents and isinstance(self.el.contents[0],
+                                           NavigableString):
+            return str(self.el.contents[0])
+        return ''
+
+    @property
+    def classes(self) -> List[str]:
+        return self.el.get('class', [])
+
+    def get(self, name: str, default: Union[str, None] = None) -> str:
+        value = self.el.get(name, default)
+        if isinstance(value, list):
+            value = ' '.join(value)
+        return value
+
+
+class LexborNode(Node):
+    """Node backed by selectolax lexbor element."""
+
+    def __init__(self, el: 'selectolax.lexbor.LexborNode'):
+        self.el = el
+
+    def _is_self(self, el: 'selectolax.lexbor.LexborNode') -> bool:
+        return el.mem_id == self.el.mem_id
+
+    def select(self, selector: str) -> List['LexborNode']:
+        # lexbor matches the element itself, unlike BeautifulSoup
+        return [LexborNode(el) for el in self.el.css(selector)
+                if not self._is_self(el)]
+
+    def children(self) -> List['LexborNode']:
+        return self.select('*')
+
+    @property
+    def text(self) -> str:
+        return self.el.text(deep=True)
+
+    @property
+    def own_text(self) -> str:
+        first = self.el.child
+        if first is not None and first.tag == '-text':
+            return first.text(deep=False)
+        return ''
+
+    def get(self, name: str, default: Union[str, None] = None) -> str:
+        value = self.el.attributes.get(name, default)
+        return default if value is None else value
+
+
+def engine_available(engine: str) -> bool:
+    """Checks if parser engine can be used."""
+    if engine == 'lexbor':
+        return LexborHTMLParser is not None
+    return engine == 'soup'
+
+
+def as_node(document: Union[Node, BeautifulSoup, Tag]) -> Node:
+    """Wraps parsed document in Node interface."""
+    if isinstance(document, Node):
+        return document
+    return SoupNode(document)
+
+
+def parse_lexbor(markup: Union[str, bytes]) -> LexborNode:
+    """Parses html with selectolax lexbor engine."""
+    if isinstance(markup, bytes):
+        markup = markup.decode('utf-8', errors='replace')
+    return LexborNode(LexborHTMLParser(markup).root)
@@ -0,0 +1,77 @@
+import random
+import threading
+from typing import Dict, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class JitteredRetry(Retry):
+    """Retry policy with randomized exponential backoff, so that retries of
+    concurrent searches do not hit the shop at the same moment."""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(backoff / 2, backoff)
+
+
+class ShopSession:
+    """Pooled keep-alive HTTP session for a single shop host."""
+
+    def __init__(self, timeout: Union[float, Tuple[float, float]] = (5, 30),
+                 retries: int = 3, backoff_factor: float = 0.5,
+                 status_forcelist: Tuple[int, ...] = (429, 500, 502, 503),
+                 pool_maxsize: int = 10):
+        self.timeout = timeout
+        retry = JitteredRetry(total=retries, backoff_factor=backoff_factor,
+                              status_forcelist=status_forcelist,
+                              raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1,
+                              pool_maxsize=pool_maxsize)
+
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Sends GET request with session default timeout."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_sessions: Dict[str, ShopSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url: str, **options) -> ShopSession:
+    """Returns session shared by all requests to the host of given url.
+    Options are used only when session for the host is created."""
+    host = urlsplit(url).netloc.lower()
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = ShopSession(**options)
+            _sessions[host] = session
+    return session
+
+
+def close_sessions() -> None:
+    """Closes all pooled sessions and their connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,65 @@
+import re
+import bisect
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, List
+
+TOKEN_RE = re.compile(r'\w+')
+# letters not decomposed by unicode normalization
+SPECIAL_LETTERS = str.maketrans('łŁ', 'lL')
+
+
+def fold_diacritics(text: str) -> str:
+    """Replaces letters with diacritics by their base letters, so that
+    'ciała' and 'ciala' are equal."""
+    text = unicodedata.normalize('NFKD', text.translate(SPECIAL_LETTERS))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text: str, fold: bool = True) -> List[str]:
+    """Splits text to lowercase words, punctuation is dropped."""
+    text = text.lower()
+    if fold:
+        text = fold_diacritics(text)
+    return TOKEN_RE.findall(text)
+
+
+class PhraseMatcher:
+    """Checks if product text contains all words of search phrase. Words are
+    compared case insensitive, without punctuation and optionally without
+    diacritics. With prefix matching phrase word matches any longer text
+    word starting with it, e.g. 'balsam' matches 'balsamy'."""
+
+    def __init__(self, phrase: str, fold: bool = True, prefix: bool = False):
+        self.phrase = phrase
+        self.fold = fold
+        self.prefix = prefix
+        self.tokens: FrozenSet[str] = frozenset(tokenize(phrase, fold))
+
+    def matches(self, *texts: str) -> bool:
+        """Checks if all phrase words are included in given texts."""
+        if not self.tokens:
+            return True
+        text_tokens = set()
+        for text in texts:
+            text_tokens.update(tokenize(text, self.fold))
+        if self.tokens <= text_tokens:
+            return True
+        if not self.prefix:
+            return False
+
+        sorted_tokens = sorted(text_tokens)
+        for token in self.tokens:
+            index = bisect.bisect_left(sorted_tokens, token)
+            if index == len(sorted_tokens) \
+                    or not sorted_tokens[index].startswith(token):
+                return False
+        return True
+
+
+@lru_cache(maxsize=256)
+def compile_phrase(phrase: str, fold: bool = True,
+                   prefix: bool = False) -> PhraseMatcher:
+    """Returns matcher of search phrase, compiled once and shared by parsers
+    of all shops searched for the phrase."""
+    return PhraseMatcher(phrase, fold, prefix)
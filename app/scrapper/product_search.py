@@ -1,22 +1,66 @@
-from typing import Union, Tuple, List, Dict
+from typing import Union, Tuple, List, Dict, Iterator
 
-from scrapper.web_scrapper import Scrapper
-from scrapper.shop_parser import get_shop_parser
+from django.conf import settings
+
+from scrapper.web_scrapper import Scrapper, ShopResult
+from scrapper.response_cache import ResponseCache
+from scrapper.single_flight import SingleFlight
+from scrapper.shop_parser import ShopParser, get_shop_parser
 from shop.models import Shop
 
 
 SAMPLE_FILE = '/app/scrapper/sample_search_phrases.txt'
 
 
+def make_shop_parser(shop: Shop) -> ShopParser:
+    """Creates parser of shop object with options configured in
+    settings."""
+    shop_parser = get_shop_parser(shop.shop_name)
+    parser_options = settings.SCRAPPER_PARSER_OPTIONS.get(shop.shop_name, {})
+    return shop_parser(shop.id, shop.shop_url, shop.search_param,
+                       shop.parser_type, **parser_options)
+
+
 def list_shop_parsers():
     """Produce list of shop parsers based on shop objects."""
-    shops = Shop.objects.all()
-    shop_parsers = []
-    for shop in shops:
-        shop_parser = get_shop_parser(shop.shop_name)
-        shop_parsers.append(shop_parser(shop.id, shop.shop_url,
-                                        shop.search_param, shop.parser_type))
-    return shop_parsers
+    return [make_shop_parser(shop) for shop in Shop.objects.all()]
+
+
+_response_cache = None
+_single_flight = None
+
+
+def get_response_cache() -> Union[ResponseCache, None]:
+    """Returns response cache configured in settings, None if disabled."""
+    global _response_cache
+    if _response_cache is None and settings.SCRAPPER_RESPONSE_CACHE:
+        _response_cache = ResponseCache(**settings.SCRAPPER_RESPONSE_CACHE)
+    return _response_cache
+
+
+def get_single_flight() -> SingleFlight:
+    """Returns single flight registry shared by all searches of process."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(settings.SCRAPPER_SINGLE_FLIGHT_DIR)
+    return _single_flight
+
+
+def get_scrapper(search_phrases: Union[Tuple, List],
+                 shop_parsers: Union[List[ShopParser], None] = None
+                 ) -> Scrapper:
+    """Creates web scrapper of given shop parsers, of all shops by default,
+    configured in settings."""
+    if shop_parsers is None:
+        shop_parsers = list_shop_parsers()
+    return Scrapper(shop_parsers, search_phrases,
+                    max_concurrency=settings.SCRAPPER_MAX_CONCURRENCY,
+                    shop_concurrency=settings.SCRAPPER_SHOP_CONCURRENCY,
+                    http_options=settings.SCRAPPER_HTTP_OPTIONS,
+                    browser_options=settings.SCRAPPER_BROWSER_POOL,
+                    response_cache=get_response_cache(),
+                    single_flight=get_single_flight(),
+                    throttle_options=settings.SCRAPPER_THROTTLE)
 
 
 def get_products_by_search_phrases(search_phrases: Union[Tuple, List, None]) -> Dict:
@@ -27,16 +71,26 @@ def get_products_by_search_phrases(search_phrases: Union[Tuple, List, None]) ->
         search_phrases = (line.strip() for line in
                           open(SAMPLE_FILE))
 
-    shop_parsers = list_shop_parsers()
-
-    scrapper = Scrapper(shop_parsers, search_phrases)
+    scrapper = get_scrapper(search_phrases)
     products = scrapper.search_by_phrases()
 
     return products
 
 
+def get_shop_products(shop: Shop, phrase: str) -> List[Dict]:
+    """Launches web scrapper to search single shop for given phrase.
+    Returns list of found product dictionaries. Raises error of failed
+    search."""
+    scrapper = get_scrapper([phrase], [make_shop_parser(shop)])
+    products = scrapper.search_by_single_phrase(phrase)
+    if scrapper.errors:
+        raise scrapper.errors[0].error
+    return products
 
 
-
-
-
+def iter_products_by_search_phrases(search_phrases: Union[Tuple, List]
+                                    ) -> Iterator[ShopResult]:
+    """Launches web scrapper for given search phrases. Yields products
+    found in each shop as soon as the shop is searched."""
+    scrapper = get_scrapper(search_phrases)
+    yield from scrapper.iter_search_results()
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Union
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+class CacheEntry(NamedTuple):
+    """Cached response body with its validators."""
+    body: str
+    stored_at: float
+    etag: Union[str, None] = None
+    last_modified: Union[str, None] = None
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.age < ttl
+
+
+def canonical_url(url: str) -> str:
+    """Normalizes url so that equivalent search urls share cache entry:
+    lowercase scheme and host, sorted query parameters, no fragment."""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path or '/', query, ''))
+
+
+class ResponseCache:
+    """On-disk cache of shop responses keyed by hash of canonical url.
+    Least recently used entries are evicted once max_size is exceeded."""
+
+    def __init__(self, cache_dir: Union[str, Path],
+                 max_size: int = 256 * 2 ** 20, ttl: float = 900):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        """Returns body and metadata file paths of cache entry."""
+        key = hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+        entry_dir = self.cache_dir / key[:2]
+        return entry_dir / f'{key}.html', entry_dir / f'{key}.json'
+
+    @staticmethod
+    def _write_atomic(path: Path, data: str) -> None:
+        """Writes file through temporary file, so that readers never see
+        partially written entry."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Union[CacheEntry, None]:
+        """Returns cached entry for url, regardless of its age."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            with open(body_path, 'r', encoding='utf-8') as file:
+                body = file.read()
+        except (OSError, ValueError):
+            return None
+
+        # access time drives LRU eviction, entry can be evicted meanwhile
+        # by other thread or process
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return CacheEntry(body, **meta)
+
+    def get_fresh(self, url: str,
+                  ttl: Union[float, None] = None) -> Union[str, None]:
+        """Returns cached body if it is younger than ttl."""
+        entry = self.get(url)
+        if entry is not None and entry.is_fresh(self.ttl if ttl is None
+                                                else ttl):
+            return entry.body
+        return None
+
+    def set(self, url: str, body: str, etag: Union[str, None] = None,
+            last_modified: Union[str, None] = None) -> None:
+        """Stores response body with its validators."""
+        body_path, meta_path = self._paths(url)
+        meta = {'stored_at': time.time(), 'etag': etag,
+                'last_modified': last_modified}
+        old_size = self._file_size(body_path)
+
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta))
+
+        with self._lock:
+            if self._size is not None:
+                self._size += self._file_size(body_path) - old_size
+        self._evict()
+
+    @staticmethod
+    def _file_size(path: Path) -> int:
+        """Returns size of file, 0 if it does not exist."""
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    def touch(self, url: str) -> None:
+        """Marks cached entry as fresh after successful revalidation."""
+        entry = self.get(url)
+        if entry is not None:
+            _, meta_path = self._paths(url)
+            meta = {'stored_at': time.time(), 'etag': entry.etag,
+                    'last_modified': entry.last_modified}
+            self._write_atomic(meta_path, json.dumps(meta))
+
+    @staticmethod
+    def validators(entry: Union[CacheEntry, None]) -> Dict[str, str]:
+        """Returns conditional request headers for cached entry."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until cache size drops below
+        90% of max_size."""
+        with self._lock:
+            if self._size is not None and self._size <= self.max_size:
+                return
+
+            bodies = []
+            for path in self.cache_dir.glob('*/*.html'):
+                # entries are evicted concurrently by other processes
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                bodies.append((stat.st_mtime, stat.st_size, path))
+            self._size = sum(size for _, size, _ in bodies)
+            if self._size <= self.max_size:
+                return
+
+            for _, size, body_path in sorted(bodies):
+                if self._size <= self.max_size * 0.9:
+                    break
+                for path in (body_path, body_path.with_suffix('.json')):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                self._size -= size
+
+    def clear(self) -> None:
+        """Removes all cached entries."""
+        with self._lock:
+            for path in self.cache_dir.glob('*/*'):
+                path.unlink(missing_ok=True)
+            self._size = 0
@@ -1,20 +1,92 @@
-from typing import Union, Dict, List
+from typing import Union, Dict, List, Iterable
+from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from scrapper.phrase_matcher import PhraseMatcher, compile_phrase
+from scrapper.html_nodes import (Node, SoupNode, as_node, engine_available,
+                                 parse_lexbor)
+
+
+def strain_elements(tags: Iterable[str] = (),
+                    classes: Iterable[str] = ()) -> SoupStrainer:
+    """Builds SoupStrainer keeping only subtrees of elements with given tag
+    names or css classes."""
+    tags, classes = set(tags), set(classes)
+
+    def _match(name: str, attrs: Dict) -> bool:
+        if name in tags:
+            return True
+        el_classes = attrs.get('class') or ''
+        if isinstance(el_classes, str):
+            el_classes = el_classes.split()
+        return not classes.isdisjoint(el_classes)
+
+    return SoupStrainer(_match)
 
 
 class ShopParser:
     """Base class for shop parser. Defines parse_data method for implementation
     in subclass."""
+    # html parser engine: 'soup' (BeautifulSoup) or 'lexbor' (selectolax)
+    html_engine = 'soup'
+    # BeautifulSoup tree builder used for search results page
+    soup_features = 'html.parser'
+    # elements needed by parse_data, only their subtrees are parsed when
+    # parse_only is enabled
+    strain_tags = ()
+    strain_classes = ()
+    parse_only = False
+    # seconds for which fetched page is served from response cache,
+    # None uses cache default
+    cache_ttl = None
+    # products not containing all words of search phrase are skipped,
+    # words are compared without diacritics and optionally as prefixes
+    fold_diacritics = True
+    prefix_match = False
 
     def __init__(self, shop_id: int, shop_url: str, search_str: str,
-                 parser_type: str):
+                 parser_type: str, soup_features: Union[str, None] = None,
+                 parse_only: Union[bool, None] = None,
+                 html_engine: Union[str, None] = None,
+                 cache_ttl: Union[float, None] = None):
         self.shop_id = shop_id
         self.url = shop_url
         self.search_str = search_str
         self.parser_type = parser_type
+        if html_engine is not None:
+            self.html_engine = html_engine
+        if cache_ttl is not None:
+            self.cache_ttl = cache_ttl
+        if soup_features is not None:
+            self.soup_features = soup_features
+        if parse_only is not None:
+            self.parse_only = parse_only
+
+    def make_soup(self, markup: Union[str, bytes]) -> BeautifulSoup:
+        """Builds BeautifulSoup object with shop parser backend. Falls back
+        to html.parser when configured backend is not installed."""
+        features = self.soup_features
+        if builder_registry.lookup(features) is None:
+            features = 'html.parser'
+
+        strainer = None
+        if self.parse_only and (self.strain_tags or self.strain_classes):
+            strainer = strain_elements(self.strain_tags, self.strain_classes)
+
+        return BeautifulSoup(markup, features=features, parse_only=strainer)
+
+    def make_document(self, markup: Union[str, bytes]) -> Node:
+        """Parses html with shop parser engine. Falls back to BeautifulSoup
+        when configured engine is not installed."""
+        if self.html_engine == 'lexbor' and engine_available('lexbor'):
+            return parse_lexbor(markup)
+        return SoupNode(self.make_soup(markup))
 
     def initialize_product(self, phrase: str) -> Dict[str, Union[int, str]]:
         """Creates product dictionary to be populated with further data."""
@@ -24,28 +96,29 @@ class ShopParser:
     def parse_data(self, *args):
         raise NotImplementedError('Method must be implemented')
 
-    @staticmethod
-    def check_product_description(phrase: str, description: str) -> bool:
-        """Checks if all words from search phrase are included in product
-        description."""
-        phrase_list = phrase.split()
-        desc_list = description.split()
-
-        included = 0
-        for ph in phrase_list:
-            if ph in desc_list: included += 1
+    def is_cacheable_page(self, html: str) -> bool:
+        """Checks if rendered page can be stored in response cache."""
+        return bool(html and html.strip())
 
-        check = True if included == len(phrase_list) else False
-        return check
+    def phrase_matcher(self, phrase: str) -> PhraseMatcher:
+        """Returns compiled matcher of search phrase."""
+        return compile_phrase(phrase, self.fold_diacritics, self.prefix_match)
 
 
 class RossmanParser(ShopParser):
     """Parser for extracting Rossman shop data from BeautifulSoup object."""
     shop_name = 'rossman'
-
-    def parse_data(self, soup: BeautifulSoup, phrase: str = '') -> List[Dict]:
+    html_engine = 'lexbor'
+    soup_features = 'lxml'
+    strain_tags = ('h4',)
+    strain_classes = ('tile-product',)
+    parse_only = True
+
+    def parse_data(self, soup: Union[BeautifulSoup, Node],
+                   phrase: str = '') -> List[Dict]:
         """Extracts data from html elements for all products in soup.
         Returns data per each product in list of dictionaries."""
+        soup = as_node(soup)
         prod_els = soup.select('.tile-product')
         empty_els = soup.select('.skeleton')
 
@@ -56,34 +129,41 @@ class RossmanParser(ShopParser):
         if 'brak' in result_caption.text.lower():
             return []
 
+        matcher = self.phrase_matcher(phrase)
         all_products = []
         for el in prod_els:
-            if 'skeleton' in el.attrs['class']:
+            if 'skeleton' in el.classes:
+                continue
+
+            prod_children = el.select_one('[class*=name]').children()
+            name = prod_children[0].text.lower()
+            # prod_desc = prod_children[1].text
+            description = prod_children[1] \
+                .own_text.strip().strip(',').lower()
+            # products not matching search phrase are skipped before
+            # extraction of remaining fields
+            if not matcher.matches(name, description):
                 continue
 
             product = self.initialize_product(phrase)
             product['shop_name'] = self.shop_name
-
-            prod_children = el.select_one('[class*=name]').findChildren()
-            product['name'] = prod_children[0].text.lower()
-            # prod_desc = prod_children[1].text
-            product['description'] = prod_children[1] \
-                .contents[0].strip().strip(',').lower()
+            product['name'] = name
+            product['description'] = description
             # size extraction
             try:
                 product['size'] = prod_children[2].text
             except IndexError:
                 product['size'] = ''
             # price extraction
-            prices_children = el.select_one('[class*=price]').findChildren()
+            prices_children = el.select_one('[class*=price]').children()
             prices_children = [
                 price.text.replace('zł', '').replace(',', '.').strip()
                 for price in prices_children if price.text
             ]
             product['price'] = float(min(prices_children))
             # remaining fields
-            product['image_url'] = el.find('img')['src']
-            product['url'] = el.find('a')['href']
+            product['image_url'] = el.select_one('img')['src']
+            product['url'] = el.select_one('a')['href']
 
             all_products.append(product)
 
@@ -93,37 +173,49 @@ class RossmanParser(ShopParser):
 class HebeParser(ShopParser):
     """Parser for extracting Hebe shop data from BeautifulSoup object."""
     shop_name = 'hebe'
+    html_engine = 'lexbor'
+    soup_features = 'lxml'
+    strain_classes = ('product-tile',)
+    parse_only = True
 
-    def parse_data(self, soup: BeautifulSoup, phrase: str = '') -> List[Dict]:
+    def parse_data(self, soup: Union[BeautifulSoup, Node],
+                   phrase: str = '') -> List[Dict]:
         """Extracts data from html elements for all products in soup.
         Returns data per each product in list of dictionaries."""
+        soup = as_node(soup)
         prod_els = soup.select('.product-tile')
         if not prod_els:
             return []
 
+        matcher = self.phrase_matcher(phrase)
         all_products = []
         for el in prod_els:
-            product = self.initialize_product(phrase)
-            product['shop_name'] = self.shop_name
-
-            product['name'] = el.select_one('[class*=name]') \
-                .text.strip().lower()
+            name = el.select_one('[class*=name]').text.strip().lower()
             # description & size extraction
             prod_desc = el.select_one('.tooltip__content') \
                 .select('.text--center')[-1].text.strip().split(',')
+            # products not matching search phrase are skipped before
+            # extraction of remaining fields
+            if not matcher.matches(name, prod_desc[0]):
+                continue
+
+            product = self.initialize_product(phrase)
+            product['shop_name'] = self.shop_name
+            product['name'] = name
             product['description'] = prod_desc[0]
             product['size'] = prod_desc[-1].strip()
             # price extraction
             prod_pricing = el.select_one('[class*=price]')
             prod_price = prod_pricing.select_one('[class*=sales]') \
-                .contents[0].strip()
+                .own_text.strip()
             prod_price = prod_price + '.' + prod_pricing.select_one(
                 '[class*=sales]').select_one('[class*=decimal]').text
             product['price'] = float(prod_price)
             # remaining fields
-            product['image_url'] = el.find('img')['data-srcset'].split('?')[0]
+            product['image_url'] = el.select_one('img')['data-srcset'] \
+                .split('?')[0]
             # srcset = ....png?sw=200&sh=200&sm=fit
-            product['url'] = el.find('a')['href']
+            product['url'] = el.select_one('a')['href']
 
             all_products.append(product)
 
@@ -134,14 +226,103 @@ class SuperpharmParser(ShopParser):
     """Parser for extracting Superpharm shop data from search url.
     Uses Chrome webdriver."""
     shop_name = 'superpharm'
+    html_engine = 'lexbor'
+    soup_features = 'lxml'
+    strain_classes = ('products-count-up', 'result-content')
+    parse_only = True
+    # parse single page_source snapshot instead of querying driver
+    # for each element
+    use_snapshot = True
+    wait_timeout = 15
 
     def parse_data(self, driver: webdriver, phrase: str = '') -> List[Dict]:
         """Extracts data from html elements for all products loaded on page."""
-        # page = driver.page_source
-        # f = codecs.open(f'{os.getcwd()}/tests/data/superpharm_test_nodata.html',
-        #                 'w', encoding='utf-8')
-        # f.write(page)
+        if self.use_snapshot:
+            html = self.get_page_snapshot(driver)
+            document = self.make_document(html)
+            return self.parse_soup(document, phrase,
+                                   base_url=driver.current_url)
+
+        return self.parse_elements(driver, phrase)
+
+    def get_page_snapshot(self, driver: webdriver) -> str:
+        """Waits for search results to render and returns page source."""
+        WebDriverWait(driver, self.wait_timeout).until(
+            EC.presence_of_element_located(
+                (By.CLASS_NAME, 'products-count-up'))
+        )
+        return driver.page_source
+
+    def is_cacheable_page(self, html: str) -> bool:
+        """Checks if page snapshot contains rendered search results, error
+        pages and pages without products are not cached."""
+        if not super().is_cacheable_page(html):
+            return False
+        return bool(self.parse_soup(self.make_document(html)))
+
+    @staticmethod
+    def _element_text(el: Node) -> str:
+        """Returns element text with whitespace collapsed, as rendered
+        by browser."""
+        return ' '.join(el.text.split())
+
+    def parse_soup(self, soup: Union[BeautifulSoup, Node], phrase: str = '',
+                   base_url: Union[str, None] = None) -> List[Dict]:
+        """Extracts data from html elements of rendered search results page.
+        Relative links are resolved against base_url."""
+        soup = as_node(soup)
+        base_url = base_url or self.url
+
+        result_caption = soup.select_one('.products-count-up')
+        if result_caption is None:
+            return []
+        result_caption = self._element_text(result_caption).replace('(', '')
+        if result_caption[:2] == '0 ':
+            return []
+
+        prod_els = soup.select('.result-content')
+        if not prod_els:
+            return []
+
+        matcher = self.phrase_matcher(phrase)
+        all_products = []
+        for el in prod_els:
+            name = self._element_text(el.select_one('.result-title')).lower()
+            description = self._element_text(
+                el.select_one('.result-description')).lower()
+            # additional check to narrow down broad search results
+            if not matcher.matches(name, description):
+                continue
+
+            product = self.initialize_product(phrase)
+            product['shop_name'] = self.shop_name
+            product['name'] = name
+            product['description'] = description
 
+            # price extraction
+            prod_price = self._element_text(
+                el.select_one('.price-wrapper .after_special'))
+            prod_price = prod_price.replace(',', '.') \
+                .replace(' zł', '')
+            product['price'] = float(prod_price)
+            # size extraction, select element itself is hidden on page
+            size_el = el.select_one('.custom-select-wrapper')
+            size_el = size_el.select_one('.select-selected') or size_el
+            product['size'] = self._element_text(size_el).split(':')[-1]
+            # remaining fields
+            prod_img = el.select_one('.result-thumbnail')
+            product['image_url'] = urljoin(
+                base_url, prod_img.select_one('img')['src'])
+            product['url'] = urljoin(base_url,
+                                     prod_img.select_one('a')['href'])
+
+            all_products.append(product)
+
+        return all_products
+
+    def parse_elements(self, driver: webdriver,
+                       phrase: str = '') -> List[Dict]:
+        """Extracts data by querying webdriver for each html element."""
         result_caption = driver.find_element(
             By.CLASS_NAME, 'products-count-up'
         ).text.replace('(', '')
@@ -152,21 +333,21 @@ class SuperpharmParser(ShopParser):
         if not prod_els:
             return []
 
+        matcher = self.phrase_matcher(phrase)
         all_products = []
         for el in prod_els:
-            product = self.initialize_product(phrase)
-            product['shop_name'] = self.shop_name
-
-            product['name'] = el.find_element(
-                By.CLASS_NAME, 'result-title').text.lower()
-            product['description'] = el.find_element(
+            name = el.find_element(By.CLASS_NAME, 'result-title').text.lower()
+            description = el.find_element(
                 By.CLASS_NAME, 'result-description').text.lower()
-
             # additional check to narrow down broad search results
-            prod_desc = product['name'] + ' ' + product['description']
-            if not self.check_product_description(phrase, prod_desc):
+            if not matcher.matches(name, description):
                 continue
 
+            product = self.initialize_product(phrase)
+            product['shop_name'] = self.shop_name
+            product['name'] = name
+            product['description'] = description
+
             # price extraction
             prod_price = el.find_element(
                 By.CLASS_NAME, 'price-wrapper') \
@@ -188,8 +369,6 @@ class SuperpharmParser(ShopParser):
 
             all_products.append(product)
 
-        driver.close()
-
         return all_products
 
 
@@ -0,0 +1,150 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class _Call:
+    """In-flight call shared by its waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution, all
+    waiters get its result. Calls are coalesced between threads of one
+    process and, when lock_dir is set, between processes through file locks
+    and json result files. Files older than max_age seconds are pruned."""
+
+    def __init__(self, lock_dir: Union[str, Path, None] = None,
+                 max_age: float = 60):
+        self.lock_dir = Path(lock_dir) if lock_dir else None
+        self.max_age = max_age
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._pruned = 0.0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Runs func unless call with the same key is already in flight,
+        in which case waits for its result. Waiters get copy of the result,
+        so that they can modify it independently."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            if self.lock_dir is not None and fcntl is not None:
+                result = self._do_locked(key, func)
+            else:
+                result = func()
+            # leader may modify returned result while waiters copy it
+            call.result = copy.deepcopy(result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return result
+
+    def _do_locked(self, key: str, func: Callable[[], Any]) -> Any:
+        """Runs func holding exclusive file lock of the key. Result written
+        by other process while waiting for the lock is reused."""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self.lock_dir / f'{digest}.lock'
+        result_path = self.lock_dir / f'{digest}.json'
+
+        waiting_since = time.time()
+        with self._open_locked(lock_path, fcntl.LOCK_EX) as lock_file:
+            try:
+                try:
+                    if result_path.stat().st_mtime >= waiting_since:
+                        with open(result_path, 'r', encoding='utf-8') as file:
+                            return json.load(file)
+                except (OSError, ValueError):
+                    pass
+
+                result = func()
+                tmp_path = result_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    json.dump(result, file)
+                tmp_path.replace(result_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        if time.time() - self._pruned >= self.max_age:
+            self.prune()
+        return result
+
+    @staticmethod
+    def _open_locked(lock_path: Path, operation: int) -> IO:
+        """Opens lock file and locks it with flock operation. Lock file
+        unlinked by prune meanwhile is opened again, so that processes never
+        hold lock of orphaned file while other process locks new file at
+        the same path."""
+        while True:
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, operation)
+                if os.path.samestat(os.fstat(lock_file.fileno()),
+                                    os.stat(lock_path)):
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                lock_file.close()
+                raise
+            lock_file.close()
+
+    def prune(self) -> int:
+        """Removes result files older than max_age, waiters read the result
+        as soon as they get the lock, so older results are never reused.
+        Lock files are removed when no process holds them, processes which
+        opened them meanwhile lock the file at the path again, see
+        _open_locked. Returns number of removed files."""
+        self._pruned = now = time.time()
+        removed = 0
+        for path in self.lock_dir.glob('*.json'):
+            try:
+                if now - path.stat().st_mtime >= self.max_age:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+
+        for lock_path in self.lock_dir.glob('*.lock'):
+            if lock_path.with_suffix('.json').exists():
+                continue
+            try:
+                with self._open_locked(lock_path,
+                                       fcntl.LOCK_EX | fcntl.LOCK_NB):
+                    lock_path.unlink()
+                    removed += 1
+            except OSError:
+                # lock is held by call in flight
+                pass
+        return removed
@@ -0,0 +1,102 @@
+import threading
+from unittest.mock import patch, MagicMock
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from scrapper.browser_pool import BrowserPool
+
+
+def fake_driver():
+    """Creates mocked chrome webdriver with single open tab."""
+    driver = MagicMock()
+    driver.window_handles = ['tab-1']
+    return driver
+
+
+@pytest.fixture
+def pool():
+    """Creates browser pool launching mocked webdrivers."""
+    pool = BrowserPool('/usr/local/bin/chromedriver', size=2, max_uses=3,
+                       checkout_timeout=0.1)
+    with patch.object(BrowserPool, '_create_driver',
+                      side_effect=lambda: fake_driver()) as mocked_create:
+        pool.mocked_create = mocked_create
+        yield pool
+
+
+def test_browser_pool_reuses_released_browser(pool):
+    """Test browser is launched once and reused between checkouts."""
+    with pool.checkout() as driver:
+        pass
+    with pool.checkout() as reused_driver:
+        pass
+
+    assert reused_driver is driver
+    assert pool.mocked_create.call_count == 1
+    driver.delete_all_cookies.assert_called()
+    driver.get.assert_called_with('about:blank')
+    driver.quit.assert_not_called()
+
+
+def test_browser_pool_resets_additional_tabs(pool):
+    """Test tabs opened during search are closed on release."""
+    with pool.checkout() as driver:
+        driver.window_handles = ['tab-1', 'tab-2']
+
+    driver.switch_to.window.assert_called_with('tab-1')
+    driver.close.assert_called_once()
+
+
+def test_browser_pool_recycles_browser_after_max_uses(pool):
+    """Test browser is quit after max_uses checkouts and replaced."""
+    for _ in range(pool.max_uses):
+        with pool.checkout() as driver:
+            pass
+    with pool.checkout() as new_driver:
+        pass
+
+    driver.quit.assert_called_once()
+    assert new_driver is not driver
+
+
+def test_browser_pool_replaces_unhealthy_browser(pool):
+    """Test browser which stopped responding is replaced on checkout."""
+    with pool.checkout() as driver:
+        pass
+    type(driver).current_url = property(
+        MagicMock(side_effect=WebDriverException('chrome not reachable')))
+
+    with pool.checkout() as new_driver:
+        pass
+
+    driver.quit.assert_called_once()
+    assert new_driver is not driver
+
+
+def test_browser_pool_is_bounded(pool):
+    """Test checkout fails when all browsers are in use."""
+    drivers = [pool.acquire() for _ in range(pool.size)]
+
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    pool.release(drivers[0])
+    assert pool.acquire() is drivers[0]
+
+
+def test_browser_pool_waits_for_released_browser(pool):
+    """Test checkout waits for browser released by other thread."""
+    pool.checkout_timeout = 5
+    drivers = [pool.acquire() for _ in range(pool.size)]
+    threading.Timer(0.1, pool.release, args=[drivers[1]]).start()
+
+    assert pool.acquire() is drivers[1]
+
+
+def test_browser_pool_quits_foreign_browser(pool):
+    """Test browser not launched by pool is quit on release."""
+    driver = fake_driver()
+    pool.release(driver)
+
+    driver.quit.assert_called_once()
@@ -0,0 +1,49 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from scrapper.html_nodes import SoupNode, parse_lexbor
+
+
+HTML = '<div class="tile tile--big"><a href="/p/1">' \
+       '<strong>YOPE<!-- -->Figa</strong>' \
+       '<span>balsam, <span class="size">300 ml</span></span></a>' \
+       '<img data-srcset="img.png?sw=200"></div>'
+
+
+@pytest.fixture(params=['soup', 'lexbor'])
+def document(request):
+    """Parses test html with given parser engine."""
+    if request.param == 'lexbor':
+        return parse_lexbor(HTML)
+    return SoupNode(BeautifulSoup(HTML, 'html.parser'))
+
+
+def test_node_select(document):
+    """Test Node.select returns descendants only, in document order."""
+    tile = document.select_one('[class*=tile]')
+
+    assert tile.classes == ['tile', 'tile--big']
+    assert [child.text for child in tile.children()][1:] == [
+        'YOPEFiga', 'balsam, 300 ml', '300 ml', ''
+    ]
+    assert tile.select('[class*=tile]') == []
+    assert tile.select_one('.missing') is None
+
+
+def test_node_text(document):
+    """Test Node text properties skip comments and own_text returns first
+    text node only."""
+    span = document.select_one('a > span')
+
+    assert document.select_one('strong').text == 'YOPEFiga'
+    assert span.text == 'balsam, 300 ml'
+    assert span.own_text == 'balsam, '
+
+
+def test_node_attributes(document):
+    """Test Node attribute access."""
+    assert document.select_one('a')['href'] == '/p/1'
+    assert document.select_one('img').get('data-srcset') == 'img.png?sw=200'
+    assert document.select_one('img').get('src') is None
+    with pytest.raises(KeyError):
+        document.select_one('img')['src']
@@ -0,0 +1,54 @@
+import pytest
+
+from scrapper.phrase_matcher import (PhraseMatcher, compile_phrase,
+                                     fold_diacritics, tokenize)
+
+
+def test_fold_diacritics():
+    """Test polish letters are replaced by base letters."""
+    assert fold_diacritics('Zażółć gęślą jaźń') == 'Zazolc gesla jazn'
+
+
+def test_tokenize():
+    """Test text is split to lowercase words without punctuation."""
+    assert tokenize('Balsam do ciała, SPF+50') == \
+        ['balsam', 'do', 'ciala', 'spf', '50']
+    assert tokenize('ciała', fold=False) == ['ciała']
+
+
+@pytest.mark.parametrize('phrase, texts, expected', [
+    ('yope balsam', ('yope werbena', 'balsam do ciała'), True),
+    ('YOPE, Balsam', ('yope werbena', 'balsam do ciała'), True),
+    ('balsam do ciała', ('yope', 'Balsam do ciala'), True),
+    ('yope balsam', ('yope werbena', 'żel pod prysznic'), False),
+    ('', ('yope werbena',), True),
+])
+def test_phrase_matcher_matches(phrase, texts, expected):
+    """Test all phrase words are required in texts, regardless of case,
+    punctuation and diacritics."""
+    assert PhraseMatcher(phrase).matches(*texts) is expected
+
+
+def test_phrase_matcher_without_folding():
+    """Test diacritics are compared when folding is disabled."""
+    matcher = PhraseMatcher('balsam do ciała', fold=False)
+
+    assert matcher.matches('balsam do ciała')
+    assert not matcher.matches('balsam do ciala')
+
+
+def test_phrase_matcher_prefix():
+    """Test prefix matching accepts longer words starting with phrase
+    words."""
+    texts = ('yope', 'balsamy do ciała')
+
+    assert not PhraseMatcher('yope balsam').matches(*texts)
+    assert PhraseMatcher('yope balsam', prefix=True).matches(*texts)
+    assert not PhraseMatcher('yope krem', prefix=True).matches(*texts)
+
+
+def test_compile_phrase_cached():
+    """Test phrase is compiled once for the same options."""
+    assert compile_phrase('yope balsam') is compile_phrase('yope balsam')
+    assert compile_phrase('yope balsam') is not \
+        compile_phrase('yope balsam', prefix=True)
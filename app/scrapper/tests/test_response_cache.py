@@ -0,0 +1,161 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import responses
+
+from scrapper.response_cache import ResponseCache, canonical_url
+from scrapper.web_scrapper import Scrapper
+
+
+URL = 'https://www.hebe.pl/search?lang=pl_PL&q=yope%20balsam'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Creates response cache in temporary directory."""
+    return ResponseCache(tmp_path / 'cache', max_size=2 ** 20, ttl=60)
+
+
+@pytest.fixture
+def cached_scrapper(cache):
+    """Creates Scrapper object using response cache."""
+    return Scrapper([], response_cache=cache)
+
+
+def test_canonical_url_ignores_param_order_and_host_case():
+    """Test canonical_url normalizes equivalent urls to the same value."""
+    assert canonical_url('https://WWW.hebe.pl/search?q=yope&lang=pl_PL#top') \
+        == canonical_url('https://www.hebe.pl/search?lang=pl_PL&q=yope')
+
+
+def test_response_cache_get_fresh(cache):
+    """Test cached body is returned only while younger than ttl."""
+    cache.set(URL, 'yope balsam results')
+
+    assert cache.get_fresh(URL) == 'yope balsam results'
+    assert cache.get_fresh(URL, ttl=0) is None
+    assert cache.get_fresh(URL.replace('yope', 'himalaya')) is None
+
+
+def test_response_cache_evicts_least_recently_used(cache):
+    """Test least recently used entries are removed when cache is full."""
+    cache.max_size = 3000
+    urls = [URL + str(i) for i in range(3)]
+    for i, url in enumerate(urls):
+        cache.set(url, 'x' * 1000)
+        body_path, _ = cache._paths(url)
+        os.utime(body_path, (time.time() - 100 + i, time.time() - 100 + i))
+    cache.get(urls[0])
+
+    cache.set(URL + 'new', 'x' * 1000)
+
+    assert cache.get(urls[0]) is not None
+    assert cache.get(urls[1]) is None
+    assert cache.get(URL + 'new') is not None
+
+
+@responses.activate
+def test_cached_response_not_refetched(cached_scrapper):
+    """Test fresh cached response is served without request."""
+    responses.add(responses.GET, URL, body='yope balsam results', status=200)
+
+    first = cached_scrapper._get_response_text(URL)
+    second = cached_scrapper._get_response_text(URL)
+
+    assert first == second == 'yope balsam results'
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_stale_response_revalidated(cached_scrapper, cache):
+    """Test stale cached response is revalidated with conditional request
+    and served from cache when not modified."""
+    cache.set(URL, 'yope balsam results', etag='"v1"',
+              last_modified='Mon, 14 Nov 2022 09:18:00 GMT')
+    responses.add(responses.GET, URL, status=304)
+
+    resp = cached_scrapper._get_response_text(URL, ttl=0)
+
+    assert resp == 'yope balsam results'
+    assert responses.calls[0].request.headers['If-None-Match'] == '"v1"'
+    assert responses.calls[0].request.headers['If-Modified-Since'] == \
+        'Mon, 14 Nov 2022 09:18:00 GMT'
+    assert cache.get(URL).age < 5
+
+
+@responses.activate
+def test_modified_response_replaces_cached(cached_scrapper, cache):
+    """Test changed response replaces stale cached entry."""
+    cache.set(URL, 'old results', etag='"v1"')
+    responses.add(responses.GET, URL, body='new results', status=200,
+                  headers={'ETag': '"v2"'})
+
+    resp = cached_scrapper._get_response_text(URL, ttl=0)
+
+    assert resp == 'new results'
+    assert cache.get(URL).body == 'new results'
+    assert cache.get(URL).etag == '"v2"'
+
+
+def test_rendered_page_served_from_cache(cached_scrapper, cache,
+                                         initialize_parser, load_shops):
+    """Test webdriver shop search uses cached rendered page instead of
+    launching browser."""
+    parser = initialize_parser('superpharm')
+    search_url = parser.url + parser.search_str.format('yope%20balsam')
+    with open(f'{os.path.dirname(__file__)}/data/superpharm_test_data.html',
+              'r', encoding='utf-8') as fp:
+        cache.set(search_url, fp.read())
+
+    with patch.object(Scrapper, '_get_webdriver') as mocked_driver:
+        products = cached_scrapper._search_shop(parser, 'yope balsam')
+
+    mocked_driver.assert_not_called()
+    assert len(products) == 8
+    assert products[0]['url'].startswith('https://www.superpharm.pl/')
+
+
+def test_rendered_empty_page_not_cached(cached_scrapper, cache,
+                                        initialize_parser, load_shops):
+    """Test webdriver snapshot without search results is not cached."""
+    parser = initialize_parser('superpharm')
+    search_url = parser.url + parser.search_str.format('yope%20balsam')
+    with open(f'{os.path.dirname(__file__)}/data/superpharm_test_nodata.html',
+              'r', encoding='utf-8') as fp:
+        html = fp.read()
+
+    with patch.object(Scrapper, '_get_webdriver'), \
+            patch.object(Scrapper, '_release_webdriver'), \
+            patch.object(type(parser), 'get_page_snapshot',
+                         return_value=html):
+        products = cached_scrapper._search_shop(parser, 'yope balsam')
+
+    assert products == []
+    assert cache.get(search_url) is None
+
+
+def test_response_cache_get_survives_concurrent_eviction(cache):
+    """Test entry evicted between read and access time update is still
+    returned."""
+    cache.set(URL, 'results')
+
+    with patch('scrapper.response_cache.os.utime',
+               side_effect=FileNotFoundError):
+        entry = cache.get(URL)
+
+    assert entry.body == 'results'
+
+
+def test_response_cache_evict_skips_removed_entries(cache, tmp_path):
+    """Test eviction ignores entries removed by other process."""
+    cache.max_size = 10
+    cache.set(URL, 'results')
+    removed = tmp_path / 'ab' / 'removed.html'
+
+    with patch.object(type(cache.cache_dir), 'glob',
+                      return_value=[removed]):
+        cache.set(URL + '&page=2', 'more results')
+
+    assert cache.get(URL + '&page=2').body == 'more results'
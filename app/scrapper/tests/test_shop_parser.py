@@ -31,7 +31,8 @@ def driver():
     webdriver_config = {'service': Service(DRIVER_PATH), 'options': options}
 
     driver = webdriver.Chrome(**webdriver_config)
-    return driver
+    yield driver
+    driver.quit()
 
 
 def test_list_shop_parsers_when_shops_exist(db, load_shops):
@@ -73,6 +74,63 @@ def test_soup_shop_parser_products_on_page(load_shops, load_html,
     assert 'url' in parsed_data[1]
 
 
+@pytest.mark.parametrize('shop, phrase, count', [
+    ('rossman', 'yope balsam', 4),
+    ('hebe', 'yope', 3),
+    ('hebe', 'YOPE Balsam, ciała', 2),
+])
+def test_soup_shop_parser_skips_not_matching_phrase(load_shops, load_html,
+                                                    initialize_parser, shop,
+                                                    phrase, count):
+    """Test parse_data method of given shops skips products not containing
+    all words of search phrase."""
+    parser = initialize_parser(shop)
+
+    parsed_data = parser.parse_data(parser.make_document(load_html(shop)),
+                                    phrase)
+
+    assert len(parsed_data) == count
+    assert all(product['search_phrase'] == phrase
+               for product in parsed_data)
+
+
+@pytest.mark.parametrize('shop', ['rossman', 'hebe'])
+@pytest.mark.parametrize('engine,features,parse_only', [
+    ('soup', 'html.parser', True),
+    ('soup', 'lxml', False),
+    ('soup', 'lxml', True),
+    ('lexbor', 'html.parser', False),
+])
+def test_soup_shop_parser_backends_same_data(load_shops, load_html,
+                                             initialize_parser, shop,
+                                             engine, features, parse_only):
+    """Test parser engines of given shops produce the same data as full
+    html.parser tree."""
+    parser = initialize_parser(shop)
+    html = load_html(shop)
+    expected_data = parser.parse_data(BeautifulSoup(html, 'html.parser'))
+
+    parser.html_engine = engine
+    parser.soup_features = features
+    parser.parse_only = parse_only
+    parsed_data = parser.parse_data(parser.make_document(html))
+
+    assert len(parsed_data) > 0
+    assert parsed_data == expected_data
+
+
+def test_shop_parser_make_soup_falls_back_to_html_parser(load_shops,
+                                                         initialize_parser):
+    """Test make_soup uses html.parser when configured backend is not
+    installed."""
+    parser = initialize_parser('hebe')
+    parser.soup_features = 'not-installed-parser'
+
+    soup = parser.make_soup('<div class="product-tile">yope</div>')
+
+    assert soup.select_one('.product-tile').text == 'yope'
+
+
 @pytest.mark.parametrize('shop', ['rossman', 'hebe'])
 def test_soup_shop_parser_no_results_page(load_shops, load_html,
                                           initialize_parser, shop):
@@ -117,3 +175,82 @@ def test_driver_shop_parser_no_results_page(load_shops, driver,
 
     assert len(parsed_data) == 0
 
+
+
+@pytest.mark.parametrize('shop', ['superpharm'])
+def test_driver_shop_parser_snapshot_products_on_page(load_shops,
+                                                      initialize_parser,
+                                                      shop):
+    """Test parse_soup method of given shops with driver parser_type on
+    page source snapshot."""
+    parser = initialize_parser(shop)
+
+    with open(f'{DATA_PATH}{shop}_test_data.html', 'rb') as fp:
+        soup = BeautifulSoup(fp.read(), 'html.parser')
+
+    parsed_data = parser.parse_soup(soup, 'yope balsam')
+
+    assert len(parsed_data) == 8
+    assert parsed_data[0] == {
+        'shop_id': parser.shop_id, 'search_phrase': 'yope balsam',
+        'shop_name': 'superpharm', 'name': 'yope werbena',
+        'description': 'balsam do ciała', 'price': 25.49, 'size': '300 ml',
+        'image_url': 'https://media.superpharm.eu/media/catalog/product/cache/'
+                     '52c9381a73a97a587200d5cd06499801/n/a/'
+                     'naturalny-balsam-do-cia_a-yope-werbena.jpg',
+        'url': 'https://www.superpharm.pl/'
+               'yope-werbena-13438-300-ml-133431.html'
+    }
+
+
+@pytest.mark.parametrize('shop', ['superpharm'])
+def test_driver_shop_parser_snapshot_engines_same_data(load_shops,
+                                                       initialize_parser,
+                                                       shop):
+    """Test parse_soup method of given shops with driver parser_type returns
+    the same data for each parser engine."""
+    parser = initialize_parser(shop)
+    with open(f'{DATA_PATH}{shop}_test_data.html', 'rb') as fp:
+        html = fp.read()
+    expected_data = parser.parse_soup(BeautifulSoup(html, 'html.parser'))
+
+    parser.html_engine = 'lexbor'
+    parsed_data = parser.parse_soup(parser.make_document(html))
+
+    assert len(parsed_data) > 0
+    assert parsed_data == expected_data
+
+
+@pytest.mark.parametrize('shop', ['superpharm'])
+def test_driver_shop_parser_snapshot_no_results_page(load_shops,
+                                                     initialize_parser,
+                                                     shop):
+    """Test parse_soup method of given shops with driver parser_type on
+    page source snapshot when search returns no results."""
+    parser = initialize_parser(shop)
+
+    with open(f'{DATA_PATH}{shop}_test_nodata.html', 'rb') as fp:
+        soup = BeautifulSoup(fp.read(), 'html.parser')
+
+    parsed_data = parser.parse_soup(soup, 'yope balsam')
+    assert len(parsed_data) == 0
+
+
+@pytest.mark.parametrize('shop', ['superpharm'])
+def test_driver_shop_parser_snapshot_same_as_elements(load_shops, driver,
+                                                      initialize_parser,
+                                                      shop):
+    """Test parse_data method of given shops with driver parser_type returns
+    the same data for page snapshot and per element extraction."""
+    parser = initialize_parser(shop)
+
+    html = f'file:///{DATA_PATH}{shop}_test_data.html'
+    driver.get(html)
+
+    parser.use_snapshot = False
+    elements_data = parser.parse_data(driver, 'yope balsam')
+    parser.use_snapshot = True
+    snapshot_data = parser.parse_data(driver, 'yope balsam')
+
+    assert len(snapshot_data) > 0
+    assert snapshot_data == elements_data
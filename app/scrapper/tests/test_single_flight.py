@@ -0,0 +1,161 @@
+import os
+import time
+import fcntl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from scrapper.single_flight import SingleFlight
+from scrapper.web_scrapper import Scrapper
+
+
+def slow_search(calls, delay=0.2):
+    """Factory function for slow search counting its executions."""
+    def _search():
+        calls.append(threading.get_ident())
+        time.sleep(delay)
+        return [{'name': 'yope figa', 'price': 21.99}]
+    return _search
+
+
+def test_single_flight_coalesces_threads():
+    """Test concurrent calls with the same key share one execution."""
+    single_flight = SingleFlight()
+    calls = []
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(
+            lambda _: single_flight.do('1:yope balsam', slow_search(calls)),
+            range(5)))
+
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_single_flight_waiters_get_copy():
+    """Test waiters get independent copies of shared result."""
+    single_flight = SingleFlight()
+    calls = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(
+            lambda _: single_flight.do('1:yope balsam', slow_search(calls)),
+            range(2)))
+    results[0][0].pop('price')
+
+    assert 'price' in results[1][0]
+
+
+def test_single_flight_different_keys_not_coalesced():
+    """Test calls with different keys run independently."""
+    single_flight = SingleFlight()
+    calls = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(
+            lambda key: single_flight.do(key, slow_search(calls)),
+            ['1:yope balsam', '2:yope balsam']))
+
+    assert len(calls) == 2
+
+
+def test_single_flight_error_shared_with_waiters():
+    """Test error of shared call is raised for all waiters and next call
+    runs again."""
+    single_flight = SingleFlight()
+
+    def failing_search():
+        time.sleep(0.2)
+        raise ConnectionError('shop unavailable')
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(single_flight.do, '1:yope', failing_search)
+                   for _ in range(3)]
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result()
+
+    assert single_flight.do('1:yope', lambda: []) == []
+
+
+def test_single_flight_coalesces_processes(tmp_path):
+    """Test calls of separate registries sharing lock directory, as in
+    separate worker processes, reuse result of the call which held the
+    lock."""
+    workers = [SingleFlight(tmp_path), SingleFlight(tmp_path)]
+    calls = []
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(worker.do, '1:yope balsam',
+                                   slow_search(calls))
+                   for worker in workers]
+    results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert results[0] == results[1]
+
+
+def test_single_flight_prunes_old_files(tmp_path):
+    """Test result files older than max_age are removed with lock files
+    not held by any call, so that lock directory does not grow."""
+    single_flight = SingleFlight(tmp_path, max_age=60)
+    for key in ('1:yope', '2:yope', '3:yope'):
+        single_flight.do(key, lambda: [])
+    old_time = time.time() - 120
+    for path in tmp_path.glob('*'):
+        os.utime(path, (old_time, old_time))
+    held = open(next(tmp_path.glob('*.lock')), 'a')
+    fcntl.flock(held, fcntl.LOCK_EX)
+
+    try:
+        removed = single_flight.prune()
+    finally:
+        held.close()
+
+    assert removed == 5
+    assert list(tmp_path.glob('*')) == [Path(held.name)]
+
+
+@patch.object(Scrapper, '_scrape_shop')
+def test_scrapper_coalesces_identical_searches(mocked_scrape):
+    """Test Scrapper objects sharing single flight registry scrape the same
+    (phrase, shop) once when searched at the same time."""
+    calls = []
+    mocked_scrape.side_effect = lambda shop, phrase: slow_search(calls)()
+    single_flight = SingleFlight()
+    shop = type('Shop', (), {'shop_id': 1})()
+    scrappers = [Scrapper([shop], single_flight=single_flight)
+                 for _ in range(3)]
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(
+            lambda scrapper: scrapper._search_shop(shop, 'yope balsam'),
+            scrappers))
+
+    assert len(calls) == 1
+    assert results[0] == results[2]
+
+
+def test_single_flight_relocks_pruned_lock_file(tmp_path):
+    """Test lock file unlinked by prune of other process before it is locked
+    is not used, the file at lock path is locked instead."""
+    lock_path = tmp_path / 'key.lock'
+    flock = fcntl.flock
+    pruned = []
+
+    def flock_after_prune(file, operation):
+        if not pruned:
+            pruned.append(lock_path)
+            lock_path.unlink()
+        flock(file, operation)
+
+    with patch('scrapper.single_flight.fcntl.flock',
+               side_effect=flock_after_prune):
+        with SingleFlight._open_locked(lock_path, fcntl.LOCK_EX) as lock_file:
+            assert os.path.samestat(os.fstat(lock_file.fileno()),
+                                    os.stat(lock_path))
+
+    assert len(pruned) == 1
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from scrapper.throttle import (AdaptiveLimiter, CircuitBreaker,
+                               CircuitOpenError, CircuitState, ShopThrottle,
+                               TokenBucket, get_throttle, reset_throttles)
+
+
+def test_token_bucket_burst_and_refill(fake_clock):
+    """Test bucket allows burst of capacity and then refills at rate."""
+    clock = fake_clock
+    bucket = TokenBucket(rate=0.5, capacity=2, clock=clock)
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == 2
+
+    clock.now = 2
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_token_bucket_capacity_limit(fake_clock):
+    """Test tokens do not accumulate over capacity."""
+    clock = fake_clock
+    bucket = TokenBucket(rate=1, capacity=3, clock=clock)
+
+    clock.now = 100
+    assert [bucket.try_acquire() for _ in range(4)] == \
+        [True, True, True, False]
+
+
+def test_adaptive_limiter_increase_and_decrease(fake_clock):
+    """Test limit grows with fast successful requests and is halved once
+    for concurrent failed or slow requests."""
+    clock = fake_clock
+    limiter = AdaptiveLimiter(max_limit=4, initial=1, target_latency=10,
+                              clock=clock)
+
+    for _ in range(3):
+        limiter.release(limiter.acquire())
+    assert int(limiter.limit) == 2
+
+    clock.now = 1
+    first, second = limiter.acquire(), limiter.acquire()
+    clock.now = 20
+    limiter.release(first)
+    limiter.release(second, failed=True)
+    assert limiter.limit == pytest.approx(2.9 / 2)
+    assert limiter.in_flight == 0
+
+    limiter.release(limiter.acquire(), failed=True)
+    assert limiter.limit == 1
+
+
+def test_adaptive_limiter_blocks_over_limit():
+    """Test request waits for free slot when limit is reached."""
+    limiter = AdaptiveLimiter(max_limit=1)
+    started = limiter.acquire()
+    acquired = threading.Event()
+
+    def _acquire():
+        limiter.acquire()
+        acquired.set()
+
+    threading.Thread(target=_acquire, daemon=True).start()
+    assert not acquired.wait(0.1)
+    limiter.release(started)
+    assert acquired.wait(1)
+
+
+def test_circuit_breaker_opens_and_closes(fake_clock):
+    """Test circuit opens after failures in window, lets single trial
+    request through after reset timeout and closes on its success."""
+    clock = fake_clock
+    breaker = CircuitBreaker(failure_threshold=2, window=3, reset_timeout=60,
+                             clock=clock)
+
+    for failed in [True, False, False, True]:
+        breaker.before_request()
+        breaker.record(failed)
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.before_request()
+    breaker.record(True)
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    clock.now = 60
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record(False)
+    assert breaker.state == CircuitState.CLOSED
+    breaker.before_request()
+
+
+def test_circuit_breaker_failed_trial(fake_clock):
+    """Test failed trial request opens circuit again."""
+    clock = fake_clock
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60,
+                             clock=clock)
+    breaker.before_request()
+    breaker.record(True)
+
+    clock.now = 60
+    breaker.before_request()
+    breaker.record(True)
+
+    clock.now = 100
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_shop_throttle_records_failed_requests(fake_clock):
+    """Test exceptions raised in request context open circuit."""
+    throttle = ShopThrottle(failure_threshold=2, clock=fake_clock)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with throttle.request():
+                raise ConnectionError('shop unavailable')
+
+    assert throttle.limiter.in_flight == 0
+    assert throttle.limiter.limit == 1
+    with pytest.raises(CircuitOpenError):
+        with throttle.request():
+            pass
+
+
+def test_get_throttle_is_shared_per_host():
+    """Test throttle.get_throttle returns one throttle per shop host."""
+    reset_throttles()
+    throttle = get_throttle('https://www.hebe.pl/search?q=yope', rate=1)
+
+    assert get_throttle('https://WWW.hebe.pl/other') is throttle
+    assert get_throttle('https://www.rossmann.pl/szukaj') is not throttle
+    reset_throttles()
@@ -1,5 +1,9 @@
 import json
-from unittest.mock import patch, call
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch, call
 
 import pytest
 import requests
@@ -10,6 +14,9 @@ from selenium.webdriver.chrome.service import Service
 
 from conftest import DATA_PATH, DRIVER_PATH
 from scrapper.web_scrapper import Scrapper
+from scrapper.http_session import close_sessions, get_session, JitteredRetry
+from scrapper.throttle import (CircuitOpenError, get_throttle,
+                               reset_throttles)
 from scrapper.product_search import get_products_by_search_phrases
 
 
@@ -32,7 +39,7 @@ def webscrapper(db, load_shops, initialize_parser, request):
     return scrapper
 
 
-def get_soup_mocked(search_url):
+def get_soup_mocked(search_url, shop=None):
     """Function for mocked Scrapper._get_soup method."""
     search_url = f'{DATA_PATH}{SHOP_SOUP_PARSER}_test_data.txt'
     with open(search_url, 'rb') as fp:
@@ -42,8 +49,9 @@ def get_soup_mocked(search_url):
     return soup
 
 
+@contextmanager
 def get_driver_mocked(search_url):
-    """Function for mocked Scrapper._get_webdriver method."""
+    """Function for mocked Scrapper._webdriver_page method."""
     search_url = f'file:///{DATA_PATH}{SHOP_DRIVER_PARSER}_test_data.html'
 
     options = webdriver.ChromeOptions()
@@ -54,8 +62,11 @@ def get_driver_mocked(search_url):
     webdriver_config = {'service': Service(DRIVER_PATH), 'options': options}
 
     driver = webdriver.Chrome(**webdriver_config)
-    driver.get(search_url)
-    return driver
+    try:
+        driver.get(search_url)
+        yield driver
+    finally:
+        driver.quit()
 
 
 @pytest.fixture(scope='module')
@@ -66,9 +77,13 @@ def search_phrases_test_data():
     return data
 
 
-def search_by_single_phrase_mocked(data):
-    """Factory function for filtering data depending on search phrase."""
-    return lambda s_phrase: [d for d in data if d['search_phrase'] == s_phrase]
+def search_shop_mocked(data):
+    """Factory function for filtering data depending on shop and
+    search phrase."""
+    return lambda shop, s_phrase: [
+        d for d in data
+        if d['search_phrase'] == s_phrase and d['shop_id'] == shop.shop_id
+    ]
 
 
 @pytest.mark.parametrize('webscrapper', [[SHOP_SOUP_PARSER]], indirect=True)
@@ -84,7 +99,7 @@ def test_search_single_phrase_soup(mocked_soup, webscrapper):
 
 
 @pytest.mark.parametrize('webscrapper', [[SHOP_DRIVER_PARSER]], indirect=True)
-@patch.object(Scrapper, '_get_webdriver', side_effect=get_driver_mocked)
+@patch.object(Scrapper, '_webdriver_page', side_effect=get_driver_mocked)
 def test_search_single_phrase_driver(mocked_driver, webscrapper):
     """Tests Scrapper.search_by_single_phrase method for driver parser."""
     search_phrase = 'yope balsam'
@@ -96,26 +111,118 @@ def test_search_single_phrase_driver(mocked_driver, webscrapper):
 
 
 @pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
-@patch('scrapper.web_scrapper.Scrapper.search_by_single_phrase')
+@patch('scrapper.web_scrapper.Scrapper._search_shop')
 def test_search_by_phrases(mocked_search, webscrapper, search_phrases_test_data):
     """Test Scrapper.search_by_phrases method for both parser types."""
-    mocked_search.side_effect = search_by_single_phrase_mocked(
-        search_phrases_test_data
-    )
+    mocked_search.side_effect = search_shop_mocked(search_phrases_test_data)
 
     search_phrases = ['yope balsam', 'himalaya pasta']
     webscrapper.search_phrases = search_phrases
     products = webscrapper.search_by_phrases()
 
     assert len(products) > 0
-    calls = [call(search_phrases[0]), call(search_phrases[1])]
-    mocked_search.assert_has_calls(calls)
+    calls = [call(shop, s_phrase) for s_phrase in search_phrases
+             for shop in webscrapper.shops]
+    mocked_search.assert_has_calls(calls, any_order=True)
     assert products[1]['shop_name'] in SHOPS
 
 
 @pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
-@patch('scrapper.web_scrapper.Scrapper.search_by_single_phrase',
-       return_value=[])
+@patch('scrapper.web_scrapper.Scrapper._search_shop')
+def test_search_by_phrases_same_as_sequential(mocked_search, webscrapper,
+                                              search_phrases_test_data):
+    """Test concurrent Scrapper.search_by_phrases returns the same products
+    as searching phrase by phrase."""
+    mocked_search.side_effect = search_shop_mocked(search_phrases_test_data)
+
+    search_phrases = ['yope balsam', 'himalaya pasta']
+    sequential = []
+    for s_phrase in search_phrases:
+        sequential.extend(webscrapper.search_by_single_phrase(s_phrase))
+
+    webscrapper.search_phrases = search_phrases
+    products = webscrapper.search_by_phrases()
+
+    assert products == webscrapper._transform_searched_data(sequential)
+
+
+def test_transform_searched_data_same_as_pandas(search_phrases_test_data):
+    """Test products are sorted in the same order as by former pandas
+    implementation."""
+    pytest.importorskip('pandas')
+    from scrapper.benchmarks.transform_benchmark import (generate_products,
+                                                         transform_pandas)
+    scrapper = Scrapper([])
+
+    for products in [search_phrases_test_data, generate_products(2000)]:
+        assert scrapper._transform_searched_data(products) == \
+            transform_pandas(products)
+        assert all('search_phrase' in product for product in products)
+
+
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+def test_search_by_phrases_runs_concurrently(webscrapper):
+    """Test Scrapper.search_by_phrases runs (phrase, shop) searches at once
+    and respects per shop concurrency limit."""
+    delay = 0.2
+    lock = threading.Lock()
+    running = {shop.shop_id: 0 for shop in webscrapper.shops}
+    max_running = dict(running)
+
+    def search_shop_slow(shop, s_phrase):
+        with lock:
+            running[shop.shop_id] += 1
+            max_running[shop.shop_id] = max(max_running[shop.shop_id],
+                                            running[shop.shop_id])
+        time.sleep(delay)
+        with lock:
+            running[shop.shop_id] -= 1
+        return []
+
+    webscrapper.search_phrases = ['yope balsam', 'himalaya pasta']
+    webscrapper.max_concurrency = 6
+    webscrapper.shop_concurrency = 2
+    with patch.object(webscrapper, '_search_shop',
+                      side_effect=search_shop_slow):
+        start = time.perf_counter()
+        webscrapper.search_by_phrases()
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 6 * delay / 2
+    assert max(max_running.values()) <= 2
+
+
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+def test_iter_search_results_as_completed(webscrapper):
+    """Test Scrapper.iter_search_results yields result of each shop as soon
+    as it is searched and yields failed searches with error."""
+    delays = {'rossman': 0.0, 'hebe': 0.1, 'superpharm': 0.3}
+
+    def search_shop_delayed(shop, s_phrase):
+        time.sleep(delays[shop.shop_name])
+        if shop.shop_name == 'hebe':
+            raise ConnectionError('shop unavailable')
+        return [{'shop_id': shop.shop_id, 'name': s_phrase}]
+
+    webscrapper.search_phrases = ['yope balsam']
+    with patch.object(webscrapper, '_search_shop',
+                      side_effect=search_shop_delayed):
+        start = time.perf_counter()
+        results = webscrapper.iter_search_results()
+        first = next(results)
+        first_elapsed = time.perf_counter() - start
+        results = [first] + list(results)
+
+    assert first_elapsed < delays['superpharm']
+    assert [result.shop.shop_name for result in results] == SHOPS
+    assert isinstance(results[1].error, ConnectionError)
+    assert results[1].products == []
+    assert results[2].products == [{'shop_id': results[2].shop.shop_id,
+                                    'name': 'yope balsam'}]
+
+
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+@patch('scrapper.web_scrapper.Scrapper._search_shop', return_value=[])
 def test_search_by_phrases_no_data(mocked_search, webscrapper):
     """Test Scrapper.search_by_phrases method when no search phrases
     are passed. Should return empty list of products."""
@@ -158,6 +265,138 @@ def test_failed_mocked_get_response(search_url, webscrapper):
     assert responses.calls[0].request.url == url
 
 
+@responses.activate
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+def test_mocked_get_response_retried_on_unavailable(webscrapper):
+    """Test request is retried when shop is temporarily unavailable."""
+    url = SEARCH_URLS[0].format('yope%20balsam')
+
+    responses.add(responses.GET, url, status=503)
+    responses.add(responses.GET, url, body='yope balsam results', status=200)
+    resp = webscrapper._get_response_text(url)
+
+    assert resp == 'yope balsam results'
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+def test_failing_shop_skipped(webscrapper):
+    """Test shop is not requested once its circuit breaker is open and it
+    is skipped in search results."""
+    reset_throttles()
+    close_sessions()
+    webscrapper.throttle_options = {'failure_threshold': 2,
+                                    'reset_timeout': 60}
+    webscrapper.http_options = {'retries': 0}
+    url = SEARCH_URLS[0].format('yope%20balsam')
+    responses.add(responses.GET, url, status=503)
+
+    assert webscrapper._get_response_text(url) == ''
+    assert webscrapper._get_response_text(url) == ''
+    with pytest.raises(CircuitOpenError):
+        webscrapper._get_response_text(url)
+    assert len(responses.calls) == 2
+
+    def search_shop(shop, s_phrase):
+        if shop.shop_name == 'rossman':
+            raise CircuitOpenError('Circuit is open')
+        return [{'shop_id': shop.shop_id, 'name': s_phrase}]
+
+    webscrapper.search_phrases = ['yope balsam']
+    with patch.object(webscrapper, '_search_shop', side_effect=search_shop):
+        products = asyncio.run(webscrapper.search_by_phrases_async())
+        sequential = webscrapper.search_by_single_phrase('yope balsam')
+
+    assert len(products) == 2
+    assert products == sequential
+    reset_throttles()
+    close_sessions()
+
+
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+def test_shop_errors_skipped(webscrapper):
+    """Test shop failing with any error is skipped and recorded, other
+    shops are still searched."""
+    def search_shop(shop, s_phrase):
+        if shop.shop_name == 'superpharm':
+            raise TimeoutError('No browser available')
+        return [{'shop_id': shop.shop_id, 'name': s_phrase}]
+
+    webscrapper.search_phrases = ['yope balsam']
+    with patch.object(webscrapper, '_search_shop', side_effect=search_shop):
+        products = asyncio.run(webscrapper.search_by_phrases_async())
+        sequential = webscrapper.search_by_single_phrase('yope balsam')
+
+    assert len(products) == 2
+    assert products == sequential
+    assert [(error.shop.shop_name, error.phrase, type(error.error))
+            for error in webscrapper.errors] == \
+        [('superpharm', 'yope balsam', TimeoutError)] * 2
+
+
+@pytest.mark.parametrize('webscrapper', [[SHOP_DRIVER_PARSER]], indirect=True)
+def test_webdriver_request_slot_taken_after_checkout(webscrapper):
+    """Test throttle slot of shop is not held while waiting for browser
+    from pool, only while the page is loaded."""
+    reset_throttles()
+    webscrapper.throttle_options = {}
+    url = SEARCH_URLS[2].format('yope')
+    limiter = get_throttle(url).limiter
+    in_flight = {}
+
+    def get_webdriver():
+        in_flight['checkout'] = limiter.in_flight
+        driver = MagicMock()
+        driver.get.side_effect = \
+            lambda _: in_flight.setdefault('load', limiter.in_flight)
+        return driver
+
+    with patch.object(webscrapper, '_get_webdriver',
+                      side_effect=get_webdriver), \
+            patch.object(webscrapper, '_release_webdriver') as released:
+        with webscrapper._webdriver_page(url):
+            pass
+
+    assert in_flight == {'checkout': 0, 'load': 1}
+    assert limiter.in_flight == 0
+    released.assert_called_once()
+    reset_throttles()
+
+
+@pytest.mark.parametrize('webscrapper', [SHOPS], indirect=True)
+def test_search_by_phrases_cancelled_search(webscrapper):
+    """Test cancelled shop search fails the search instead of being
+    returned as products."""
+    def search_shop(shop, s_phrase):
+        if shop.shop_name == 'hebe':
+            raise asyncio.CancelledError()
+        return [{'shop_id': shop.shop_id, 'name': s_phrase}]
+
+    webscrapper.search_phrases = ['yope balsam']
+    with patch.object(webscrapper, '_search_shop', side_effect=search_shop):
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(webscrapper.search_by_phrases_async())
+
+def test_get_session_is_shared_per_host():
+    """Test http_session.get_session returns one session per shop host."""
+    rossman_session = get_session(SEARCH_URLS[0].format('yope'))
+
+    assert get_session(SEARCH_URLS[0].format('himalaya')) is rossman_session
+    assert get_session(SEARCH_URLS[1].format('yope')) is not rossman_session
+
+
+def test_jittered_retry_backoff_within_bounds():
+    """Test JitteredRetry backoff stays between half and full exponential
+    backoff time."""
+    retry = JitteredRetry(total=5, backoff_factor=1)
+    retry = retry.increment(method='GET', url='/').increment(
+        method='GET', url='/').increment(method='GET', url='/')
+
+    for _ in range(20):
+        assert 2 <= retry.get_backoff_time() <= 4
+
+
 @pytest.mark.parametrize('search_url', SEARCH_URLS)
 def test_get_response(search_url):
     """Test responsiveness of search urls per shop."""
@@ -170,36 +409,32 @@ def test_get_response(search_url):
     assert search_phrase in response.text
 
 
-@patch('scrapper.web_scrapper.Scrapper.search_by_single_phrase')
+@patch('scrapper.web_scrapper.Scrapper._search_shop')
 def test_get_products_by_search_phrases(mocked_search, db, load_shops,
                                         search_phrases_test_data):
     """Test product_search.get_products_by_search_phrases function
     when search phrases are specified."""
-    mocked_search.side_effect = search_by_single_phrase_mocked(
-        search_phrases_test_data
-    )
+    mocked_search.side_effect = search_shop_mocked(search_phrases_test_data)
 
     search_phrases = ['yope balsam', 'himalaya pasta']
     products = get_products_by_search_phrases(search_phrases)
 
     assert len(products) > 0
-    calls = [call(search_phrases[0]), call(search_phrases[1])]
-    mocked_search.assert_has_calls(calls)
+    searched_phrases = {c.args[1] for c in mocked_search.call_args_list}
+    assert searched_phrases == set(search_phrases)
     assert products[1]['shop_name'] in SHOPS
 
 
-@patch('scrapper.web_scrapper.Scrapper.search_by_single_phrase')
+@patch('scrapper.web_scrapper.Scrapper._search_shop')
 def test_get_products_by_search_phrases(mocked_search, db, load_shops,
                                         search_phrases_test_data):
     """Test product_search.get_products_by_search_phrases function
     when no search phrases are specified."""
-    mocked_search.side_effect = search_by_single_phrase_mocked(
-        search_phrases_test_data
-    )
+    mocked_search.side_effect = search_shop_mocked(search_phrases_test_data)
 
     products = get_products_by_search_phrases([])
 
     assert len(products) > 0
-    mocked_search.assert_called_once()
+    assert mocked_search.call_count == len(SHOPS)
     assert products[1]['shop_name'] in SHOPS
 
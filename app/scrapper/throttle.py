@@ -0,0 +1,221 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Callable, Deque, Dict, Iterator, Union
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Token bucket rate limiter. Tokens are added at rate per second up to
+    capacity, each request takes one token, so that long term request rate
+    does not exceed rate and bursts do not exceed capacity."""
+
+    def __init__(self, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Takes tokens if they are available. Returns False without
+        waiting otherwise."""
+        with self._lock:
+            self._refill()
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until tokens are available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Takes tokens, waiting until they are available."""
+        while not self.try_acquire(tokens):
+            time.sleep(self.wait_time(tokens))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of request to shop whose recent requests failed."""
+
+
+class AdaptiveLimiter:
+    """Limits number of concurrent requests with AIMD: limit grows by one
+    per limit of successful requests and is halved when request fails or
+    is slower than target latency. Failures of requests started before the
+    last decrease do not decrease it again."""
+
+    def __init__(self, max_limit: int = 2, min_limit: int = 1,
+                 initial: Union[float, None] = None,
+                 target_latency: float = 10.0, backoff: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit if initial is None else initial)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.clock = clock
+        self.in_flight = 0
+        self._decreased = clock()
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Waits for free slot. Returns start time of request."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self.clock()
+
+    def release(self, started: float, failed: bool = False) -> None:
+        """Frees slot of request and adapts limit to its outcome."""
+        with self._condition:
+            self.in_flight -= 1
+            now = self.clock()
+            if failed or now - started > self.target_latency:
+                # requests started before last decrease saw the old limit
+                if started >= self._decreased:
+                    self.limit = max(self.min_limit,
+                                     self.limit * self.backoff)
+                    self._decreased = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class CircuitState(str, Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Fails fast requests to shop with failure_threshold failures among
+    last window requests. After reset_timeout seconds single trial request
+    is let through, its success closes the circuit again."""
+
+    def __init__(self, failure_threshold: int = 3, window: int = 10,
+                 reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.opened = 0.0
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """Raises CircuitOpenError if request must not be sent."""
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if self.clock() - self.opened < self.reset_timeout:
+                    raise CircuitOpenError('Circuit is open')
+                self.state = CircuitState.HALF_OPEN
+            if self.state == CircuitState.HALF_OPEN:
+                if self._trial:
+                    raise CircuitOpenError('Circuit is half open')
+                self._trial = True
+
+    def record(self, failed: bool) -> None:
+        """Records outcome of request let through."""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self._trial = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CircuitState.CLOSED
+                    self._results.clear()
+                return
+
+            self._results.append(failed)
+            if sum(self._results) >= self.failure_threshold:
+                self._open()
+
+    def cancel(self) -> None:
+        """Releases request let through which was not sent."""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self._trial = False
+
+    def _open(self) -> None:
+        self.state = CircuitState.OPEN
+        self.opened = self.clock()
+        self._results.clear()
+
+
+class ShopThrottle:
+    """Paces requests to single shop: rate and bursts are limited by token
+    bucket, concurrency adapts to latency and errors, circuit breaker skips
+    failing shop."""
+
+    def __init__(self, rate: float = 2.0, burst: float = 4,
+                 max_concurrency: int = 2, target_latency: float = 10.0,
+                 failure_threshold: int = 3, window: int = 10,
+                 reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.limiter = AdaptiveLimiter(max_concurrency,
+                                       target_latency=target_latency,
+                                       clock=clock)
+        self.breaker = CircuitBreaker(failure_threshold, window,
+                                      reset_timeout, clock=clock)
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Context of single request to the shop. Raises CircuitOpenError
+        without waiting if shop is failing. Exception raised in context is
+        recorded as failed request."""
+        self.breaker.before_request()
+        try:
+            self.bucket.acquire()
+            started = self.limiter.acquire()
+        except BaseException:
+            self.breaker.cancel()
+            raise
+
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.limiter.release(started, failed)
+            self.breaker.record(failed)
+
+
+_throttles: Dict[str, ShopThrottle] = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(url: str, **options) -> ShopThrottle:
+    """Returns throttle shared by all requests to the host of given url.
+    Options are used only when throttle for the host is created."""
+    host = urlsplit(url).netloc.lower()
+    with _throttles_lock:
+        throttle = _throttles.get(host)
+        if throttle is None:
+            throttle = ShopThrottle(**options)
+            _throttles[host] = throttle
+    return throttle
+
+
+def reset_throttles() -> None:
+    """Removes throttles of all hosts, with their state."""
+    with _throttles_lock:
+        _throttles.clear()
@@ -1,12 +1,35 @@
 import os
+import re
+import queue
 import codecs
-from typing import Union, Tuple, Dict, List
+import asyncio
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Tuple, Dict, List, Iterator, NamedTuple
 
 import requests
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from pandas import DataFrame
+
+from scrapper.http_session import get_session
+from scrapper.browser_pool import get_browser_pool
+from scrapper.response_cache import ResponseCache
+from scrapper.single_flight import SingleFlight
+from scrapper.throttle import get_throttle
+
+
+# characters ignored when products are sorted by name
+SORT_NAME_IGNORED = re.compile(r'[ ,+-]')
+
+
+class ShopResult(NamedTuple):
+    """Products found in single shop for single phrase. Error is set if
+    the shop could not be searched."""
+    shop: 'ShopParser'
+    phrase: str
+    products: List[Dict]
+    error: Union[Exception, None] = None
 
 
 class Scrapper:
@@ -18,10 +41,33 @@ class Scrapper:
     _driver_path = '/usr/local/bin/chromedriver'
 
     def __init__(self, shops: List['Shop'],
-                 search_phrases: Union[Tuple, List] = []):
+                 search_phrases: Union[Tuple, List] = [],
+                 max_concurrency: int = 8, shop_concurrency: int = 2,
+                 http_options: Union[Dict, None] = None,
+                 browser_options: Union[Dict, None] = None,
+                 response_cache: Union[ResponseCache, None] = None,
+                 single_flight: Union[SingleFlight, None] = None,
+                 throttle_options: Union[Dict, None] = None):
         self.shops = shops
         self.search_phrases = search_phrases
+        # limits for concurrent (phrase, shop) searches
+        self.max_concurrency = max_concurrency
+        self.shop_concurrency = shop_concurrency
+        # options of pooled http sessions, see http_session.ShopSession
+        self.http_options = http_options or {}
+        # options of shared browser pool, see browser_pool.BrowserPool
+        self.browser_options = browser_options or {}
+        # on-disk cache of fetched and rendered pages, disabled if None
+        self.response_cache = response_cache
+        # coalesces identical (phrase, shop) searches running at once,
+        # must be shared between Scrapper objects
+        self.single_flight = single_flight
+        # options of per shop host request throttles, see
+        # throttle.ShopThrottle, requests are not paced if None
+        self.throttle_options = throttle_options
         self.products = []
+        # shop searches which failed, their shops are skipped in results
+        self.errors: List[ShopResult] = []
         self.path_to_save = '/tests/data/'
 
     def _find_shop_by_id(self, _id):
@@ -29,12 +75,47 @@ class Scrapper:
         shop = [sh for sh in self.shops if sh.shop_id == _id][0]
         return shop
 
-    def _get_response_text(self, url: str) -> str:
-        """Retrieves response from requested url."""
+    def _request_slot(self, url: str):
+        """Context of request to shop host of url, waits for its throttle.
+        Raises CircuitOpenError if the shop is failing."""
+        if self.throttle_options is None:
+            return nullcontext()
+        return get_throttle(url, **self.throttle_options).request()
+
+    def _get_response_text(self, url: str,
+                           ttl: Union[float, None] = None) -> str:
+        """Retrieves response from requested url. Uses keep-alive session
+        shared by all requests to the url host, paced by its throttle.
+        Cached response younger than ttl is returned without request, older
+        one is revalidated."""
+        cache = self.response_cache
+        entry = cache.get(url) if cache is not None else None
+        if entry is not None and entry.is_fresh(
+                cache.ttl if ttl is None else ttl):
+            return entry.body
+
         resp_txt = ''
-        with requests.get(url) as response:
-            if response.status_code == 200:
-                resp_txt = response.text
+        session = get_session(url, **self.http_options)
+        try:
+            with self._request_slot(url), \
+                    session.get(url, headers=ResponseCache.validators(entry)) \
+                    as response:
+                # throttled or failing shop, counted by circuit breaker
+                if response.status_code == 429 \
+                        or response.status_code >= 500:
+                    response.raise_for_status()
+                if response.status_code == 304 and entry is not None:
+                    cache.touch(url)
+                    resp_txt = entry.body
+                elif response.status_code == 200:
+                    resp_txt = response.text
+                    if cache is not None:
+                        cache.set(url, resp_txt,
+                                  etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get(
+                                      'Last-Modified'))
+        except requests.HTTPError:
+            resp_txt = ''
         return resp_txt
 
     def _save_response_to_file(self, resp_txt: str, file_name: str) -> None:
@@ -43,40 +124,101 @@ class Scrapper:
                   encoding='utf-8') as file:
             file.write(resp_txt)
 
-    def _get_soup(self, url: str) -> BeautifulSoup:
-        """Generates BeautifulSoup object based on response text of
-        given url."""
+    def _get_soup(self, url: str, shop: Union['ShopParser', None] = None
+                  ) -> Union[BeautifulSoup, 'Node']:
+        """Generates parsed document based on response text of given url.
+        Uses parser engine of given shop, BeautifulSoup otherwise."""
+        if shop is not None:
+            resp_txt = self._get_response_text(url, shop.cache_ttl)
+            return shop.make_document(resp_txt)
         resp_txt = self._get_response_text(url)
         soup = BeautifulSoup(resp_txt, features='html.parser')
         return soup
 
-    def _get_webdriver(self, url: str) -> webdriver:
-        """Returns chrome webdriver with options."""
-        options = webdriver.ChromeOptions()
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-setuid-sandbox')
-        webdriver_config = {'service': Service(self._driver_path),
-                            'options': options}
+    def _get_webdriver(self) -> webdriver:
+        """Checks out warm chrome webdriver from pool. Driver must be
+        returned with _release_webdriver."""
+        pool = get_browser_pool(self._driver_path, **self.browser_options)
+        return pool.acquire()
+
+    def _release_webdriver(self, driver: webdriver) -> None:
+        """Returns webdriver to pool."""
+        pool = get_browser_pool(self._driver_path, **self.browser_options)
+        pool.release(driver)
+
+    @contextmanager
+    def _webdriver_page(self, url: str) -> Iterator[webdriver]:
+        """Context of webdriver with given url loaded. Request slot of shop
+        host is taken once the driver is checked out of pool, so that
+        waiting for free browser is not counted as shop latency."""
+        driver = self._get_webdriver()
+        try:
+            with self._request_slot(url):
+                driver.get(url)
+                yield driver
+        finally:
+            self._release_webdriver(driver)
 
-        driver = webdriver.Chrome(**webdriver_config)
-        driver.implicitly_wait(15)
-        driver.get(url)
+    def _get_rendered_page(self, url: str, shop: 'ShopParser') -> str:
+        """Returns page source rendered by webdriver. Uses cached page if it
+        is younger than shop cache ttl. Error and empty pages are not
+        cached."""
+        html = self.response_cache.get_fresh(url, shop.cache_ttl)
+        if html is not None:
+            return html
 
-        return driver
+        with self._webdriver_page(url) as driver:
+            html = shop.get_page_snapshot(driver)
+
+        if shop.is_cacheable_page(html):
+            self.response_cache.set(url, html)
+        return html
+
+    @staticmethod
+    def _sort_key(product: Dict) -> Tuple[str, str, int]:
+        """Sort key of product - search phrase, name and description without
+        spaces, commas, pluses and minuses, shop id."""
+        name_to_sort = SORT_NAME_IGNORED.sub(
+            '', f'{product["name"]} {product["description"]}')
+        return product['search_phrase'], name_to_sort, product['shop_id']
 
     def _transform_searched_data(self, prod_search_results: List[Dict]):
         """Processes raw data from search results. Returns cleaned and
         sorted list of products."""
-        df_products = DataFrame(prod_search_results)
-        df_products['name_to_sort'] = df_products[['name', 'description']] \
-            .apply(lambda row: ' '.join(row.values), axis=1) \
-            .str.replace(' |,|\+|-|', '')
-        sort_order = ['search_phrase', 'name_to_sort', 'shop_id']
-        df_products = df_products.sort_values(by=sort_order)\
-            .drop(['search_phrase', 'name_to_sort'], axis=1)
-        return df_products.to_dict('records')
+        products = sorted(prod_search_results, key=self._sort_key)
+        return [{key: value for key, value in product.items()
+                 if key != 'search_phrase'} for product in products]
+
+    def _search_shop(self, shop: 'ShopParser', phrase: str) -> List[Dict]:
+        """Searches single shop for given phrase. Identical searches running
+        at the same time share one scrape. Returns list of found products."""
+        if self.single_flight is None:
+            return self._scrape_shop(shop, phrase)
+
+        return self.single_flight.do(f'{shop.shop_id}:{phrase}',
+                                     lambda: self._scrape_shop(shop, phrase))
+
+    def _scrape_shop(self, shop: 'ShopParser', phrase: str) -> List[Dict]:
+        """Fetches and parses search results page of single shop.
+        Returns list of found products."""
+        search_url = shop.url + \
+                     shop.search_str.format(phrase.replace(' ', '%20'))
+        print(search_url)
+
+        products = []
+        if shop.parser_type == 'soup':
+            soup = self._get_soup(search_url, shop)
+            products = shop.parse_data(soup, phrase)
+        elif shop.parser_type == 'webdriver' and self.response_cache \
+                and getattr(shop, 'use_snapshot', False):
+            html = self._get_rendered_page(search_url, shop)
+            products = shop.parse_soup(shop.make_document(html), phrase,
+                                       base_url=search_url)
+        elif shop.parser_type == 'webdriver':
+            with self._webdriver_page(search_url) as driver:
+                products = shop.parse_data(driver, phrase)
+
+        return products
 
     def search_by_single_phrase(self, phrase: str) -> List[Dict]:
         """Searches each shop for given phrase.
@@ -84,29 +226,110 @@ class Scrapper:
         prod_all_shops = []
 
         for shop in self.shops:
-            search_url = shop.url + \
-                         shop.search_str.format(phrase.replace(' ', '%20'))
-            print(search_url)
-
-            if shop.parser_type == 'soup':
-                soup = self._get_soup(search_url)
-                products = shop.parse_data(soup, phrase)
-            elif shop.parser_type == 'webdriver':
-                driver = self._get_webdriver(search_url)
-                products = shop.parse_data(driver, phrase)
-
+            try:
+                products = self._search_shop(shop, phrase)
+            except Exception as e:
+                # failing shop is skipped, so that other shops are searched
+                self.errors.append(ShopResult(shop, phrase, [], e))
+                continue
             prod_all_shops.extend(products)
 
         return prod_all_shops
 
+    async def _search_shop_async(self, shop: 'ShopParser', phrase: str,
+                                 executor: ThreadPoolExecutor,
+                                 global_limit: asyncio.Semaphore,
+                                 shop_limit: asyncio.Semaphore) -> List[Dict]:
+        """Runs blocking shop search in executor once both shop and global
+        concurrency limits allow it."""
+        # shop slot is acquired first, so that requests waiting for a busy
+        # shop do not hold global slots
+        async with shop_limit, global_limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self._search_shop,
+                                              shop, phrase)
+
+    async def search_by_phrases_async(self) -> List[Dict]:
+        """Searches all (phrase, shop) pairs concurrently. Returns list of
+        found products in the same order as sequential search would."""
+        phrases = list(self.search_phrases)
+        if not phrases or not self.shops:
+            return []
+
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        shop_limits = {shop.shop_id: asyncio.Semaphore(self.shop_concurrency)
+                       for shop in self.shops}
+
+        searches = [(shop, phrase) for phrase in phrases
+                    for shop in self.shops]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = await asyncio.gather(*[
+                self._search_shop_async(shop, phrase, executor, global_limit,
+                                        shop_limits[shop.shop_id])
+                for shop, phrase in searches
+            ], return_exceptions=True)
+
+        products = []
+        for (shop, phrase), result in zip(searches, results):
+            # failing shops are skipped, cancellation fails the search
+            if isinstance(result, Exception):
+                self.errors.append(ShopResult(shop, phrase, [], result))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                products.extend(result)
+        return products
+
+    async def _put_search_results(self, results: queue.Queue) -> None:
+        """Searches all (phrase, shop) pairs concurrently and puts result of
+        each search to queue as soon as it finishes."""
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        shop_limits = {shop.shop_id: asyncio.Semaphore(self.shop_concurrency)
+                       for shop in self.shops}
+
+        async def _search(shop, phrase, executor):
+            try:
+                products = await self._search_shop_async(
+                    shop, phrase, executor, global_limit,
+                    shop_limits[shop.shop_id])
+                results.put(ShopResult(shop, phrase, products))
+            except Exception as e:
+                results.put(ShopResult(shop, phrase, [], e))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            await asyncio.gather(*[
+                _search(shop, phrase, executor)
+                for phrase in self.search_phrases for shop in self.shops
+            ])
+
+    def iter_search_results(self) -> Iterator[ShopResult]:
+        """Searches all (phrase, shop) pairs concurrently. Yields result of
+        each search as soon as it finishes, so that fast shops do not wait
+        for the slow ones. Failed searches are yielded with error."""
+        self.search_phrases = list(self.search_phrases)
+        if not self.search_phrases or not self.shops:
+            return
+
+        results = queue.Queue()
+
+        def _run():
+            try:
+                asyncio.run(self._put_search_results(results))
+            finally:
+                results.put(None)
+
+        threading.Thread(target=_run, daemon=True).start()
+        while True:
+            result = results.get()
+            if result is None:
+                break
+            yield result
+
     def search_by_phrases(self) -> List[Dict]:
         """Searches each shop for each phrase in list. Returns list of found
         products for all searched phrases."""
         if self.search_phrases:
-            prod_search_results = []
-            for s_phrase in self.search_phrases:
-                products = self.search_by_single_phrase(s_phrase)
-                prod_search_results.extend(products)
+            prod_search_results = asyncio.run(self.search_by_phrases_async())
 
             if prod_search_results:
                 self.products = self._transform_searched_data(
@@ -114,8 +337,3 @@ class Scrapper:
                 )
 
         return self.products
-
-
-
-
-